@@ -1,14 +1,22 @@
 import json
 import copy
+import sys
 
-def audit_and_modify_distances(input_filename, output_filename):
+def audit_and_modify_distances(input_filename, output_filename, corrections_filename=None):
     """
     Reads a JSON distance file, logs all distances being changed from <30km 
-    to 0.0, and then saves the modified data to a new file without further prompts.
+    to 0.0, applies any manual corrections, and then saves the modified data
+    to a new file without further prompts.
 
     Args:
         input_filename (str): The name of the source JSON file.
         output_filename (str): The name for the new, modified JSON file.
+        corrections_filename (str, optional): A JSON file of hand-set distances,
+            {"country1": {"country2": km}}. Each pair is listed once and set in
+            both directions after the audit, so it survives the <30km rule.
+
+    Returns:
+        bool: True if the modified file was written.
     """
     # --- 1. Load the Input File ---
     try:
@@ -17,10 +25,10 @@ def audit_and_modify_distances(input_filename, output_filename):
     except FileNotFoundError:
         print(f"Error: The input file '{input_filename}' was not found.")
         print("Please ensure the file is in the same directory as the script. Halting execution.")
-        return
+        return False
     except json.JSONDecodeError:
         print(f"Error: The file '{input_filename}' is not a valid JSON file. Halting execution.")
-        return
+        return False
 
     # Create a deep copy to modify, preserving the original data for comparison
     modified_data = copy.deepcopy(country_data)
@@ -63,23 +71,58 @@ def audit_and_modify_distances(input_filename, output_filename):
             )
     
     print("\n--- End of Audit Log ---")
+
+    # --- 4. Apply Manual Corrections ---
+    corrections_applied = 0
+    if corrections_filename:
+        try:
+            with open(corrections_filename, 'r', encoding='utf-8') as f:
+                corrections = json.load(f)
+        except FileNotFoundError:
+            print(f"Error: The corrections file '{corrections_filename}' was not found. Halting execution.")
+            return False
+        except json.JSONDecodeError:
+            print(f"Error: The file '{corrections_filename}' is not a valid JSON file. Halting execution.")
+            return False
+
+        print("\n--- Manual Corrections ---")
+        for country, distances in sorted(corrections.items()):
+            for neighbor_country, distance in sorted(distances.items()):
+                for a, b in ((country, neighbor_country), (neighbor_country, country)):
+                    if b not in modified_data.get(a, {}):
+                        print(f"Error: '{a}' -> '{b}' from '{corrections_filename}' is not in the distance data. "
+                              "Halting execution.")
+                        return False
+                    modified_data[a][b] = distance
+                print(f"Setting distance between '{country}' and '{neighbor_country}' to {distance} km")
+                corrections_applied += 1
     
-    # --- 4. Save the Modified File ---
+    # --- 5. Save the Modified File ---
     try:
         with open(output_filename, 'w', encoding='utf-8') as f:
             json.dump(modified_data, f, indent=4)
         print(f"\nSuccessfully saved all modifications to '{output_filename}'.")
         print(f"Total number of distances overwritten: {len(changes_to_make)}")
+        if corrections_filename:
+            print(f"Total number of manual corrections applied: {corrections_applied}")
     except IOError as e:
         print(f"\nAn error occurred while writing the output file: {e}")
+        return False
+    return True
 
 if __name__ == "__main__":
-    # Get filenames from the user at the very beginning
-    input_file = input("Enter the name of the INPUT JSON file (e.g., distances.json): ")
-    output_file = input("Enter the name for the OUTPUT JSON file (e.g., modified_distances.json): ")
+    # Filenames come from the command line (e.g. from pipeline.py) or from the user
+    corrections_file = None
+    if len(sys.argv) in (3, 4):
+        input_file, output_file = sys.argv[1], sys.argv[2]
+        corrections_file = sys.argv[3] if len(sys.argv) == 4 else None
+    else:
+        input_file = input("Enter the name of the INPUT JSON file (e.g., distances.json): ")
+        output_file = input("Enter the name for the OUTPUT JSON file (e.g., modified_distances.json): ")
 
     if not input_file or not output_file:
         print("Input and output filenames cannot be empty. Exiting.")
+        sys.exit(1)
     else:
         # Run the main function
-        audit_and_modify_distances(input_file, output_file)
\ No newline at end of file
+        sys.exit(0 if audit_and_modify_distances(input_file, output_file, corrections_file) else 1)
\ No newline at end of file
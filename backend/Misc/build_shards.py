@@ -0,0 +1,129 @@
+import argparse
+import json
+import os
+import re
+import sys
+from functools import lru_cache
+
+from matrix_io import DIRECTIONS, load_json, matrix_names, distance_array, direction_array
+
+MISC_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(MISC_DIR)
+DEFAULT_OUT_DIR = os.path.join(BACKEND_DIR, "dist", "shards")
+
+# Half of the Earth's circumference: the farthest two places can be apart
+MAX_DISTANCE_KM = 20037.5
+
+
+def proximity_score(distance_km):
+    """
+    Percentage closeness of a guess, 100 for touching countries and 0 for antipodes.
+    """
+    return int(round(max(0.0, 1.0 - distance_km / MAX_DISTANCE_KM) * 100))
+
+
+def shard_file_name(answer):
+    return re.sub(r"[^a-z0-9]+", "-", answer.lower()).strip("-") + ".json"
+
+
+def build_shards(distances, directions, answers, out_dir):
+    """
+    Writes one compact feedback shard per answer country plus an index.
+
+    Every shard holds three arrays in the guess order listed in the index, so a
+    consumer only needs the index and the shards of the rounds it is playing:
+
+        index.json          {"guesses": [...], "answers": {answer: file}}
+        <answer>.json       {"answer": ..., "distance": [...], "direction": [...], "proximity": [...]}
+
+    Args:
+        distances (dict): The distance matrix.
+        directions (dict): The direction matrix.
+        answers (list): Row keys to shard (lowercase, as server.js looks them up).
+        out_dir (str): Target directory.
+
+    Returns:
+        tuple: (written, skipped) lists of answer keys.
+    """
+    guesses = matrix_names(distances, directions)
+    index = {name: i for i, name in enumerate(guesses)}
+    dist, _ = distance_array(distances, guesses)
+    codes = direction_array(directions, guesses)
+    os.makedirs(out_dir, exist_ok=True)
+
+    written, skipped, files = [], [], {}
+    for answer in answers:
+        i = index.get(answer)
+        if i is None or answer not in distances or answer not in directions:
+            skipped.append(answer)
+            continue
+        row_dist, row_dir = dist[i], codes[i]
+        shard = {
+            "answer": answer,
+            "distance": [None if d != d else round(float(d), 1) for d in row_dist],
+            "direction": [DIRECTIONS[c] if c >= 0 else None for c in row_dir.tolist()],
+            "proximity": [None if d != d else proximity_score(d) for d in row_dist],
+        }
+        file_name = shard_file_name(answer)
+        with open(os.path.join(out_dir, file_name), "w", encoding="utf-8") as f:
+            json.dump(shard, f, separators=(",", ":"))
+        files[answer] = file_name
+        written.append(answer)
+
+    with open(os.path.join(out_dir, "index.json"), "w", encoding="utf-8") as f:
+        json.dump({"guesses": guesses, "answers": files}, f, separators=(",", ":"))
+    return written, skipped
+
+
+class ShardReader:
+    """
+    Lazily loads feedback shards and keeps the most recently used ones in memory.
+    """
+
+    def __init__(self, shard_dir, cache_size=64):
+        self.shard_dir = shard_dir
+        index = load_json(os.path.join(shard_dir, "index.json"))
+        self.files = index["answers"]
+        self.guess_index = {name: i for i, name in enumerate(index["guesses"])}
+        self._load = lru_cache(maxsize=cache_size)(self._read_shard)
+
+    def _read_shard(self, answer):
+        return load_json(os.path.join(self.shard_dir, self.files[answer]))
+
+    def feedback(self, answer, guess):
+        """
+        Returns (distance, direction, proximity) for a guess, or None if either name is unknown.
+        """
+        if answer not in self.files or guess not in self.guess_index:
+            return None
+        shard, j = self._load(answer), self.guess_index[guess]
+        return shard["distance"][j], shard["direction"][j], shard["proximity"][j]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write one feedback shard per answer country.")
+    parser.add_argument("--distances", default=os.path.join(BACKEND_DIR, "country_distances.json"))
+    parser.add_argument("--directions", default=os.path.join(BACKEND_DIR, "country_directions.json"))
+    parser.add_argument("--answers", default=os.path.join(BACKEND_DIR, "data.json"),
+                        help="JSON object whose keys are the possible answers (default: data.json).")
+    parser.add_argument("--all", action="store_true", help="Shard every matrix row, not just the answers.")
+    parser.add_argument("--out-dir", default=DEFAULT_OUT_DIR)
+    args = parser.parse_args()
+
+    try:
+        distances = load_json(args.distances)
+        directions = load_json(args.directions)
+        answers = sorted(distances) if args.all else [name.lower() for name in load_json(args.answers)]
+    except FileNotFoundError as e:
+        print(f"Error: The file '{e.filename}' was not found.")
+        return 1
+
+    written, skipped = build_shards(distances, directions, answers, args.out_dir)
+    for answer in skipped:
+        print(f"  > No matrix row for answer '{answer}', skipped.")
+    print(f"Wrote {len(written)} shards and index.json to '{args.out_dir}'.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+import argparse
+import os
+import sys
+import numpy as np
+
+from matrix_io import load_json
+
+MISC_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(MISC_DIR)
+DEFAULT_DATA = os.path.join(BACKEND_DIR, "data.json")
+DEFAULT_INDEX = os.path.join(BACKEND_DIR, "dist", "commodity_index.npz")
+
+# The game reveals at most this many commodities per answer
+MAX_RANK = 10
+
+
+def build_commodity_index(data):
+    """
+    Interns the HS4 names of data.json and derives the clue statistics.
+
+    Arrays (countries in data.json order, keyed lowercase as server.js does):
+
+        countries     (C,)         answer names
+        commodities   (K,)         sorted HS4 names; a commodity's code is its position
+        codes         (C, 10)      int16 commodity code per (country, rank), -1 past the list
+        values        (C, 10)      float64 trade value per (country, rank), NaN past the list
+        offsets       (K + 1,)     inverted index: the exporters of code k are
+        post_country  (P,)         post_country[offsets[k]:offsets[k + 1]] at ranks
+        post_rank     (P,)         post_rank[...], ordered by rank then country
+        uniqueness    (C, 10)      float32, log(C / df) / log(C) of the commodity at that
+                                   rank, where df is how many top-10 lists contain it:
+                                   1.0 = no other country exports it, 0.0 = all do
+        candidates    (C, 10)      int16, countries whose top 10 contains every commodity
+                                   revealed up to and including that rank (>= 1)
+
+    Args:
+        data (dict): {country: [{"HS4": ..., "Total Trade Value": ...}, ...]}.
+
+    Returns:
+        dict: The arrays above.
+    """
+    countries = [name.lower() for name in data]
+    commodities = sorted({item["HS4"] for exports in data.values() for item in exports[:MAX_RANK]})
+    code_of = {name: k for k, name in enumerate(commodities)}
+    n, k = len(countries), len(commodities)
+
+    codes = np.full((n, MAX_RANK), -1, dtype=np.int16)
+    values = np.full((n, MAX_RANK), np.nan, dtype=np.float64)
+    for i, exports in enumerate(data.values()):
+        for r, item in enumerate(exports[:MAX_RANK]):
+            codes[i, r] = code_of[item["HS4"]]
+            values[i, r] = item["Total Trade Value"]
+
+    # Inverted index in CSR form, postings sorted by (commodity, rank, country)
+    ci, ri = np.nonzero(codes >= 0)
+    post_code = codes[ci, ri]
+    order = np.lexsort((ci, ri, post_code))
+    offsets = np.zeros(k + 1, dtype=np.int32)
+    np.cumsum(np.bincount(post_code, minlength=k), out=offsets[1:])
+
+    # exports[k, c]: commodity k is somewhere in country c's top 10
+    exports = np.zeros((k, n), dtype=bool)
+    exports[post_code, ci] = True
+    df = exports.sum(axis=1)
+
+    known = codes >= 0
+    uniqueness = np.zeros((n, MAX_RANK), dtype=np.float32)
+    if n > 1:
+        uniqueness[known] = np.log(n / df[codes[known]]) / np.log(n)
+
+    candidates = np.zeros((n, MAX_RANK), dtype=np.int16)
+    for i in range(n):
+        alive = np.ones(n, dtype=bool)
+        for r in range(MAX_RANK):
+            if codes[i, r] >= 0:
+                alive &= exports[codes[i, r]]
+            candidates[i, r] = alive.sum()
+
+    return {
+        "countries": np.array(countries), "commodities": np.array(commodities),
+        "codes": codes, "values": values,
+        "offsets": offsets, "post_country": ci[order].astype(np.int16), "post_rank": ri[order].astype(np.int8),
+        "uniqueness": uniqueness, "candidates": candidates,
+    }
+
+
+def save_commodity_index(arrays, file_path):
+    os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+    tmp = file_path + ".tmp.npz"
+    np.savez_compressed(tmp, **arrays)
+    os.replace(tmp, file_path)
+
+
+class CommodityIndex:
+    """
+    Read-only view over the arrays written by build_commodity_index.
+
+        index = CommodityIndex.load()
+        index.exporters("Crude Petroleum")      # -> [("algeria", 1), ...]
+        index.hint_order("chile")               # ranks, most identifying first
+    """
+
+    def __init__(self, arrays):
+        for key, value in arrays.items():
+            setattr(self, key, value)
+        self.country_names = self.countries.tolist()
+        self._country = {name: i for i, name in enumerate(self.country_names)}
+        self._code = {name: k for k, name in enumerate(self.commodities.tolist())}
+
+    @classmethod
+    def load(cls, file_path=DEFAULT_INDEX):
+        with np.load(file_path) as data:
+            return cls({key: data[key] for key in data.files})
+
+    @classmethod
+    def from_data(cls, data):
+        return cls(build_commodity_index(data))
+
+    def code(self, commodity):
+        """Integer code of an HS4 name, or None if no top-10 list contains it."""
+        return self._code.get(commodity)
+
+    def row(self, country):
+        return self._country[country.lower()]
+
+    def exporters(self, commodity):
+        """
+        (country, rank) for every country with the commodity in its top 10, by rank.
+        Ranks are 0-based, as in data.json.
+        """
+        k = self.code(commodity)
+        if k is None:
+            return []
+        lo, hi = self.offsets[k], self.offsets[k + 1]
+        return [(self.country_names[c], r) for c, r in
+                zip(self.post_country[lo:hi].tolist(), self.post_rank[lo:hi].tolist())]
+
+    def clues(self, country):
+        """
+        (commodity, uniqueness, candidates) per rank for one country.
+        """
+        i = self.row(country)
+        return [(self.commodities[k], float(u), int(c)) for k, u, c in
+                zip(self.codes[i].tolist(), self.uniqueness[i].tolist(), self.candidates[i].tolist()) if k >= 0]
+
+    def hint_order(self, country):
+        """
+        Ranks of a country's commodities from most to least identifying (ties keep rank order).
+        """
+        i = self.row(country)
+        ranks = np.nonzero(self.codes[i] >= 0)[0]
+        return ranks[np.argsort(-self.uniqueness[i, ranks], kind="stable")].tolist()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the commodity -> countries index and clue scores from data.json.")
+    parser.add_argument("--data", default=DEFAULT_DATA, help="Export data JSON file.")
+    parser.add_argument("-o", "--output", default=DEFAULT_INDEX, help="Index file to write.")
+    parser.add_argument("--who", metavar="HS4", help="List the countries exporting this commodity.")
+    parser.add_argument("--country", help="Show the clue scores of one country.")
+    args = parser.parse_args()
+
+    try:
+        data = load_json(args.data)
+    except FileNotFoundError:
+        print(f"Error: The file '{args.data}' was not found.")
+        return 1
+    except ValueError:
+        print(f"Error: The file '{args.data}' is not a valid JSON file.")
+        return 1
+
+    arrays = build_commodity_index(data)
+    index = CommodityIndex(arrays)
+    if args.who or args.country:
+        if args.who:
+            found = index.exporters(args.who)
+            print(f"'{args.who}' is in the top {MAX_RANK} of {len(found)} countries:")
+            for country, rank in found:
+                print(f"  #{rank + 1:<3} {country}")
+        if args.country:
+            if args.country.lower() not in index._country:
+                print(f"Error: '{args.country}' is not in '{args.data}'.")
+                return 1
+            print(f"Clues for '{args.country.lower()}' (uniqueness, countries still matching):")
+            for rank, (commodity, score, left) in enumerate(index.clues(args.country)):
+                print(f"  #{rank + 1:<3} {commodity:<45} {score:5.2f}  {left:>4}")
+        return 0
+
+    save_commodity_index(arrays, args.output)
+    print(f"Indexed {len(index.commodities)} commodities across {len(index.country_names)} countries.")
+    print(f"==> Saved index to '{args.output}'")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
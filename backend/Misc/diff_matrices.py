@@ -0,0 +1,184 @@
+import argparse
+import json
+import sys
+import time
+import numpy as np
+
+from matrix_io import MISSING_CODE, load_json, matrix_names, distance_array, direction_array
+
+
+def matrix_kind(matrix):
+    """
+    Guesses whether a matrix holds distances or directions from its first non-null value.
+    """
+    for row in matrix.values():
+        for value in row.values():
+            if value is None or value == "unknown":
+                continue
+            return "direction" if isinstance(value, str) else "distance"
+    return "distance"
+
+
+def diff_matrices(old, new, kind=None, tolerance=0.0):
+    """
+    Compares two versions of a distance or direction matrix.
+
+    Both are packed into arrays over the union of their names, so every
+    comparison is a single array pass.
+
+    Args:
+        old (dict): The previous matrix.
+        new (dict): The current matrix.
+        kind (str): "distance" or "direction" (default: guessed from `new`).
+        tolerance (float): Distance changes up to this many km are ignored.
+
+    Returns:
+        dict: With keys
+            kind, rows_added, rows_removed,
+            cells_added, cells_removed     -- [(row, col)] present in only one version
+            changed                        -- [(row, col, old_value, new_value)]
+            flips                          -- direction only: changed cells where both
+                                              values are sectors, with their step (1..4)
+            steps                          -- direction only: {step: count}
+            largest                        -- distance only: changed cells by |delta|, descending
+    """
+    kind = kind or matrix_kind(new)
+    names = matrix_names(old, new)
+    if kind == "distance":
+        a, missing_a = distance_array(old, names)
+        b, missing_b = distance_array(new, names)
+        present = ~missing_a & ~missing_b
+        nan_a, nan_b = np.isnan(a), np.isnan(b)
+        with np.errstate(invalid="ignore"):
+            delta = np.where(nan_a | nan_b, 0.0, b - a)
+        changed = present & ((nan_a != nan_b) | (np.abs(delta) > tolerance))
+    elif kind == "direction":
+        a, b = direction_array(old, names), direction_array(new, names)
+        missing_a, missing_b = a == MISSING_CODE, b == MISSING_CODE
+        present = ~missing_a & ~missing_b
+        changed = present & (a != b)
+    else:
+        raise ValueError(f"Unknown matrix kind '{kind}'")
+
+    def cells(mask):
+        rows, cols = np.nonzero(mask)
+        return [(names[i], names[j]) for i, j in zip(rows.tolist(), cols.tolist())]
+
+    result = {
+        "kind": kind,
+        "rows_added": sorted(set(new) - set(old)),
+        "rows_removed": sorted(set(old) - set(new)),
+        "cells_added": cells(missing_a & ~missing_b),
+        "cells_removed": cells(~missing_a & missing_b),
+        "changed": [(r, c, old[r][c], new[r][c]) for r, c in cells(changed)],
+    }
+    if kind == "direction":
+        flip = changed & (a >= 0) & (b >= 0)
+        step = np.abs(a.astype(np.int16) - b.astype(np.int16))
+        step = np.minimum(step, 8 - step)
+        rows, cols = np.nonzero(flip)
+        result["flips"] = [(names[i], names[j], old[names[i]][names[j]], new[names[i]][names[j]], int(step[i, j]))
+                           for i, j in zip(rows.tolist(), cols.tolist())]
+        values, counts = np.unique(step[flip], return_counts=True)
+        result["steps"] = {int(v): int(c) for v, c in zip(values, counts)}
+    else:
+        rows, cols = np.nonzero(changed)
+        order = np.argsort(-np.abs(delta[rows, cols]), kind="stable")
+        result["largest"] = [(names[rows[k]], names[cols[k]], old[names[rows[k]]][names[cols[k]]],
+                              new[names[rows[k]]][names[cols[k]]], float(delta[rows[k], cols[k]]))
+                             for k in order.tolist()]
+    return result
+
+
+def make_patch(diff, new):
+    """
+    A patch that turns the old matrix into the new one:
+        {"set": {row: {col: value}}, "remove": {row: [col, ...]}}
+    """
+    patch = {"set": {}, "remove": {}}
+    for r, c, _, value in diff["changed"]:
+        patch["set"].setdefault(r, {})[c] = value
+    for r, c in diff["cells_added"]:
+        patch["set"].setdefault(r, {})[c] = new[r][c]
+    for r, c in diff["cells_removed"]:
+        patch["remove"].setdefault(r, []).append(c)
+    return patch
+
+
+def apply_patch(matrix, patch):
+    """
+    Applies a patch written by make_patch in place and returns the matrix.
+    """
+    for r, row in patch.get("set", {}).items():
+        matrix.setdefault(r, {}).update(row)
+    for r, cols in patch.get("remove", {}).items():
+        for c in cols:
+            matrix.get(r, {}).pop(c, None)
+    return matrix
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show what changed between two versions of a distance or direction matrix.")
+    parser.add_argument("old", help="Previous matrix JSON file.")
+    parser.add_argument("new", help="Current matrix JSON file.")
+    parser.add_argument("--kind", choices=("distance", "direction"), help="Matrix kind (default: guessed).")
+    parser.add_argument("--tolerance", type=float, default=0.0, help="Ignore distance changes up to this many km.")
+    parser.add_argument("--limit", type=int, default=20, help="Max pairs to list per section (0 = all).")
+    parser.add_argument("--patch", help="Write a JSON patch (old -> new) to this file.")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    try:
+        old, new = load_json(args.old), load_json(args.new)
+    except FileNotFoundError as e:
+        print(f"Error: The file '{e.filename}' was not found.")
+        return 2
+    except ValueError as e:
+        print(f"Error: Could not parse JSON: {e}")
+        return 2
+    t1 = time.perf_counter()
+    diff = diff_matrices(old, new, args.kind, args.tolerance)
+    if args.patch:
+        patch = make_patch(diff, new)
+        with open(args.patch, "w", encoding="utf-8") as f:
+            json.dump(patch, f, indent=2, ensure_ascii=False)
+    t2 = time.perf_counter()
+
+    def listing(title, items, fmt):
+        if not items:
+            return
+        print(f"\n{title}:")
+        for item in items[:args.limit or None]:
+            print("  " + fmt(item))
+        if args.limit and len(items) > args.limit:
+            print(f"  ... {len(items) - args.limit} more not shown")
+
+    print(f"--- Matrix Diff ({diff['kind']}) ---")
+    print(f"rows added: {len(diff['rows_added'])}, rows removed: {len(diff['rows_removed'])}")
+    print(f"cells added: {len(diff['cells_added'])}, cells removed: {len(diff['cells_removed'])}")
+    print(f"cells changed: {len(diff['changed'])}")
+    listing("Rows added", diff["rows_added"], lambda r: f"'{r}'")
+    listing("Rows removed", diff["rows_removed"], lambda r: f"'{r}'")
+    listing("Cells added", diff["cells_added"], lambda p: f"'{p[0]}' -> '{p[1]}'")
+    listing("Cells removed", diff["cells_removed"], lambda p: f"'{p[0]}' -> '{p[1]}'")
+    if diff["kind"] == "direction":
+        steps = ", ".join(f"{k * 45} deg: {v}" for k, v in sorted(diff["steps"].items()))
+        print(f"sector flips: {len(diff['flips'])}" + (f" ({steps})" if steps else ""))
+        listing("Sector flips", diff["flips"], lambda f: f"'{f[0]}' -> '{f[1]}': {f[2]} -> {f[3]}")
+        flipped = {(f[0], f[1]) for f in diff["flips"]}
+        listing("Other changes", [c for c in diff["changed"] if (c[0], c[1]) not in flipped],
+                lambda c: f"'{c[0]}' -> '{c[1]}': {c[2]} -> {c[3]}")
+    else:
+        listing("Largest distance changes", diff["largest"],
+                lambda d: f"'{d[0]}' -> '{d[1]}': {d[2]} -> {d[3]} ({d[4]:+.1f} km)")
+
+    if args.patch:
+        print(f"\n==> Saved patch to '{args.patch}'")
+    print(f"\nLoaded in {(t1 - t0) * 1000:.1f} ms, compared in {(t2 - t1) * 1000:.1f} ms.")
+    identical = not (diff["changed"] or diff["cells_added"] or diff["cells_removed"])
+    print("IDENTICAL" if identical else "DIFFERENT")
+    return 0 if identical else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,211 @@
+import argparse
+import heapq
+import os
+import sys
+import time
+import numpy as np
+
+from country_directions import (
+    DEFAULT_RESOLUTION, NATURAL_EARTH_RESOLUTIONS, BOUNDARY_SAMPLERS, DEFAULT_SAMPLER, VALID_COUNTRIES,
+    geod, load_country_geometries, geometry_cache_file, sample_source_for, min_pair, SampleSource,
+    _screen_candidates, _unit_vectors, OUTPUT_DIR,
+)
+
+##############################################################################
+# PRE-RUN COST MODEL
+#
+# A pair costs a fixed overhead, a spherical screen over every sample pair
+# (nA * nB) and one geod.inv per candidate that survives the screen:
+#
+#   seconds = per_pair + per_screened * nA * nB + per_refined * candidates
+#
+# The three rates come from a micro-benchmark on this machine. The candidate
+# count is estimated by screening every STRIDE-th sample of both countries
+# and scaling by STRIDE^2 (the candidates form a band in sample-index space,
+# so they thin out with both strides). That pass screens ~1/STRIDE^2 of the
+# real work and takes a few seconds for the full matrix.
+#
+# The estimates are saved as a (names x names) matrix of seconds that the
+# work queue uses to cut equal-cost shards (work_queue.py plan --costs),
+# together with the resolution, sampler and geometry cache file they were
+# estimated for; loading them for anything else is an error.
+##############################################################################
+
+STRIDE = 8
+DEFAULT_COST_FILE = os.path.join(OUTPUT_DIR, "pair_costs.npz")
+
+
+def calibrate(repeats=3):
+    """
+    Measures the model's rates on this machine.
+
+    Returns:
+        dict: per_pair, per_screened and per_refined in seconds.
+    """
+    rng = np.random.default_rng(0)
+
+    def best_of(fn):
+        times = []
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - t0)
+        return min(times)
+
+    # Two far apart clusters: screening cost only, a handful of candidates
+    n = 700
+    vA = _unit_vectors(rng.uniform(0, 10, n), rng.uniform(0, 10, n))
+    vB = _unit_vectors(rng.uniform(100, 110, n), rng.uniform(40, 50, n))
+    per_screened = best_of(lambda: _screen_candidates(vA, vB)) / (n * n)
+
+    m = 100_000
+    lon1, lat1 = rng.uniform(-180, 180, m), rng.uniform(-80, 80, m)
+    lon2, lat2 = rng.uniform(-180, 180, m), rng.uniform(-80, 80, m)
+    per_refined = best_of(lambda: geod.inv(lon1, lat1, lon2, lat2)) / m
+
+    lon, lat = np.array([0.0]), np.array([0.0])
+    a, b = SampleSource("a", "points", lon, lat), SampleSource("b", "points", lon + 1, lat + 1)
+    per_pair = best_of(lambda: [min_pair(a, b) for _ in range(200)]) / 200
+    return {"per_pair": per_pair, "per_screened": per_screened, "per_refined": per_refined}
+
+
+def estimate_candidates(srcA, srcB, stride=STRIDE):
+    """Estimated number of screen survivors for a pair, from a strided screen."""
+    vA, vB = srcA.vectors[::stride], srcB.vectors[::stride]
+    ii, _, _ = _screen_candidates(vA, vB)
+    scale = (len(srcA) / len(vA)) * (len(srcB) / len(vB))
+    return min(len(ii) * scale, len(srcA) * len(srcB))
+
+
+def estimate_costs(names, sources, rates, stride=STRIDE):
+    """
+    Estimated seconds per pair (row < column; mirrored and diagonal cells are 0).
+
+    Returns:
+        tuple: (cost matrix, screened matrix, candidate matrix)
+    """
+    n = len(names)
+    cost, screened, candidates = np.zeros((n, n)), np.zeros((n, n)), np.zeros((n, n))
+    for i in range(n):
+        srcA = sources[names[i]]
+        for j in range(i + 1, n):
+            srcB = sources[names[j]]
+            if srcA is None or srcB is None:
+                continue
+            screened[i, j] = len(srcA) * len(srcB)
+            candidates[i, j] = estimate_candidates(srcA, srcB, stride)
+    mask = np.triu(np.ones((n, n), dtype=bool), k=1)
+    cost[mask] = (rates["per_pair"] + rates["per_screened"] * screened[mask]
+                  + rates["per_refined"] * candidates[mask])
+    return cost, screened, candidates
+
+
+def save_costs(file_path, names, cost, resolution=DEFAULT_RESOLUTION, sampler=DEFAULT_SAMPLER):
+    os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+    tmp = file_path + ".tmp.npz"
+    np.savez_compressed(tmp, names=np.array(names), cost=cost, resolution=np.array(resolution),
+                        sampler=np.array(sampler), geometry=np.array(os.path.basename(geometry_cache_file(resolution))))
+    os.replace(tmp, file_path)
+
+
+def load_costs(file_path, resolution=DEFAULT_RESOLUTION, sampler=DEFAULT_SAMPLER):
+    """
+    {(row, column): estimated seconds} for the pairs in a saved cost matrix.
+
+    Raises ValueError when the matrix was estimated for another resolution,
+    sampler or geometry (shapefile, rules or code changed since).
+    """
+    with np.load(file_path) as data:
+        saved = {key: str(data[key]) if key in data else None for key in ("resolution", "sampler", "geometry")}
+        names, cost = data["names"].tolist(), data["cost"]
+    expected = {"resolution": resolution, "sampler": sampler,
+                "geometry": os.path.basename(geometry_cache_file(resolution))}
+    stale = [f"{key} {saved[key]} (expected {expected[key]})" for key in expected if saved[key] != expected[key]]
+    if stale:
+        raise ValueError(f"'{file_path}' was estimated for other inputs: {', '.join(stale)}")
+    return {(a, b): float(cost[i, j]) for i, a in enumerate(names) for j, b in enumerate(names) if i < j}
+
+
+def shard_bounds(pair_cost, shards):
+    """
+    Cut points that split a sequence of pair costs into `shards` contiguous
+    runs of roughly equal total cost (empty runs dropped).
+    """
+    edges = np.searchsorted(np.cumsum(pair_cost), np.linspace(0, np.sum(pair_cost), shards + 1)[1:-1])
+    return [0] + sorted(set(edges.tolist()) - {0, len(pair_cost)}) + [len(pair_cost)]
+
+
+def makespan(costs, workers):
+    """Wall time of a longest-first greedy assignment of independent jobs to workers."""
+    loads = [0.0] * workers
+    for c in sorted(costs, reverse=True):
+        heapq.heapreplace(loads, loads[0] + c)
+    return max(loads)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dry run: estimate how long the direction matrix job will take.")
+    parser.add_argument("--resolution", choices=sorted(NATURAL_EARTH_RESOLUTIONS), default=DEFAULT_RESOLUTION)
+    parser.add_argument("--sampler", choices=sorted(BOUNDARY_SAMPLERS), default=DEFAULT_SAMPLER)
+    parser.add_argument("--workers", type=int, default=8, help="Project wall time for 1..WORKERS workers.")
+    parser.add_argument("--shards", type=int, default=64, help="Shard count the projection assumes (work_queue.py).")
+    parser.add_argument("--top", type=int, default=10, help="Most expensive pairs to list.")
+    parser.add_argument("--check", type=int, default=0, metavar="PAIRS",
+                        help="Also time this many random pairs for real and compare with the estimate.")
+    parser.add_argument("-o", "--output", default=DEFAULT_COST_FILE, help="Where to save the cost matrix.")
+    args = parser.parse_args()
+
+    t0 = time.time()
+    polygons = load_country_geometries(args.resolution)
+    names = sorted(VALID_COUNTRIES)
+    sources = {c: sample_source_for(c, polygons, sampler=args.sampler) for c in names}
+    setup = time.time() - t0
+    print(f"==> Geometry and sampling: {setup:.1f}s")
+
+    rates = calibrate()
+    print(f"==> Calibration: {rates['per_pair'] * 1e6:.0f} us per pair, {rates['per_screened'] * 1e9:.1f} ns per "
+          f"screened sample pair, {rates['per_refined'] * 1e9:.0f} ns per refined candidate")
+
+    t1 = time.time()
+    cost, screened, candidates = estimate_costs(names, sources, rates)
+    print(f"==> Estimated {len(names) * (len(names) - 1) // 2} pairs in {time.time() - t1:.1f}s "
+          f"({screened.sum() / 1e9:.2f}G screened, {candidates.sum() / 1e6:.1f}M refined)")
+
+    total = cost.sum()
+    upper = [(i, j) for i in range(len(names)) for j in range(i + 1, len(names))]
+    pair_cost = np.array([cost[i, j] for i, j in upper])
+    bounds = shard_bounds(pair_cost, args.shards)
+    shard_cost = [pair_cost[lo:hi].sum() for lo, hi in zip(bounds[:-1], bounds[1:])]
+    print(f"\nProjected compute: {total / 60:.1f} min single process (+{setup:.0f}s setup per worker)")
+    print(f"{'workers':>8} {'wall':>10} {'speedup':>8}")
+    for w in range(1, args.workers + 1):
+        wall = makespan(shard_cost, w) + setup
+        print(f"{w:>8} {wall / 60:>9.1f}m {(total + setup) / wall:>7.1f}x")
+
+    print(f"\nMost expensive pairs:")
+    order = np.argsort(pair_cost)[::-1][:args.top]
+    for k in order:
+        i, j = upper[k]
+        print(f"  {names[i]:<26} {names[j]:<26} {pair_cost[k]:7.2f}s  "
+              f"({screened[i, j] / 1e6:.1f}M screened, {candidates[i, j] / 1e3:.0f}k refined)")
+
+    if args.check:
+        rng = np.random.default_rng(0)
+        picked = rng.choice(len(upper), size=min(args.check, len(upper)), replace=False)
+        real = est = 0.0
+        for k in picked:
+            i, j = upper[k]
+            t2 = time.perf_counter()
+            min_pair(sources[names[i]], sources[names[j]])
+            real += time.perf_counter() - t2
+            est += pair_cost[k]
+        print(f"\nCheck on {len(picked)} random pairs: measured {real:.2f}s, estimated {est:.2f}s "
+              f"(ratio {real / max(est, 1e-9):.2f})")
+
+    save_costs(args.output, names, cost, args.resolution, args.sampler)
+    print(f"\n==> Saved cost matrix to '{args.output}'")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,31 @@
+import argparse
+import hashlib
+import inspect
 import json
+import pickle
+import struct
+import sys
 import time
 import os
 import math
+import numpy as np
+import shapely
 import geopandas as gpd
 from shapely.geometry import MultiPolygon, Polygon, Point
 from shapely.ops import unary_union
 from pyproj import Geod
 
+from witness_store import WitnessStore, DEFAULT_WITNESS_FILE
+
+# Data, cache and outputs live next to this file, whatever the working directory
+DIRECTION_DIR = os.path.dirname(os.path.abspath(__file__))
+OUTPUT_DIR = os.path.join(DIRECTION_DIR, "outputs")
+
+# Shared matrix helpers live one folder up, in Misc/
+sys.path.insert(0, os.path.dirname(DIRECTION_DIR))
+from matrix_io import OPPOSITE_DIRECTIONS
+from reverse_directions import reverse_all_directions
+
 ##############################################################################
 # 1) CONFIG & GLOBALS (PRESERVES YOUR ORIGINAL LOGIC)
 ##############################################################################
@@ -80,6 +99,7 @@ SYNONYM_MAP = {
     'democratic republic of congo': 'democratic republic of the congo',
     'congo, the democratic republic of': 'democratic republic of the congo',
     'drc': 'democratic republic of the congo',
+    'dr congo': 'democratic republic of the congo',
     'iran (islamic republic of)': 'iran',
     'iran, islamic republic of': 'iran',
     'gambia, the': 'gambia',
@@ -91,6 +111,7 @@ SYNONYM_MAP = {
     'venezuela (bolivarian republic of)': 'venezuela',
     'venezuela, bolivarian republic of': 'venezuela',
     'south sudan (republic of)': 'south sudan',
+    'czech republic (czechia)': 'czech republic',
 }
 
 # Sample sizes (preserved)
@@ -211,21 +232,248 @@ def azimuth_to_8dir(a):
 def direction_point_to_point(lon1, lat1, lon2, lat2):
     return azimuth_to_8dir(geodesic_forward_azimuth(lon1, lat1, lon2, lat2))
 
+##############################################################################
+# 2b) TWO-TIER MIN-PAIR KERNEL
+#
+# Almost every pair of boundary samples is far from the closest one, so all
+# pairs are first screened with a vectorized spherical distance and only the
+# pairs that could still be the WGS84 minimum are refined with geod.inv.
+# On a sphere of mean radius R the great-circle distance is within
+# SPHERE_ERROR of the ellipsoidal one (the local radii of curvature run from
+# 6335 km to 6400 km), so the true minimum always lies within
+# (1 + e) / (1 - e) of the smallest spherical distance. The refined pairs
+# keep the argument order and tie-breaking of the original nested loops, so
+# the selected pair and its sector are unchanged.
+##############################################################################
+
+EARTH_RADIUS_KM = 6371.0088
+SPHERE_ERROR = 0.0057
+SCREEN_SLACK_KM = 1e-4        # absolute slack for round-off at near-zero distances
+SCREEN_CHUNK_PAIRS = 2_000_000  # pairs screened per block (bounds peak memory)
+ANTIMERIDIAN_EPS = 1e-9         # degrees; edges on lon = +-180 closer than this are cut seams
+
+def _boundary_samples(poly, samples):
+    """
+    The samples+1 points the original loops took with b.interpolate(i*step),
+    as (lon, lat) arrays.
+    """
+    b = poly.boundary
+    step = b.length / samples
+    pts = shapely.line_interpolate_point(b, np.arange(samples+1) * step)
+    coords = shapely.get_coordinates(pts)
+    return coords[:, 0], coords[:, 1]
+
+def _boundary_segments(poly):
+    """
+    Every edge of every ring as (lon0, lat0, lon1, lat1) arrays, minus the
+    artificial seams Natural Earth adds where it cuts land at +-180 degrees.
+    """
+    coords, ring = shapely.get_coordinates(shapely.get_parts(poly.boundary), return_index=True)
+    same_ring = ring[1:] == ring[:-1]
+    lon0, lat0 = coords[:-1, 0][same_ring], coords[:-1, 1][same_ring]
+    lon1, lat1 = coords[1:, 0][same_ring], coords[1:, 1][same_ring]
+    seam = (np.abs(np.abs(lon0) - 180.0) < ANTIMERIDIAN_EPS) & (np.abs(lon1 - lon0) < ANTIMERIDIAN_EPS)
+    return lon0[~seam], lat0[~seam], lon1[~seam], lat1[~seam]
+
+def _geodesic_points_at(poly, fractions):
+    """
+    Points at the given fractions (0..1) of the boundary's WGS84 length, as (lon, lat).
+
+    Edge lengths come from geod.inv and points are placed with geod.fwd, so a
+    degree of Arctic coastline no longer weighs as much as a degree at the
+    equator, and an edge crossing +-180 follows the short geodesic instead of
+    wrapping around the globe. Rings are walked in the same order as
+    _boundary_samples. A point depends only on its own fraction.
+    """
+    lon0, lat0, lon1, lat1 = _boundary_segments(poly)
+    if len(lon0):
+        az, _, length = geod.inv(lon0, lat0, lon1, lat1)
+        az, length = np.asarray(az), np.asarray(length)
+        cum = np.concatenate(([0.0], np.cumsum(length)))
+    if len(lon0) == 0 or cum[-1] <= 0.0:
+        coords = shapely.get_coordinates(shapely.line_interpolate_point(poly.boundary, fractions, normalized=True))
+        return coords[:, 0], coords[:, 1]
+    targets = fractions * cum[-1]
+    # Segment holding each target; the end point belongs to the last non-empty edge
+    seg = np.searchsorted(cum, targets, side="right") - 1
+    seg = np.minimum(seg, np.nonzero(length > 0.0)[0][-1])
+    lon, lat, _ = geod.fwd(lon0[seg], lat0[seg], az[seg], targets - cum[seg])
+    return np.asarray(lon, dtype=np.float64), np.asarray(lat, dtype=np.float64)
+
+def _geodesic_boundary_samples(poly, samples):
+    """
+    samples+1 points at equal WGS84 spacing along the boundary, as (lon, lat).
+    """
+    return _geodesic_points_at(poly, np.arange(samples + 1) / samples)
+
+def radical_inverse(k):
+    """
+    Base-2 radical inverse (van der Corput sequence): 0, 1/2, 1/4, 3/4, 1/8, ...
+
+    Any prefix of the sequence is spread over [0, 1) with gaps that differ by at
+    most a factor of two, and the first 2^m terms are exactly the multiples of 2^-m.
+    """
+    k = np.asarray(k, dtype=np.uint64)
+    result = np.zeros(k.shape, dtype=np.float64)
+    scale = 0.5
+    while k.any():
+        result += (k & np.uint64(1)).astype(np.float64) * scale
+        k = k >> np.uint64(1)
+        scale *= 0.5
+    return result
+
+def _nested_boundary_samples(poly, samples):
+    """
+    `samples` points along the boundary in van der Corput order, at WGS84 spacing.
+
+    The set for budget n is the first n points of the set for any larger budget
+    (bit for bit), so raising a budget only adds points; see nested_pairs.py.
+    """
+    return _geodesic_points_at(poly, radical_inverse(np.arange(samples)))
+
+# name -> sampler(poly, samples) -> (lon, lat); "planar" is the original spacing by degrees
+BOUNDARY_SAMPLERS = {"planar": _boundary_samples, "geodesic": _geodesic_boundary_samples,
+                     "nested": _nested_boundary_samples}
+DEFAULT_SAMPLER = "planar"
+
+def _points_array(points):
+    arr = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    return arr[:, 0], arr[:, 1]
+
+def _unit_vectors(lon, lat):
+    lon_r, lat_r = np.radians(lon), np.radians(lat)
+    cos_lat = np.cos(lat_r)
+    return np.column_stack((cos_lat * np.cos(lon_r), cos_lat * np.sin(lon_r), np.sin(lat_r)))
+
+def _chord2_threshold(chord2_min):
+    """Works on a scalar or elementwise on an array of minima."""
+    d_min = 2.0 * EARTH_RADIUS_KM * np.arcsin(np.minimum(1.0, np.sqrt(chord2_min) / 2.0))
+    d_max = d_min * (1.0 + SPHERE_ERROR) / (1.0 - SPHERE_ERROR) + SCREEN_SLACK_KM
+    half_angle = np.minimum(np.pi / 2.0, d_max / (2.0 * EARTH_RADIUS_KM))
+    return (2.0 * np.sin(half_angle)) ** 2
+
+def _screen_candidates(vA, vB):
+    """
+    Returns the (i, j) index arrays of every pair whose spherical distance is
+    close enough to the spherical minimum to possibly be the WGS84 minimum.
+    """
+    rows = max(1, SCREEN_CHUNK_PAIRS // max(1, len(vB)))
+    best, kept = np.inf, []
+    for start in range(0, len(vA), rows):
+        block = vA[start:start+rows]
+        # chord^2 from coordinate differences: no cancellation for close points
+        chord2 = ((block[:, None, 0] - vB[None, :, 0]) ** 2
+                  + (block[:, None, 1] - vB[None, :, 1]) ** 2
+                  + (block[:, None, 2] - vB[None, :, 2]) ** 2)
+        best = min(best, float(chord2.min()))
+        limit = _chord2_threshold(best)
+        ii, jj = np.nonzero(chord2 <= limit)
+        kept.append((ii + start, jj, chord2[ii, jj]))
+    limit = _chord2_threshold(best)
+    ii = np.concatenate([k[0] for k in kept])
+    jj = np.concatenate([k[1] for k in kept])
+    c2 = np.concatenate([k[2] for k in kept])
+    keep = c2 <= limit
+    return ii[keep], jj[keep], c2[keep]
+
+def _nearest_pair(lonA, latA, lonB, latB, b_major=False, vA=None, vB=None, max_refine=None):
+    """
+    Index (i, j) and WGS84 distance (km) of the closest pair between two point sets.
+
+    Distances are geod.inv(A[i] -> B[j]). Ties go to the pair the original
+    nested loop met first: A-major order, or B-major when b_major is set.
+    Precomputed unit vectors can be passed as vA / vB. With max_refine only
+    the spherically closest max_refine candidates are refined, which is no
+    longer exact but bounds the cost of far-apart pairs (used by --preview).
+    """
+    if len(lonA) == 0 or len(lonB) == 0:
+        return None
+    vA = _unit_vectors(lonA, latA) if vA is None else vA
+    vB = _unit_vectors(lonB, latB) if vB is None else vB
+    ii, jj, c2 = _screen_candidates(vA, vB)
+    if max_refine and len(ii) > max_refine:
+        closest = np.argpartition(c2, max_refine - 1)[:max_refine]
+        ii, jj = ii[closest], jj[closest]
+    order = np.lexsort((ii, jj)) if b_major else np.lexsort((jj, ii))
+    ii, jj = ii[order], jj[order]
+    _, _, dist_m = geod.inv(lonA[ii], latA[ii], lonB[jj], latB[jj])
+    dist_km = np.asarray(dist_m) / 1000.0
+    k = int(np.argmin(dist_km))
+    return int(ii[k]), int(jj[k]), float(dist_km[k])
+
+##############################################################################
+# 2c) SAMPLE SOURCES
+#
+# Every country is one SampleSource: boundary samples of its filtered
+# polygons, or the fixed MICRONATION_COORDS points when it has no polygon.
+# Coordinates and unit vectors are computed once per country, and min_pair
+# serves polygon-polygon, point-point and both mixed cases with the same
+# kernel. As in the original loops, a point set is always the outer loop
+# (it wins ties), and distances are measured from the row country.
+##############################################################################
+
+class SampleSource:
+    __slots__ = ("name", "kind", "geometry", "lon", "lat", "vectors")
+
+    def __init__(self, name, kind, lon, lat, geometry=None):
+        self.name = name
+        self.kind = kind            # "polygon" or "points"
+        self.geometry = geometry    # the filtered polygon(s), None for point sets
+        self.lon = np.ascontiguousarray(lon, dtype=np.float64)
+        self.lat = np.ascontiguousarray(lat, dtype=np.float64)
+        self.vectors = _unit_vectors(self.lon, self.lat)
+
+    def __len__(self):
+        return len(self.lon)
+
+    @classmethod
+    def from_polygon(cls, name, poly, samples, sampler=DEFAULT_SAMPLER):
+        lon, lat = BOUNDARY_SAMPLERS[sampler](poly, samples)
+        return cls(name, "polygon", lon, lat, geometry=poly)
+
+    @classmethod
+    def from_points(cls, name, points):
+        lon, lat = _points_array(points)
+        return cls(name, "points", lon, lat)
+
+def sample_source_for(country, final_polygons, samples=None, sampler=DEFAULT_SAMPLER):
+    """
+    The SampleSource for a country: its polygons if it has any, else its
+    micronation points, else None ("unknown" in the matrix).
+    """
+    poly = final_polygons.get(country)
+    if poly is not None and not poly.is_empty:
+        return SampleSource.from_polygon(country, poly, samples or get_sample_size(country), sampler)
+    if country in MICRONATION_COORDS:
+        return SampleSource.from_points(country, MICRONATION_COORDS[country])
+    return None
+
+def min_pair(srcA, srcB, max_refine=None):
+    """
+    Closest pair (lonA, latA, lonB, latB) between two sample sources, or None.
+    """
+    if srcA is None or srcB is None:
+        return None
+    b_major = srcA.kind == "polygon" and srcB.kind == "points"
+    best = _nearest_pair(srcA.lon, srcA.lat, srcB.lon, srcB.lat, b_major=b_major,
+                         vA=srcA.vectors, vB=srcB.vectors, max_refine=max_refine)
+    if not best:
+        return None
+    i, j, _ = best
+    return (float(srcA.lon[i]), float(srcA.lat[i]), float(srcB.lon[j]), float(srcB.lat[j]))
+
+def direction_between(srcA, srcB):
+    best = min_pair(srcA, srcB)
+    if not best: return None
+    return direction_point_to_point(*best)
+
+# Per-case helpers, kept for callers that work with raw geometries
+
 def _minpair_polygon_to_polygon(polyA, polyB, samplesA, samplesB):
     if not polyA or polyA.is_empty or not polyB or polyB.is_empty:
         return None
-    bA, bB = polyA.boundary, polyB.boundary
-    stepA, stepB = bA.length / samplesA, bB.length / samplesB
-    ptsA = [(bA.interpolate(i*stepA).x, bA.interpolate(i*stepA).y) for i in range(samplesA+1)]
-    ptsB = [(bB.interpolate(j*stepB).x, bB.interpolate(j*stepB).y) for j in range(samplesB+1)]
-    best, min_d = None, float('inf')
-    for xA, yA in ptsA:
-        for xB, yB in ptsB:
-            d = geodesic_distance(xA, yA, xB, yB)
-            if d < min_d:
-                min_d = d
-                best = (xA, yA, xB, yB)
-    return best
+    return min_pair(SampleSource.from_polygon("A", polyA, samplesA),
+                    SampleSource.from_polygon("B", polyB, samplesB))
 
 def direction_polygon_to_polygon(polyA, polyB, samplesA, samplesB):
     best = _minpair_polygon_to_polygon(polyA, polyB, samplesA, samplesB)
@@ -235,16 +483,8 @@ def direction_polygon_to_polygon(polyA, polyB, samplesA, samplesB):
 
 def _minpair_point_to_polygon(lon, lat, poly, samples):
     if not poly or poly.is_empty: return None
-    b = poly.boundary
-    step = b.length / samples
-    best, min_d = None, float('inf')
-    for i in range(samples+1):
-        pt = b.interpolate(i*step)
-        d = geodesic_distance(pt.x, pt.y, lon, lat)
-        if d < min_d:
-            min_d = d
-            best = (pt.x, pt.y)
-    return best
+    best = min_pair(SampleSource.from_polygon("B", poly, samples), SampleSource.from_points("A", [(lon, lat)]))
+    return best[:2] if best else None
 
 def direction_point_to_polygon(lon, lat, poly, samples):
     tgt = _minpair_point_to_polygon(lon, lat, poly, samples)
@@ -252,32 +492,29 @@ def direction_point_to_polygon(lon, lat, poly, samples):
     xB, yB = tgt
     return direction_point_to_point(lon, lat, xB, yB)
 
+def _minpair_points_to_points(points1, points2):
+    return min_pair(SampleSource.from_points("A", points1), SampleSource.from_points("B", points2))
+
 def direction_multiple_points_to_multiple_points(points1, points2):
-    best, min_d = None, float('inf')
-    for x1, y1 in points1:
-        for x2, y2 in points2:
-            d = geodesic_distance(x1, y1, x2, y2)
-            if d < min_d:
-                min_d = d
-                best = (x1, y1, x2, y2)
+    best = _minpair_points_to_points(points1, points2)
     if not best: return None
-    x1, y1, x2, y2 = best
-    return direction_point_to_point(x1, y1, x2, y2)
+    return direction_point_to_point(*best)
+
+def _minpair_points_to_polygon(points, poly, samples):
+    return min_pair(SampleSource.from_points("A", points), SampleSource.from_polygon("B", poly, samples))
 
 def direction_multiple_points_to_polygon(points, poly, samples):
-    best, min_d = None, float('inf')
-    b = poly.boundary
-    step = b.length / samples
-    bpts = [(b.interpolate(i*step).x, b.interpolate(i*step).y) for i in range(samples+1)]
-    for x1, y1 in points:
-        for x2, y2 in bpts:
-            d = geodesic_distance(x1, y1, x2, y2)
-            if d < min_d:
-                min_d = d
-                best = (x1, y1, x2, y2)
+    best = _minpair_points_to_polygon(points, poly, samples)
     if not best: return None
-    x1, y1, x2, y2 = best
-    return direction_point_to_point(x1, y1, x2, y2)
+    return direction_point_to_point(*best)
+
+def _minpair_polygon_to_points(poly, points, samples):
+    return min_pair(SampleSource.from_polygon("A", poly, samples), SampleSource.from_points("B", points))
+
+def direction_polygon_to_multiple_points(poly, points, samples):
+    best = _minpair_polygon_to_points(poly, points, samples)
+    if not best: return None
+    return direction_point_to_point(*best)
 
 def create_geodesic_buffer(lon, lat, radius_km, num_points=360):
     angles = list(range(0, 360, max(1, int(360/num_points))))
@@ -398,144 +635,613 @@ def normalize_name(raw):
     return ""
 
 ##############################################################################
-# 5) MAIN: ALL-PAIRS 8-DIRECTION MATRIX (WITH PROGRESS)
+# 4b) GEOMETRY LOADING (RESOLUTION OPTION + SIMPLIFICATION CACHE)
+#
+# 50m/10m Natural Earth files keep small islands and coastlines that 110m
+# drops, but carry far more vertices than the boundary sampling can resolve.
+# Each country is filtered first and then simplified (topology-preserving)
+# at a fraction of the sample spacing of what is left, and the result is
+# cached keyed on the shapefile contents and the rules, so repeat runs skip
+# the shapefile entirely.
+#
+# Countries are simplified one at a time, so a shared border can move by up
+# to the tolerance on each side and open a sliver gap or overlap between
+# neighbours. The tolerance is kept far below the spacing: the border then
+# moves much less than the samples themselves are apart, which already
+# bounds how closely a touching pair is resolved.
 ##############################################################################
 
-def main():
-    shapefile_path = os.path.join(".", "data", "ne_110m_admin_0_countries.shp")
-    output_file = os.path.join(".", "outputs", "country_directions.json")
-    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+NATURAL_EARTH_RESOLUTIONS = {
+    '110m': {'simplify': False},  # kept as-is so 110m output is unchanged
+    '50m':  {'simplify': True},
+    '10m':  {'simplify': True},
+}
+DEFAULT_RESOLUTION = '110m'
 
-    print("==> Loading shapefile ...")
-    gdf = gpd.read_file(shapefile_path)
-    if gdf.crs and gdf.crs.to_string() != "EPSG:4326":
-        print("==> Reprojecting to EPSG:4326 ...")
-        gdf = gdf.to_crs(epsg=4326)
+# Simplification tolerance as a fraction of the country's sample spacing
+SIMPLIFY_FRACTION = 0.02
+
+GEOMETRY_CACHE_DIR = os.path.join(DIRECTION_DIR, "cache")
+GEOMETRY_CACHE_FORMAT = 2   # WKB per country behind an offset header (write_geometry_cache)
+
+def shapefile_path_for(resolution):
+    return os.path.join(DIRECTION_DIR, "data", f"ne_{resolution}_admin_0_countries.shp")
+
+def simplify_for_sampling(geom, country):
+    spacing = geom.boundary.length / get_sample_size(country)
+    return geom.simplify(spacing * SIMPLIFY_FRACTION, preserve_topology=True)
 
+def _geometry_cache_key(shapefile_path, resolution):
+    h = hashlib.sha256()
+    base = os.path.splitext(shapefile_path)[0]
+    for ext in (".shp", ".shx", ".dbf", ".prj"):
+        if os.path.exists(base + ext):
+            with open(base + ext, "rb") as f:
+                h.update(f.read())
+    # Rule and code changes invalidate the cache as well
+    for part in (GEOMETRY_CACHE_FORMAT, resolution, SIMPLIFY_FRACTION, NATURAL_EARTH_RESOLUTIONS[resolution],
+                 sorted(VALID_COUNTRIES), SYNONYM_MAP, SAMPLE_SIZE_MAP, DEFAULT_SAMPLE_SIZE,
+                 POLYGON_SELECTION_RULES, inspect.getsource(filter_polygons),
+                 inspect.getsource(normalize_name), inspect.getsource(simplify_for_sampling),
+                 inspect.getsource(prepare_country_geometry)):
+        h.update(repr(part).encode("utf-8"))
+    return h.hexdigest()[:16]
+
+def _country_name_columns(gdf):
     possible_name_cols = [
         "ADMIN","NAME","NAME_LONG","SOVEREIGNT","BRK_NAME","FORMAL_EN","GEOUNIT","GU_A3","ISO_A3","ISO_A2"
     ]
     found_cols = [c for c in possible_name_cols if c in gdf.columns]
     if not found_cols:
         raise ValueError("No known name columns found in the shapefile.")
+    return found_cols
+
+def _row_country(row, found_cols):
+    for c in found_cols:
+        nm = normalize_name(row[c])
+        if nm in VALID_COUNTRIES:
+            return nm
+    return ""
+
+def index_country_rows(shapefile_path):
+    """
+    Shapefile row numbers per normalized country name, from the attribute
+    table only (no geometry is parsed).
+    """
+    attrs = gpd.read_file(shapefile_path, ignore_geometry=True)
+    found_cols = _country_name_columns(attrs)
+    index = {}
+    for idx, (_, row) in enumerate(attrs.iterrows()):
+        nm = _row_country(row, found_cols)
+        if nm:
+            index.setdefault(nm, []).append(idx)
+    return index
 
-    def extract_country(row):
-        for c in found_cols:
-            nm = normalize_name(row[c])
-            if nm in VALID_COUNTRIES:
-                return nm
-        return ""
+def read_country_rows(shapefile_path, rows=None):
+    """
+    Raw shapefile geometries grouped by normalized country name, in row order.
+    With `rows` (row numbers from index_country_rows) only those rows are read.
+    """
+    verbose = rows is None
+    if verbose:
+        print("==> Loading shapefile ...")
+        gdf = gpd.read_file(shapefile_path)
+    else:
+        gdf = gpd.read_file(shapefile_path, fids=sorted(rows))
+    if gdf.crs and gdf.crs.to_string() != "EPSG:4326":
+        if verbose:
+            print("==> Reprojecting to EPSG:4326 ...")
+        gdf = gdf.to_crs(epsg=4326)
 
+    found_cols = _country_name_columns(gdf)
     total = len(gdf)
-    print(f"==> Found {total} rows. Extracting and filtering polygons ...")
+    if verbose:
+        print(f"==> Found {total} rows. Extracting polygons ...")
 
-    country_geoms = {}
+    grouped = {}
     for idx, (_, row) in enumerate(gdf.iterrows(), start=1):
-        if idx == 1 or idx % 20 == 0 or idx == total:
+        if verbose and (idx == 1 or idx % 20 == 0 or idx == total):
             print(f"   [geom {idx}/{total}] parsing ...")
-        nm = extract_country(row)
-        if not nm:
-            continue
-        filtered = filter_polygons(row.geometry, nm)
+        nm = _row_country(row, found_cols)
+        if nm:
+            grouped.setdefault(nm, []).append(row.geometry)
+    return grouped
+
+def prepare_country_geometry(country, raw_geoms, simplify=False):
+    """
+    Applies the mainland rules to a country's raw rows, unions the result and
+    simplifies it when asked. Simplifying after filtering keeps dropped
+    overseas parts out of the sample spacing.
+    """
+    prepared = None
+    for geom in raw_geoms:
+        filtered = filter_polygons(geom, country)
         if filtered and not filtered.is_empty:
-            if nm not in country_geoms:
-                country_geoms[nm] = filtered
-            else:
-                country_geoms[nm] = unary_union([country_geoms[nm], filtered])
+            prepared = filtered if prepared is None else unary_union([prepared, filtered])
+    if simplify and prepared is not None:
+        prepared = simplify_for_sampling(prepared, country)
+    return prepared
+
+def _build_country_geometries(shapefile_path, simplify):
+    rows = read_country_rows(shapefile_path)
+    print("==> Filtering polygons ...")
+    country_geoms = {}
+    for nm, raw_geoms in rows.items():
+        prepared = prepare_country_geometry(nm, raw_geoms, simplify)
+        if prepared is not None:
+            country_geoms[nm] = prepared
+    return country_geoms
+
+def geometry_cache_file(resolution):
+    return os.path.join(GEOMETRY_CACHE_DIR,
+                        f"geoms_{resolution}_{_geometry_cache_key(shapefile_path_for(resolution), resolution)}.pkl")
+
+def write_geometry_cache(cache_file, country_geoms):
+    """
+    Writes each country's geometry as WKB behind a {country: (offset, size)}
+    header, so a single country can be read without loading the whole file.
+    """
+    blobs = {c: shapely.to_wkb(g) for c, g in country_geoms.items()}
+    index, offset = {}, 0
+    for c, blob in blobs.items():
+        index[c] = (offset, len(blob))
+        offset += len(blob)
+    header = pickle.dumps(index)
+    os.makedirs(os.path.dirname(cache_file) or ".", exist_ok=True)
+    tmp = cache_file + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(struct.pack("<Q", len(header)))
+        f.write(header)
+        for blob in blobs.values():
+            f.write(blob)
+    os.replace(tmp, cache_file)
+
+def read_geometry_cache(cache_file, countries=None):
+    """
+    {country: WKB bytes} from a geometry cache; only the requested countries
+    are read when `countries` is given (missing ones are left out).
+    """
+    with open(cache_file, "rb") as f:
+        (header_size,) = struct.unpack("<Q", f.read(8))
+        index = pickle.loads(f.read(header_size))
+        base = 8 + header_size
+        wanted = index if countries is None else [c for c in countries if c in index]
+        wkb = {}
+        for c in wanted:
+            offset, size = index[c]
+            f.seek(base + offset)
+            wkb[c] = f.read(size)
+    return wkb
+
+def load_country_geometries(resolution=DEFAULT_RESOLUTION, use_cache=True):
+    """
+    Filtered geometry for every valid country (None -> micronation fallback).
+
+    Args:
+        resolution (str): '110m', '50m' or '10m' Natural Earth admin-0 countries.
+        use_cache (bool): Reuse / write the cached result in GEOMETRY_CACHE_DIR.
+    """
+    if resolution not in NATURAL_EARTH_RESOLUTIONS:
+        raise ValueError(f"Unknown resolution '{resolution}', expected one of {sorted(NATURAL_EARTH_RESOLUTIONS)}")
+    shapefile_path = shapefile_path_for(resolution)
+    if not os.path.exists(shapefile_path):
+        raise FileNotFoundError(f"Shapefile not found: {shapefile_path} (download the Natural Earth "
+                                f"{resolution} admin-0 countries into {os.path.dirname(shapefile_path)})")
+
+    cache_file = geometry_cache_file(resolution)
+    if use_cache and os.path.exists(cache_file):
+        print(f"==> Using cached geometry '{cache_file}'")
+        country_geoms = {c: shapely.from_wkb(b) for c, b in read_geometry_cache(cache_file).items()}
+    else:
+        simplify = NATURAL_EARTH_RESOLUTIONS[resolution]['simplify']
+        country_geoms = _build_country_geometries(shapefile_path, simplify)
+        if use_cache:
+            write_geometry_cache(cache_file, country_geoms)
 
     # Ensure we have entries for the full set (some None -> micronation fallback)
-    final_polygons = {c: country_geoms.get(c, None) for c in VALID_COUNTRIES}
+    return {c: country_geoms.get(c, None) for c in VALID_COUNTRIES}
+
+##############################################################################
+# 4c) PREVIEW MODE
+#
+# The same pass with a few hundred samples per country and only the closest
+# spherical candidates refined, written next to the full matrix instead of
+# over it, plus a report of how far it is from the last full run. Sectors
+# are compared on every off-diagonal cell; distances need the witness store
+# of the full run.
+##############################################################################
+
+PREVIEW_SAMPLES = 200
+PREVIEW_REFINE = 32     # spherically closest candidates refined on WGS84 per pair
+PREVIEW_OUTPUT_FILE = os.path.join(OUTPUT_DIR, "country_directions_preview.json")
+
+def parse_preview_samples(raw):
+    """argparse type for --preview: a sample count of at least 1."""
+    try:
+        samples = int(raw)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a number of samples, got '{raw}'")
+    if samples < 1:
+        raise argparse.ArgumentTypeError(f"needs at least 1 sample per country, got {samples}")
+    return samples
+
+def preview_report(direction_map, witnesses, reference_file, reference_witness_file):
+    print("\n--- Preview Agreement Report ---")
+    try:
+        with open(reference_file, "r", encoding="utf-8") as f:
+            reference = json.load(f)
+    except FileNotFoundError:
+        print(f"No full matrix at '{reference_file}' to compare against.")
+        return
+
+    same = total = 0
+    flips = {}
+    for c1, row in direction_map.items():
+        for c2, sector in row.items():
+            if c1 == c2 or c1 not in reference or c2 not in reference[c1]:
+                continue
+            total += 1
+            if reference[c1][c2] == sector:
+                same += 1
+            else:
+                key = f"{reference[c1][c2]} -> {sector}"
+                flips[key] = flips.get(key, 0) + 1
+    print(f"Identical sectors: {same}/{total} ({100.0 * same / max(total, 1):.2f}%)")
+    for key, count in sorted(flips.items(), key=lambda kv: -kv[1])[:8]:
+        print(f"  {key:<16} {count}")
+
+    try:
+        full = WitnessStore.load(reference_witness_file)
+    except FileNotFoundError:
+        print(f"No witness store at '{reference_witness_file}', skipping the distance comparison.")
+        return
+    if full.names != witnesses.names:
+        print("The witness store was built for a different country set, skipping the distance comparison.")
+        return
+    known = ~np.isnan(full.dist_km) & ~np.isnan(witnesses.dist_km)
+    error = (witnesses.dist_km - full.dist_km)[known]
+    print(f"Distance error over {error.size} pairs (preview - full, km):")
+    print(f"  mean {error.mean():8.2f}   median {np.median(error):8.2f}")
+    for q in (90, 99):
+        print(f"  p{q:<4}{np.percentile(np.abs(error), q):8.2f}")
+    print(f"  max  {np.abs(error).max():8.2f}")
+    print(f"  within 1 km: {100.0 * np.mean(np.abs(error) <= 1.0):.1f}%   within 10 km: {100.0 * np.mean(np.abs(error) <= 10.0):.1f}%")
+
+##############################################################################
+# 4d) DIRECTION LAYERS
+#
+# Other definitions of "which way is B from A", computed in the same pass
+# from the same filtered geometry and sample sources as the nearest-boundary
+# matrix. Each layer is an anchor (what a country is reduced to, built once
+# per country) and a pair kernel returning the bearing A -> B and B -> A, so
+# a new definition costs its anchors plus one kernel call per pair:
+#
+#   centroid        area-weighted centroid of the parts, on the sphere
+#   representative  a point guaranteed inside the largest part
+#   mean_bearing    weighted circular mean of the bearings between
+#                   area-weighted interior points of both countries
+#
+# Point-set countries use the mean of their points, their first point and all
+# points with equal weights. Unlike the nearest-boundary matrix, the reverse
+# cell is the true bearing back (not the opposite sector).
+##############################################################################
+
+AREA_POINTS = 64        # interior points per country for mean_bearing
+LAYER_FILE = os.path.join(OUTPUT_DIR, "country_direction_layers.npz")
+PREVIEW_LAYER_FILE = os.path.join(OUTPUT_DIR, "country_direction_layers_preview.npz")
+
+def _polygon_parts(poly):
+    parts = [p for p in getattr(poly, "geoms", [poly]) if not p.is_empty]
+    # cos(lat) turns square degrees into comparable areas
+    weights = np.array([p.area * math.cos(math.radians(p.centroid.y)) for p in parts])
+    return parts, weights
+
+def _mean_direction(vectors, weights):
+    v = (np.asarray(vectors) * np.asarray(weights)[:, None]).sum(axis=0)
+    return math.degrees(math.atan2(v[1], v[0])), math.degrees(math.atan2(v[2], math.hypot(v[0], v[1])))
+
+def centroid_anchor(src):
+    if src.kind == "points":
+        return _mean_direction(src.vectors, np.ones(len(src)))
+    parts, weights = _polygon_parts(src.geometry)
+    c = [p.centroid for p in parts]
+    return _mean_direction(_unit_vectors(np.array([p.x for p in c]), np.array([p.y for p in c])), weights)
+
+def representative_anchor(src):
+    if src.kind == "points":
+        return float(src.lon[0]), float(src.lat[0])
+    parts, weights = _polygon_parts(src.geometry)
+    p = parts[int(np.argmax(weights))].representative_point()
+    return p.x, p.y
+
+def area_anchor(src):
+    """
+    (lon, lat, weight) of about AREA_POINTS interior grid points, each weighted
+    by the area of its cell.
+
+    Cells are step x step degrees at the part's middle latitude, where the
+    longitude step is widened by 1 / cos(mid_lat); a cell at latitude y then
+    covers cos(y) / cos(mid_lat) square steps, the unit the fallback for
+    parts smaller than a cell uses as well.
+    """
+    if src.kind == "points":
+        return src.lon, src.lat, np.full(len(src), 1.0 / len(src))
+    parts, weights = _polygon_parts(src.geometry)
+    step = math.sqrt(weights.sum() / AREA_POINTS)
+    lons, lats, ws = [], [], []
+    for part, part_weight in zip(parts, weights):
+        minx, miny, maxx, maxy = part.bounds
+        mid_cos = max(math.cos(math.radians((miny + maxy) / 2.0)), 0.05)
+        lon_step = step / mid_cos
+        x, y = np.meshgrid(np.arange(minx + lon_step / 2, maxx, lon_step), np.arange(miny + step / 2, maxy, step))
+        inside = shapely.contains_xy(part, x, y)
+        if inside.any():
+            lons.append(x[inside]); lats.append(y[inside])
+            ws.append(np.cos(np.radians(y[inside])) / mid_cos)
+        else:   # smaller than one cell: its representative point carries its area
+            p = part.representative_point()
+            lons.append([p.x]); lats.append([p.y]); ws.append([part_weight / (step * step)])
+    w = np.concatenate(ws)
+    return np.concatenate(lons), np.concatenate(lats), w / w.sum()
+
+def point_bearings(a, b):
+    fwd_az, back_az, _ = geod.inv(a[0], a[1], b[0], b[1])
+    return fwd_az, back_az
+
+def _spherical_bearings(lon1, lat1, lon2, lat2):
+    l1, p1, l2, p2 = map(np.radians, (lon1, lat1, lon2, lat2))
+    dl = l2 - l1
+    return np.arctan2(np.sin(dl) * np.cos(p2), np.cos(p1) * np.sin(p2) - np.sin(p1) * np.cos(p2) * np.cos(dl))
+
+def mean_bearings(a, b):
+    """
+    Weighted circular mean of the (spherical) bearings A -> B and B -> A over
+    every pair of interior points.
+    """
+    (lonA, latA, wA), (lonB, latB, wB) = a, b
+    w = wA[:, None] * wB[None, :]
+    fwd = _spherical_bearings(lonA[:, None], latA[:, None], lonB[None, :], latB[None, :])
+    back = _spherical_bearings(lonB[None, :], latB[None, :], lonA[:, None], latA[:, None])
+    return (math.degrees(math.atan2((w * np.sin(fwd)).sum(), (w * np.cos(fwd)).sum())),
+            math.degrees(math.atan2((w * np.sin(back)).sum(), (w * np.cos(back)).sum())))
+
+DIRECTION_LAYERS = {
+    "centroid": (centroid_anchor, point_bearings),
+    "representative": (representative_anchor, point_bearings),
+    "mean_bearing": (area_anchor, mean_bearings),
+}
+
+class DirectionLayers:
+    """
+    Bearing matrices (degrees, NaN without geometry) for the selected layers.
+
+        layers = DirectionLayers(names, sources, ["centroid"])
+        layers.compute(i, j)          # fills [i, j] and [j, i]
+        layers.direction_map("centroid")
+    """
+
+    def __init__(self, names, sources, layers):
+        self.names = list(names)
+        n = len(self.names)
+        self.anchors = {layer: [None if sources[c] is None else DIRECTION_LAYERS[layer][0](sources[c])
+                                for c in self.names] for layer in layers}
+        self.bearings = {layer: np.full((n, n), np.nan) for layer in layers}
+
+    def compute(self, i, j):
+        for layer, anchors in self.anchors.items():
+            if anchors[i] is not None and anchors[j] is not None:
+                fwd_az, back_az = DIRECTION_LAYERS[layer][1](anchors[i], anchors[j])
+                self.bearings[layer][i, j] = (fwd_az + 360.0) % 360.0
+                self.bearings[layer][j, i] = (back_az + 360.0) % 360.0
+
+    def direction_map(self, layer):
+        bearings = self.bearings[layer]
+        return {c1: {c2: None if i == j else "unknown" if np.isnan(bearings[i, j]) else azimuth_to_8dir(bearings[i, j])
+                     for j, c2 in enumerate(self.names)} for i, c1 in enumerate(self.names)}
+
+    def save(self, file_path=LAYER_FILE, preview=False):
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        tmp = file_path + ".tmp.npz"
+        np.savez_compressed(tmp, names=np.array(self.names), **self.bearings)
+        os.replace(tmp, file_path)
+        for layer in self.bearings:
+            with open(layer_output_file(layer, preview), "w", encoding="utf-8") as f:
+                json.dump(self.direction_map(layer), f, indent=2)
+
+def layer_output_file(layer, preview=False):
+    suffix = "_preview" if preview else ""
+    return os.path.join(OUTPUT_DIR, f"country_directions_{layer}{suffix}.json")
+
+def parse_layers(raw):
+    layers = list(DIRECTION_LAYERS) if raw == "all" else [s.strip() for s in raw.split(",") if s.strip()]
+    unknown = [layer for layer in layers if layer not in DIRECTION_LAYERS]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown layer(s) {', '.join(unknown)}; choose from {', '.join(DIRECTION_LAYERS)} or 'all'")
+    return layers
+
+##############################################################################
+# 4e) PRIORITY ORDER
+#
+# Only the data.json countries can be answers, and the game only reads the
+# answer's row. With --priority the rows of the given countries are computed
+# first (in the given order), a partial matrix holding every pair that
+# touches one of them is published, and the remaining rows follow. Every
+# pair is still computed from its alphabetically first country and mirrored,
+# so the final matrix is identical to an alphabetical run.
+#
+# Like outputs/country_directions.json, the partial matrix is in the
+# generator's orientation. The game reads the reversed matrix (the
+# reverse_directions pipeline stage), so a reversed copy is written next to
+# it, ready to stand in for backend/country_directions.json.
+##############################################################################
+
+DEFAULT_PRIORITY_FILE = os.path.join(os.path.dirname(os.path.dirname(DIRECTION_DIR)), "data.json")
+PARTIAL_OUTPUT_FILE = os.path.join(OUTPUT_DIR, "country_directions_partial.json")
+PARTIAL_GAME_FILE = os.path.join(OUTPUT_DIR, "country_directions_partial_reversed.json")
+
+def load_priority(source):
+    """
+    Country names in priority order from a JSON list, a JSON object (its keys,
+    as in data.json) or a text file with one name per line. Names without a
+    matrix row are reported and skipped.
+    """
+    with open(source, "r", encoding="utf-8") as f:
+        raw = json.load(f) if source.endswith(".json") else [line for line in f.read().splitlines() if line.strip()]
+    names, skipped = [], []
+    for name in raw:
+        country = normalize_name(name)
+        if not country:
+            skipped.append(str(name))
+        elif country not in names:
+            names.append(country)
+    if skipped:
+        print(f"==> Priority: no matrix row for {', '.join(skipped)}")
+    return names
+
+def save_partial(direction_map, names, file_path, game_file=None):
+    partial = {c1: {c2: direction_map[c1][c2] for c2 in names if c2 in direction_map[c1]}
+               for c1 in names if direction_map[c1]}
+    outputs = [(file_path, partial)]
+    if game_file:
+        outputs.append((game_file, reverse_all_directions(partial)))
+    # An interrupt mid-write keeps the previous partial instead of a truncated one
+    for path, data in outputs:
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp, path)
+
+##############################################################################
+# 5) MAIN: ALL-PAIRS 8-DIRECTION MATRIX (WITH PROGRESS)
+##############################################################################
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute the all-pairs 8-direction matrix.")
+    parser.add_argument("--resolution", choices=sorted(NATURAL_EARTH_RESOLUTIONS), default=DEFAULT_RESOLUTION,
+                        help="Natural Earth boundary resolution (50m/10m are simplified to the sample spacing).")
+    parser.add_argument("--no-cache", action="store_true", help="Rebuild the filtered geometry from the shapefile.")
+    parser.add_argument("--sampler", choices=sorted(BOUNDARY_SAMPLERS), default=DEFAULT_SAMPLER,
+                        help="Boundary sample spacing: 'planar' (by degrees, as before) or 'geodesic' (equal WGS84 spacing).")
+    parser.add_argument("--preview", type=parse_preview_samples, nargs="?", const=PREVIEW_SAMPLES, metavar="SAMPLES",
+                        help=f"Quick approximate matrix with this many samples per country (default {PREVIEW_SAMPLES}), "
+                             "compared against the last full run instead of replacing it.")
+    parser.add_argument("--layers", type=parse_layers, default=[], metavar="LAYERS",
+                        help=f"Also compute these direction definitions in the same pass: comma-separated from "
+                             f"{', '.join(DIRECTION_LAYERS)}, or 'all'.")
+    parser.add_argument("--priority", nargs="?", const=DEFAULT_PRIORITY_FILE, metavar="FILE",
+                        help="Compute these countries' rows first and publish a partial matrix when they are done "
+                             "(JSON list / object keys or one name per line; default: the data.json answers).")
+    args = parser.parse_args()
+
+    output_file = os.path.join(OUTPUT_DIR, "country_directions.json")
+    witness_file = DEFAULT_WITNESS_FILE
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    if args.preview is not None:
+        output_file = PREVIEW_OUTPUT_FILE
+
+    try:
+        final_polygons = load_country_geometries(args.resolution, use_cache=not args.no_cache)
+    except FileNotFoundError as e:
+        print(f"Error: {e}")
+        return
 
     # Prepare matrix
     all_countries_sorted = sorted(VALID_COUNTRIES)
     N = len(all_countries_sorted)
     direction_map = {c: {} for c in all_countries_sorted}
+    witnesses = WitnessStore(all_countries_sorted)
+
+    print("\n==> Sampling boundaries ...")
+    sources = {c: sample_source_for(c, final_polygons, samples=args.preview, sampler=args.sampler)
+               for c in all_countries_sorted}
+    layers = DirectionLayers(all_countries_sorted, sources, args.layers) if args.layers else None
+    try:
+        priority = load_priority(args.priority) if args.priority else []
+    except FileNotFoundError as e:
+        print(f"Error: The file '{e.filename}' was not found.")
+        return
 
     print(f"\n==> Computing pairwise directions among {N} countries ...")
     t0 = time.time()
 
-    for i, c1 in enumerate(all_countries_sorted, start=1):
-        poly1 = final_polygons[c1]
-        s1 = get_sample_size(c1)
+    index = {c: k for k, c in enumerate(all_countries_sorted)}
+    row_order = priority + [c for c in all_countries_sorted if c not in priority]
+    done = set()
 
+    for step, c1 in enumerate(row_order, start=1):
         # progress banner per row
-        print(f"[{i}/{N}] {c1} -> others ...", flush=True)
-
-        for j, c2 in enumerate(all_countries_sorted, start=1):
-            # Mirror if we already computed c2->c1
-            if j < i:
-                prev = direction_map[c2].get(c1, None)
-                # Opposite sector for the reverse direction (if known)
-                if   prev == "N":  direction_map[c1][c2] = "S"
-                elif prev == "NE": direction_map[c1][c2] = "SW"
-                elif prev == "E":  direction_map[c1][c2] = "W"
-                elif prev == "SE": direction_map[c1][c2] = "NW"
-                elif prev == "S":  direction_map[c1][c2] = "N"
-                elif prev == "SW": direction_map[c1][c2] = "NE"
-                elif prev == "W":  direction_map[c1][c2] = "E"
-                elif prev == "NW": direction_map[c1][c2] = "SE"
-                else:               direction_map[c1][c2] = prev  # None/unknown
-                continue
+        if args.preview is None:
+            print(f"[{step}/{N}] {c1} -> others ...", flush=True)
+        direction_map[c1][c1] = None
 
-            if c1 == c2:
-                direction_map[c1][c2] = None
+        for c2 in all_countries_sorted:
+            # Cells with a finished row were filled when that row ran
+            if c2 == c1 or c2 in done:
                 continue
+            # Always computed from the alphabetically first country, the other way is mirrored
+            i, j = sorted((index[c1], index[c2]))
+            ca, cb = all_countries_sorted[i], all_countries_sorted[j]
 
-            poly2 = final_polygons[c2]
-            s2 = get_sample_size(c2)
-
-            # A) Both polygons
-            if poly1 is not None and poly2 is not None:
-                d8 = direction_polygon_to_polygon(poly1, poly2, s1, s2)
-                direction_map[c1][c2] = d8 if d8 is not None else "unknown"
-
-            # B) Both micronations
-            elif (c1 in MICRONATION_COORDS) and (c2 in MICRONATION_COORDS):
-                d8 = direction_multiple_points_to_multiple_points(
-                    MICRONATION_COORDS[c1], MICRONATION_COORDS[c2]
-                )
-                direction_map[c1][c2] = d8 if d8 is not None else "unknown"
-
-            # C) c1 polygon, c2 micronation
-            elif poly1 is not None and (c2 in MICRONATION_COORDS):
-                b = poly1.boundary
-                step = b.length / s1
-                bpts = [(b.interpolate(k*step).x, b.interpolate(k*step).y) for k in range(s1+1)]
-                best, min_d = None, float('inf')
-                for x2, y2 in MICRONATION_COORDS[c2]:
-                    for xA, yA in bpts:
-                        d = geodesic_distance(xA, yA, x2, y2)
-                        if d < min_d:
-                            min_d = d
-                            best = (xA, yA, x2, y2)
-                if best:
-                    xA, yA, xB, yB = best
-                    direction_map[c1][c2] = direction_point_to_point(xA, yA, xB, yB)
-                else:
-                    direction_map[c1][c2] = "unknown"
-
-            # D) c1 micronation, c2 polygon
-            elif (c1 in MICRONATION_COORDS) and poly2 is not None:
-                pts1 = MICRONATION_COORDS[c1]
-                d8 = direction_multiple_points_to_polygon(pts1, poly2, s2)
-                direction_map[c1][c2] = d8 if d8 is not None else "unknown"
+            # Polygon samples or micronation points, one kernel for all four cases
+            best = min_pair(sources[ca], sources[cb],
+                            max_refine=PREVIEW_REFINE if args.preview is not None else None)
 
+            if best:
+                # One inv call gives the sector and everything the witness store keeps
+                fwd_az, back_az, dist_m = geod.inv(*best)
+                direction_map[ca][cb] = azimuth_to_8dir((fwd_az + 360.0) % 360.0)
+                witnesses.record(i, j, best, fwd_az, back_az, dist_m / 1000.0)
             else:
-                direction_map[c1][c2] = "unknown"
+                direction_map[ca][cb] = "unknown"
+
+            # Opposite sector for the reverse direction (if known)
+            prev = direction_map[ca][cb]
+            direction_map[cb][ca] = OPPOSITE_DIRECTIONS.get(prev, prev)  # None/unknown stay as they are
+            witnesses.mirror(j, i)
+            if layers:
+                layers.compute(i, j)
+        done.add(c1)
+
+        if step == len(priority) and args.preview is None:
+            save_partial(direction_map, all_countries_sorted, PARTIAL_OUTPUT_FILE, PARTIAL_GAME_FILE)
+            print(f"==> Priority rows done in ~{time.time() - t0:.1f}s, saved partial matrix to "
+                  f"'{PARTIAL_OUTPUT_FILE}' (game orientation: '{PARTIAL_GAME_FILE}')", flush=True)
 
         # small heartbeat every few rows
-        if i % 10 == 0 or i == N:
+        if step % 10 == 0 or step == N:
             elapsed = time.time() - t0
-            print(f"   ...completed {i}/{N} rows in ~{elapsed:.1f}s", flush=True)
+            print(f"   ...completed {step}/{N} rows in ~{elapsed:.1f}s", flush=True)
+
+    # Rows and columns in alphabetical order, whatever order they were computed in
+    direction_map = {c1: {c2: direction_map[c1][c2] for c2 in all_countries_sorted} for c1 in all_countries_sorted}
 
     elapsed_total = time.time() - t0
     print(f"\n==> All directions computed in ~{elapsed_total/60:.1f} minutes.")
 
+    if layers:
+        # A preview's layers go next to the full run's, like the preview matrix
+        preview = args.preview is not None
+        layer_file = PREVIEW_LAYER_FILE if preview else LAYER_FILE
+        layers.save(layer_file, preview)
+        print(f"==> Saved layers {', '.join(args.layers)} to '{layer_file}' and "
+              f"'{layer_output_file('<layer>', preview)}'")
+
+    if args.preview is not None:
+        with open(output_file, "w", encoding="utf-8") as f:
+            json.dump(direction_map, f, indent=2)
+        print(f"==> Saved preview matrix to '{output_file}'")
+        preview_report(direction_map, witnesses, os.path.join(OUTPUT_DIR, "country_directions.json"), witness_file)
+        return
+
     # Save single JSON file
     with open(output_file, "w", encoding="utf-8") as f:
         json.dump(direction_map, f, indent=2)
 
     print(f"==> Saved matrix to '{output_file}'")
 
+    # Witness pairs, distances and raw azimuths for re-binning (see witness_store.py)
+    witnesses.save(witness_file)
+    print(f"==> Saved witness store to '{witness_file}'")
+
 if __name__ == "__main__":
     main()
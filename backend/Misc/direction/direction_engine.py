@@ -0,0 +1,145 @@
+import os
+from collections import OrderedDict, namedtuple
+
+import shapely
+
+from country_directions import (
+    DEFAULT_RESOLUTION, NATURAL_EARTH_RESOLUTIONS, VALID_COUNTRIES,
+    geod, azimuth_to_8dir, normalize_name, min_pair, sample_source_for,
+    shapefile_path_for, geometry_cache_file, read_geometry_cache, index_country_rows, read_country_rows,
+    prepare_country_geometry,
+)
+from matrix_io import OPPOSITE_DIRECTIONS
+
+# witness = (lonA, latA, lonB, latB) from the first country to the second
+PairResult = namedtuple("PairResult", "a b distance_km direction fwd_az back_az witness")
+
+
+class DirectionEngine:
+    """
+    On-demand distance / direction lookups without running the full matrix.
+
+    Geometry is filtered and sampled only for the countries a query touches,
+    and pair results are kept in a bounded LRU cache. Results match the
+    matrix written by country_directions.py: each pair is computed in sorted
+    (row < column) order and the reverse direction is the opposite sector.
+
+        engine = DirectionEngine()
+        engine.direction("india", "china")     # -> "N"
+        engine.query_many([("peru", "chile"), ("fiji", "tonga")])
+    """
+
+    def __init__(self, resolution=DEFAULT_RESOLUTION, cache_size=4096, use_geometry_cache=True):
+        if resolution not in NATURAL_EARTH_RESOLUTIONS:
+            raise ValueError(f"Unknown resolution '{resolution}', expected one of {sorted(NATURAL_EARTH_RESOLUTIONS)}")
+        self.resolution = resolution
+        self.cache_size = cache_size
+        self.use_geometry_cache = use_geometry_cache
+        self._cache_file = None   # geometry cache, read one country at a time
+        self._rows = None         # otherwise: country -> shapefile row numbers
+        self._sources = {}        # country -> SampleSource (or None), only for touched countries
+        self._pairs = OrderedDict()
+
+    # --- geometry, prepared per country on first use ---
+
+    def _open(self):
+        if self._cache_file is not None or self._rows is not None:
+            return
+        cache_file = geometry_cache_file(self.resolution)
+        if self.use_geometry_cache and os.path.exists(cache_file):
+            self._cache_file = cache_file
+        else:
+            shapefile_path = shapefile_path_for(self.resolution)
+            if not os.path.exists(shapefile_path):
+                raise FileNotFoundError(f"Shapefile not found: {shapefile_path}")
+            self._rows = index_country_rows(shapefile_path)
+
+    def geometry(self, country):
+        """
+        The filtered geometry of a country, or None for micronations.
+
+        Only this country's entry of the geometry cache (or its shapefile rows,
+        without a cache) is read.
+        """
+        country = self._name(country)
+        self._open()
+        if self._cache_file is not None:
+            wkb = read_geometry_cache(self._cache_file, [country]).get(country)
+            return shapely.from_wkb(wkb) if wkb is not None else None
+        rows = self._rows.get(country)
+        if not rows:
+            return None
+        raw = read_country_rows(shapefile_path_for(self.resolution), rows).get(country, [])
+        simplify = NATURAL_EARTH_RESOLUTIONS[self.resolution]["simplify"]
+        return prepare_country_geometry(country, raw, simplify)
+
+    def source(self, country):
+        country = self._name(country)
+        if country not in self._sources:
+            self._sources[country] = sample_source_for(country, {country: self.geometry(country)})
+        return self._sources[country]
+
+    # --- queries ---
+
+    def _name(self, raw):
+        name = normalize_name(raw)
+        if name not in VALID_COUNTRIES:
+            raise ValueError(f"Unknown country '{raw}'")
+        return name
+
+    def _canonical(self, a, b):
+        key = (a, b) if a <= b else (b, a)
+        hit = self._pairs.get(key)
+        if hit is not None:
+            self._pairs.move_to_end(key)
+            return hit
+        best = min_pair(self.source(key[0]), self.source(key[1]))
+        if best:
+            fwd_az, back_az, dist_m = geod.inv(*best)
+            result = PairResult(key[0], key[1], dist_m / 1000.0,
+                                azimuth_to_8dir((fwd_az + 360.0) % 360.0), fwd_az, back_az, best)
+        else:
+            result = PairResult(key[0], key[1], None, "unknown", None, None, None)
+        self._pairs[key] = result
+        if len(self._pairs) > self.cache_size:
+            self._pairs.popitem(last=False)
+        return result
+
+    def pair(self, a, b):
+        """
+        Full PairResult for a -> b (distance, sector, raw azimuths and witness points).
+        """
+        a, b = self._name(a), self._name(b)
+        if a == b:
+            return PairResult(a, b, 0.0, None, None, None, None)
+        result = self._canonical(a, b)
+        if (a, b) == (result.a, result.b) or result.witness is None:
+            return result._replace(a=a, b=b)
+        xA, yA, xB, yB = result.witness
+        return PairResult(a, b, result.distance_km, OPPOSITE_DIRECTIONS[result.direction],
+                          result.back_az, result.fwd_az, (xB, yB, xA, yA))
+
+    def distance(self, a, b):
+        """Closest-boundary WGS84 distance in km (None if either country has no geometry)."""
+        return self.pair(a, b).distance_km
+
+    def direction(self, a, b):
+        """8-way sector from a to b, as in country_directions.json."""
+        return self.pair(a, b).direction
+
+    def query_many(self, pairs):
+        """
+        Answers a batch of (a, b) pairs, computing each distinct pair once.
+
+        Returns:
+            list: (distance_km, direction) per input pair, in input order.
+        """
+        results = []
+        for a, b in pairs:
+            r = self.pair(a, b)
+            results.append((r.distance_km, r.direction))
+        return results
+
+    def cache_info(self):
+        return {"pairs_cached": len(self._pairs), "cache_size": self.cache_size,
+                "countries_prepared": len(self._sources)}
@@ -0,0 +1,369 @@
+import argparse
+import sys
+import time
+import numpy as np
+from shapely.geometry import Polygon, MultiPolygon
+
+from country_directions import (
+    VALID_COUNTRIES, PREVIEW_REFINE, geod, azimuth_to_8dir, load_country_geometries,
+    BOUNDARY_SAMPLERS, _nearest_pair, _unit_vectors, sample_source_for, min_pair,
+    _minpair_polygon_to_polygon, _minpair_points_to_points, _minpair_points_to_polygon,
+    _minpair_polygon_to_points, _minpair_point_to_polygon,
+)
+from witness_store import bin_azimuths, COMPASS_POINTS
+from point_lookup import CountryLocator
+
+##############################################################################
+# RANDOMIZED EQUIVALENCE CHECK FOR THE FAST KERNELS
+#
+# Every fast path is compared with a brute-force reference on random inputs:
+#
+#   _nearest_pair / min_pair   vs  geod.inv over every pair of samples, first
+#                                  minimum in the original loop order
+#   per-case _minpair_* helpers vs the same reference on the same samples
+#   _nearest_pair max_refine   vs  the same reference, as bounds: never below
+#                                  the true minimum, never above the pair that
+#                                  is closest on the sphere (always refined)
+#   CountryLocator.nearest /   vs  geod.inv from the point to every boundary
+#   distance_to                    sample (of every country / of the target)
+#   bin_azimuths(az, 8)        vs  azimuth_to_8dir
+#
+# Inputs are random polygons (small and large, near the poles, cut at the
+# antimeridian like Natural Earth's), random point sets with duplicated
+# points (exact distance ties), and random subsets of real countries with
+# reduced sample budgets.
+#
+# Distances must agree within DIST_TOL_KM and sectors exactly. Documented
+# boundary ties, which are reported but do not fail the check:
+#   - a different pair is chosen whose distance ties the reference within
+#     DIST_TOL_KM (its sector may differ);
+#   - the reference azimuth lies within SECTOR_TIE_DEG of a sector edge
+#     (22.5 + 45k degrees), where the last bit of geod.inv decides the sector.
+##############################################################################
+
+DIST_TOL_KM = 1e-6
+SECTOR_TIE_DEG = 1e-9
+SECTOR_EDGES = 22.5 + 45.0 * np.arange(8)
+HARD_COUNTRIES = ["fiji", "russia", "new zealand", "united states", "kiribati", "tuvalu", "samoa",
+                  "canada", "norway", "chile", "marshall islands"]
+
+
+def brute_nearest(lonA, latA, lonB, latB, b_major=False):
+    """
+    Reference (i, j, km): every pair through geod.inv, first minimum in loop order.
+    """
+    ii, jj = np.meshgrid(np.arange(len(lonA)), np.arange(len(lonB)), indexing="ij")
+    _, _, dist_m = geod.inv(lonA[ii.ravel()], latA[ii.ravel()], lonB[jj.ravel()], latB[jj.ravel()])
+    dist = np.asarray(dist_m).reshape(ii.shape) / 1000.0
+    if b_major:
+        j, i = np.unravel_index(int(np.argmin(dist.T)), dist.T.shape)
+    else:
+        i, j = np.unravel_index(int(np.argmin(dist)), dist.shape)
+    return int(i), int(j), float(dist[i, j])
+
+
+def near_sector_edge(az):
+    a = (az + 360.0) % 360.0
+    return bool(np.min(np.abs(a - SECTOR_EDGES)) < SECTOR_TIE_DEG or min(a, 360.0 - a) < SECTOR_TIE_DEG)
+
+
+class Report:
+    def __init__(self):
+        self.counts = {}
+        self.failures = []
+
+    def add(self, group, outcome, detail=None):
+        self.counts.setdefault(group, {"ok": 0, "tie": 0, "fail": 0})[outcome] += 1
+        if outcome == "fail":
+            self.failures.append(f"{group}: {detail}")
+
+    def compare_pair(self, group, got, ref, lonA, latA, lonB, latB, label):
+        """
+        Compares a fast (i, j[, km]) result against the brute-force reference.
+        """
+        i, j = got[:2]
+        ri, rj, ref_km = ref
+        fwd_az, _, dist_m = geod.inv(lonA[i], latA[i], lonB[j], latB[j])
+        ref_az, _, _ = geod.inv(lonA[ri], latA[ri], lonB[rj], latB[rj])
+        km = dist_m / 1000.0
+        if abs(km - ref_km) > DIST_TOL_KM:
+            self.add(group, "fail", f"{label}: {km:.6f} km vs reference {ref_km:.6f} km")
+        elif (i, j) != (ri, rj):
+            self.add(group, "tie")
+        elif azimuth_to_8dir((fwd_az + 360.0) % 360.0) != azimuth_to_8dir((ref_az + 360.0) % 360.0):
+            if near_sector_edge(ref_az):
+                self.add(group, "tie")
+            else:
+                self.add(group, "fail", f"{label}: sector differs at azimuth {ref_az:.9f}")
+        else:
+            self.add(group, "ok")
+
+    def print(self):
+        for group, c in self.counts.items():
+            print(f"  {group:<28} ok {c['ok']:>5}   boundary ties {c['tie']:>3}   failures {c['fail']:>3}")
+        for failure in self.failures[:20]:
+            print(f"  FAIL {failure}")
+
+
+##############################################################################
+# RANDOM INPUTS
+##############################################################################
+
+def random_center(rng):
+    kind = rng.integers(4)
+    if kind == 0:   # antimeridian
+        return 180.0 * rng.choice([-1.0, 1.0]) - rng.uniform(-3, 3), rng.uniform(-60, 60)
+    if kind == 1:   # polar
+        return rng.uniform(-180, 180), rng.choice([-1.0, 1.0]) * rng.uniform(75, 89)
+    return rng.uniform(-180, 180), rng.uniform(-70, 70)
+
+
+def random_polygon(rng, lon0, lat0):
+    """
+    Star-shaped polygon around (lon0, lat0), cut at the antimeridian like
+    Natural Earth's (a MultiPolygon when it straddles it).
+    """
+    n = int(rng.integers(5, 40))
+    radius = rng.uniform(0.05, 1.0) * (10.0 ** rng.uniform(-1, 1))
+    theta = np.sort(rng.uniform(0, 2 * np.pi, n))
+    r = radius * rng.uniform(0.3, 1.0, n)
+    lat = np.clip(lat0 + r * np.sin(theta), -89.9, 89.9)
+    lon = lon0 + r * np.cos(theta) / max(np.cos(np.radians(lat0)), 0.05)
+    ring = Polygon(zip(lon, lat)).buffer(0)
+    parts = []
+    for shift in (-360.0, 0.0, 360.0):
+        window = Polygon([(-180 - shift, -90), (180 - shift, -90), (180 - shift, 90), (-180 - shift, 90)])
+        piece = ring.intersection(window)
+        if not piece.is_empty:
+            geoms = getattr(piece, "geoms", [piece])
+            parts += [Polygon([(x + shift, y) for x, y in g.exterior.coords]) for g in geoms
+                      if isinstance(g, Polygon) and g.area > 0]
+    if not parts:
+        return None
+    return parts[0] if len(parts) == 1 else MultiPolygon(parts)
+
+
+def random_points(rng, lon0, lat0):
+    n = int(rng.integers(1, 6))
+    lon = ((lon0 + rng.normal(0, 2, n) + 180.0) % 360.0) - 180.0
+    lat = np.clip(lat0 + rng.normal(0, 2, n), -90, 90)
+    points = list(zip(lon.tolist(), lat.tolist()))
+    if n > 1 and rng.random() < 0.3:
+        points.append(points[0])    # duplicate point: exact distance tie
+    return points
+
+
+def check_random_shapes(rng, cases, report):
+    for case in range(cases):
+        try:
+            _check_shape_case(rng, case, report)
+        except Exception as e:  # a crashing kernel is a failure, keep checking the rest
+            report.add("exceptions", "fail", f"case {case}: {e!r}")
+
+
+def _check_shape_case(rng, case, report):
+    lon0, lat0 = random_center(rng)
+    # The partner sits nearby, often on the other side of the antimeridian
+    lon1, lat1 = lon0 + rng.normal(0, 6), np.clip(lat0 + rng.normal(0, 6), -89, 89)
+    lon1 = ((lon1 + 180.0) % 360.0) - 180.0
+    polyA, polyB = random_polygon(rng, lon0, lat0), random_polygon(rng, lon1, lat1)
+    ptsA, ptsB = random_points(rng, lon0, lat0), random_points(rng, lon1, lat1)
+    nA, nB = int(rng.integers(20, 200)), int(rng.integers(20, 200))
+    label = f"case {case} at ({lon0:.2f}, {lat0:.2f})"
+
+    sampler = str(rng.choice(sorted(BOUNDARY_SAMPLERS)))
+    if polyA is not None and polyB is not None:
+        lonA, latA = BOUNDARY_SAMPLERS[sampler](polyA, nA)
+        lonB, latB = BOUNDARY_SAMPLERS[sampler](polyB, nB)
+        got = _nearest_pair(lonA, latA, lonB, latB)
+        ref = brute_nearest(lonA, latA, lonB, latB)
+        report.compare_pair(f"_nearest_pair ({sampler})", got, ref, lonA, latA, lonB, latB, label)
+        check_max_refine(lonA, latA, lonB, latB, ref, report, label)
+
+        lonA, latA = BOUNDARY_SAMPLERS["planar"](polyA, nA)
+        lonB, latB = BOUNDARY_SAMPLERS["planar"](polyB, nB)
+        best = _minpair_polygon_to_polygon(polyA, polyB, nA, nB)
+        got = (int(np.flatnonzero((lonA == best[0]) & (latA == best[1]))[0]),
+               int(np.flatnonzero((lonB == best[2]) & (latB == best[3]))[0]))
+        report.compare_pair("_minpair_polygon_to_polygon", got, brute_nearest(lonA, latA, lonB, latB),
+                            lonA, latA, lonB, latB, label)
+
+    pA, pB = np.asarray(ptsA), np.asarray(ptsB)
+    best = _minpair_points_to_points(ptsA, ptsB)
+    got = (_index_of(pA, best[:2]), _index_of(pB, best[2:]))
+    report.compare_pair("_minpair_points_to_points", got,
+                        brute_nearest(pA[:, 0], pA[:, 1], pB[:, 0], pB[:, 1]),
+                        pA[:, 0], pA[:, 1], pB[:, 0], pB[:, 1], label)
+
+    if polyB is not None:
+        lonB, latB = BOUNDARY_SAMPLERS["planar"](polyB, nB)
+        best = _minpair_points_to_polygon(ptsA, polyB, nB)
+        got = (_index_of(pA, best[:2]), _index_of(np.column_stack((lonB, latB)), best[2:]))
+        report.compare_pair("_minpair_points_to_polygon", got,
+                            brute_nearest(pA[:, 0], pA[:, 1], lonB, latB),
+                            pA[:, 0], pA[:, 1], lonB, latB, label)
+
+        # Polygon first, points second: the point set is still the outer loop
+        best = _minpair_polygon_to_points(polyB, ptsA, nB)
+        got = (_index_of(np.column_stack((lonB, latB)), best[:2]), _index_of(pA, best[2:]))
+        report.compare_pair("_minpair_polygon_to_points", got,
+                            brute_nearest(lonB, latB, pA[:, 0], pA[:, 1], b_major=True),
+                            lonB, latB, pA[:, 0], pA[:, 1], label)
+
+        target = _minpair_point_to_polygon(ptsA[0][0], ptsA[0][1], polyB, nB)
+        got = (0, _index_of(np.column_stack((lonB, latB)), target))
+        report.compare_pair("_minpair_point_to_polygon", got,
+                            brute_nearest(pA[:1, 0], pA[:1, 1], lonB, latB),
+                            pA[:1, 0], pA[:1, 1], lonB, latB, label)
+
+
+def check_max_refine(lonA, latA, lonB, latB, ref, report, label):
+    """
+    The preview kernel only refines the max_refine spherically closest
+    candidates, so it may miss the true minimum, but its pair can be neither
+    closer than the reference nor farther than the spherically closest pair.
+    Checked at the preview budget and at 2, where the cut nearly always bites;
+    with a budget above the pair count it must be exact.
+    """
+    c2 = np.sum((_unit_vectors(lonA, latA)[:, None, :] - _unit_vectors(lonB, latB)[None, :, :]) ** 2, axis=2)
+    si, sj = np.unravel_index(int(np.argmin(c2)), c2.shape)
+    _, _, sphere_m = geod.inv(lonA[si], latA[si], lonB[sj], latB[sj])
+    upper_km = sphere_m / 1000.0
+    for budget in (2, PREVIEW_REFINE):
+        got = _nearest_pair(lonA, latA, lonB, latB, max_refine=budget)
+        if got[2] < ref[2] - DIST_TOL_KM or got[2] > upper_km + DIST_TOL_KM:
+            report.add("_nearest_pair (max_refine)", "fail",
+                       f"{label}, max_refine={budget}: {got[2]:.6f} km outside [{ref[2]:.6f}, {upper_km:.6f}]")
+        else:
+            report.add("_nearest_pair (max_refine)", "ok")
+    got = _nearest_pair(lonA, latA, lonB, latB, max_refine=len(lonA) * len(lonB))
+    report.compare_pair("_nearest_pair (max_refine)", got, ref, lonA, latA, lonB, latB, label)
+
+
+def _index_of(points, xy):
+    return int(np.flatnonzero((points[:, 0] == xy[0]) & (points[:, 1] == xy[1]))[0])
+
+
+def check_real_countries(rng, count, samples, report):
+    polygons = load_country_geometries()
+    names = sorted(VALID_COUNTRIES)
+    picked = list(rng.choice(HARD_COUNTRIES, size=min(count, len(HARD_COUNTRIES)) // 2, replace=False))
+    picked += [c for c in rng.choice(names, size=count, replace=False) if c not in picked][:count - len(picked)]
+    sources = {c: sample_source_for(c, polygons, samples) for c in picked}
+    sources = {c: s for c, s in sources.items() if s is not None}
+    for a in sources:
+        for b in sources:
+            if a == b:
+                continue
+            srcA, srcB = sources[a], sources[b]
+            try:
+                best = min_pair(srcA, srcB)
+            except Exception as e:
+                report.add("exceptions", "fail", f"{a} -> {b}: {e!r}")
+                continue
+            got = (_index_of(np.column_stack((srcA.lon, srcA.lat)), best[:2]),
+                   _index_of(np.column_stack((srcB.lon, srcB.lat)), best[2:]))
+            b_major = srcA.kind == "polygon" and srcB.kind == "points"
+            ref = brute_nearest(srcA.lon, srcA.lat, srcB.lon, srcB.lat, b_major)
+            report.compare_pair("min_pair (countries)", got, ref,
+                                srcA.lon, srcA.lat, srcB.lon, srcB.lat, f"{a} -> {b}")
+            check_max_refine(srcA.lon, srcA.lat, srcB.lon, srcB.lat, ref, report, f"{a} -> {b}")
+    return sorted(sources)
+
+
+def _compare_lookup(group, got_km, got_dir, lon, lat, lonS, latS, report, label):
+    # Reference: geod.inv from the point to every sample, first minimum
+    fwd_az, _, dist_m = geod.inv(np.full(len(lonS), lon), np.full(len(lonS), lat), lonS, latS)
+    dist_km = np.asarray(dist_m) / 1000.0
+    k = int(np.argmin(dist_km))
+    ref_dir = azimuth_to_8dir((fwd_az[k] + 360.0) % 360.0)
+    if abs(got_km - dist_km[k]) > DIST_TOL_KM:
+        report.add(group, "fail", f"{label}: {got_km:.6f} km vs reference {dist_km[k]:.6f} km")
+    elif got_dir != ref_dir:
+        ties = np.abs(dist_km - dist_km[k]) <= DIST_TOL_KM
+        if ties.sum() > 1 or near_sector_edge(fwd_az[k]):
+            report.add(group, "tie")
+        else:
+            report.add(group, "fail", f"{label}: {got_dir} vs reference {ref_dir}")
+    else:
+        report.add(group, "ok")
+
+
+def check_point_lookup(rng, count, report):
+    """
+    CountryLocator.nearest and distance_to against every boundary sample.
+    Points land anywhere, near the poles and the antimeridian included.
+    """
+    locator = CountryLocator()
+    lons = np.concatenate([rng.uniform(-180, 180, count - count // 4), rng.uniform(177, 180, count // 4)])
+    lats = np.concatenate([rng.uniform(-85, 85, count - count // 4), rng.uniform(-25, -10, count // 4)])
+    inside = locator.locate_index(lons, lats)
+    names, dists, dirs = locator.nearest(lons, lats)
+    for p in range(count):
+        label = f"point ({lons[p]:.4f}, {lats[p]:.4f})"
+        if inside[p] >= 0:
+            ok = names[p] == locator.names[inside[p]] and dists[p] == 0.0 and dirs[p] is None
+            report.add("CountryLocator.nearest", "ok" if ok else "fail", f"{label}: inside, got {names[p]}")
+            continue
+        _compare_lookup("CountryLocator.nearest", dists[p], dirs[p], lons[p], lats[p],
+                        locator._lon, locator._lat, report, label)
+
+    targets = rng.choice(sorted(c for c, src in locator.sources.items() if src is not None), size=count)
+    for p, country in enumerate(targets.tolist()):
+        (km,), (sector,) = locator.distance_to(lons[p:p + 1], lats[p:p + 1], country)
+        src = locator.sources[country]
+        label = f"point ({lons[p]:.4f}, {lats[p]:.4f}) -> {country}"
+        if inside[p] >= 0 and locator.names[inside[p]] == country:
+            report.add("CountryLocator.distance_to", "ok" if (km, sector) == (0.0, None) else "fail", label)
+            continue
+        _compare_lookup("CountryLocator.distance_to", km, sector, lons[p], lats[p], src.lon, src.lat, report, label)
+
+
+def check_binning(rng, count, report):
+    """
+    bin_azimuths must bin exactly like azimuth_to_8dir, edges included.
+    """
+    az = np.concatenate([
+        rng.uniform(-540, 540, count),
+        SECTOR_EDGES, SECTOR_EDGES - 360.0, np.nextafter(SECTOR_EDGES, 0), np.nextafter(SECTOR_EDGES, 400),
+        [0.0, -0.0, 360.0, -360.0, 1e-300, -1e-300, np.nextafter(360.0, 0), np.nextafter(-180.0, 0), 180.0, -180.0],
+    ])
+    labels = COMPASS_POINTS[8]
+    fast = bin_azimuths(az, 8)
+    for a, k in zip(az.tolist(), fast.tolist()):
+        ref = azimuth_to_8dir((a + 360.0) % 360.0)
+        if labels[k] == ref:
+            report.add("bin_azimuths", "ok")
+        else:
+            report.add("bin_azimuths", "fail", f"azimuth {a!r}: {labels[k]} vs reference {ref}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Randomized check of the fast min-pair / sector kernels against brute force.")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed (default: random, printed).")
+    parser.add_argument("--cases", type=int, default=100, help="Random polygon / point-set cases.")
+    parser.add_argument("--countries", type=int, default=8, help="Real countries checked pairwise.")
+    parser.add_argument("--samples", type=int, default=150, help="Boundary samples per real country.")
+    parser.add_argument("--points", type=int, default=20, help="Random points for the point lookups.")
+    args = parser.parse_args()
+
+    seed = args.seed if args.seed is not None else int(np.random.SeedSequence().entropy % (1 << 32))
+    rng = np.random.default_rng(seed)
+    print(f"==> Kernel equivalence check (seed {seed})")
+    report = Report()
+    t0 = time.time()
+
+    check_binning(rng, 20_000, report)
+    check_random_shapes(rng, args.cases, report)
+    picked = check_real_countries(rng, args.countries, args.samples, report) if args.countries else []
+    if picked:
+        print(f"  countries: {', '.join(picked)}")
+    if args.points:
+        check_point_lookup(rng, args.points, report)
+    report.print()
+    print(f"==> {'FAILED' if report.failures else 'OK'} in {time.time() - t0:.1f}s")
+    return 1 if report.failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,225 @@
+import argparse
+import json
+import os
+import sys
+import time
+import numpy as np
+
+from country_directions import (
+    DEFAULT_RESOLUTION, NATURAL_EARTH_RESOLUTIONS, VALID_COUNTRIES,
+    geod, azimuth_to_8dir, normalize_name, get_sample_size, load_country_geometries,
+    geometry_cache_file, sample_source_for, _nearest_pair, OUTPUT_DIR,
+)
+from matrix_io import OPPOSITE_DIRECTIONS
+
+##############################################################################
+# NESTED PAIR MINIMA
+#
+# With the "nested" sampler a country's samples at budget n are the first n
+# samples at any larger budget. The store keeps, for every pair row < column,
+# the index of the closest sample on each side. Raising a country's budget
+# from n to m then only needs its samples n..m-1 against each partner's
+# samples: the old minimum already covers the first n, and the new minimum
+# is the smaller of the two. Micronation point sets have no budget.
+##############################################################################
+
+DEFAULT_NESTED_FILE = os.path.join(OUTPUT_DIR, "country_nested_pairs.npz")
+SAMPLER = "nested"
+
+
+class NestedPairStore:
+    def __init__(self, names, budgets, resolution=DEFAULT_RESOLUTION):
+        self.names = list(names)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.resolution = resolution
+        n = len(self.names)
+        self.budgets = np.array([budgets.get(name, get_sample_size(name)) for name in self.names], dtype=np.int32)
+        self.best_a = np.full((n, n), -1, dtype=np.int32)   # sample index of the row country
+        self.best_b = np.full((n, n), -1, dtype=np.int32)   # sample index of the column country
+        self.dist_km = np.full((n, n), np.nan, dtype=np.float64)
+        self._polygons = None
+        self._sources = {}
+
+    # --- sample sources (regenerated on demand, they are deterministic) ---
+
+    def polygons(self):
+        if self._polygons is None:
+            self._polygons = load_country_geometries(self.resolution)
+        return self._polygons
+
+    def source(self, country):
+        k = self.index[country]
+        cached = self._sources.get(country)
+        if cached is None or (cached.kind == "polygon" and len(cached) != self.budgets[k]):
+            cached = sample_source_for(country, self.polygons(), int(self.budgets[k]) or None, SAMPLER)
+            self._sources[country] = cached
+            if cached is not None and cached.kind == "points":
+                self.budgets[k] = 0
+        return cached
+
+    # --- computation ---
+
+    def _update(self, i, j, start=0, grown_row=True):
+        """
+        Evaluates samples start.. of one side of the pair (row i < column j) against
+        every sample of the other side, and keeps the result if it is closer.
+        """
+        src_row, src_col = self.source(self.names[i]), self.source(self.names[j])
+        if src_row is None or src_col is None:
+            return False
+        new, other = (src_row, src_col) if grown_row else (src_col, src_row)
+        if start >= len(new):
+            return False
+        best = _nearest_pair(new.lon[start:], new.lat[start:], other.lon, other.lat,
+                             vA=new.vectors[start:], vB=other.vectors)
+        if not best:
+            return False
+        n, o, km = best
+        if not np.isnan(self.dist_km[i, j]) and km >= self.dist_km[i, j]:
+            return False
+        a, b = (start + n, o) if grown_row else (o, start + n)
+        self.best_a[i, j], self.best_b[i, j], self.dist_km[i, j] = a, b, km
+        return True
+
+    def compute_all(self, progress=True):
+        n = len(self.names)
+        for i in range(n):
+            if progress:
+                print(f"[{i+1}/{n}] {self.names[i]} -> others ...", flush=True)
+            for j in range(i + 1, n):
+                self._update(i, j)
+
+    def raise_budget(self, country, budget):
+        """
+        Grows a country's sample budget, evaluating only the added samples.
+
+        Returns:
+            list: Partners whose closest pair changed.
+        """
+        k = self.index[country]
+        old = int(self.budgets[k])
+        if self.source(country) is None or self.source(country).kind == "points" or budget <= old:
+            return []
+        self.budgets[k] = budget
+        changed = []
+        for p, partner in enumerate(self.names):
+            if p == k:
+                continue
+            if self._update(min(k, p), max(k, p), start=old, grown_row=k < p):
+                changed.append(partner)
+        return changed
+
+    # --- results ---
+
+    def witness(self, i, j):
+        """(lonA, latA, lonB, latB) of the stored closest pair for row i < column j, or None."""
+        if self.best_a[i, j] < 0:
+            return None
+        srcA, srcB = self.source(self.names[i]), self.source(self.names[j])
+        a, b = self.best_a[i, j], self.best_b[i, j]
+        return (float(srcA.lon[a]), float(srcA.lat[a]), float(srcB.lon[b]), float(srcB.lat[b]))
+
+    def direction_map(self):
+        """
+        {country: {country: sector}} with the engine's conventions: the diagonal is
+        None, missing geometry is "unknown", and j < i mirrors the opposite sector.
+        """
+        result = {c: {} for c in self.names}
+        for i, c1 in enumerate(self.names):
+            for j, c2 in enumerate(self.names):
+                if i == j:
+                    result[c1][c2] = None
+                elif j < i:
+                    prev = result[c2][c1]
+                    result[c1][c2] = OPPOSITE_DIRECTIONS.get(prev, prev)
+                else:
+                    best = self.witness(i, j)
+                    if best is None:
+                        result[c1][c2] = "unknown"
+                    else:
+                        fwd_az, _, _ = geod.inv(*best)
+                        result[c1][c2] = azimuth_to_8dir((fwd_az + 360.0) % 360.0)
+        return result
+
+    # --- persistence ---
+
+    def save(self, file_path):
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        tmp = file_path + ".tmp.npz"
+        np.savez_compressed(tmp, names=np.array(self.names), resolution=np.array(self.resolution),
+                            geometry=np.array(os.path.basename(geometry_cache_file(self.resolution))),
+                            sampler=np.array(SAMPLER), budgets=self.budgets, best_a=self.best_a, best_b=self.best_b, dist_km=self.dist_km)
+        os.replace(tmp, file_path)
+
+    @classmethod
+    def load(cls, file_path):
+        """
+        Reads a saved store. Sample indices only mean something for the geometry
+        and sampler they were computed with, so a store saved under a different
+        geometry cache key or sampler raises ValueError.
+        """
+        with np.load(file_path) as data:
+            resolution = str(data["resolution"])
+            geometry = str(data["geometry"]) if "geometry" in data else None
+            sampler = str(data["sampler"]) if "sampler" in data else None
+            if geometry != os.path.basename(geometry_cache_file(resolution)) or sampler != SAMPLER:
+                raise ValueError(f"'{file_path}' was built from other geometry or samples "
+                                 f"(geometry {geometry}, sampler {sampler})")
+            store = cls(data["names"].tolist(), {}, resolution)
+            store.budgets = data["budgets"].astype(np.int32)
+            store.best_a, store.best_b, store.dist_km = data["best_a"], data["best_b"], data["dist_km"]
+        return store
+
+
+def parse_budget(raw):
+    name, _, value = raw.rpartition("=")
+    country = normalize_name(name)
+    if country not in VALID_COUNTRIES or not value.isdigit():
+        raise argparse.ArgumentTypeError(f"expected COUNTRY=SAMPLES, got '{raw}'")
+    return country, int(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-pair minima over nested samples, with incremental budget increases.")
+    parser.add_argument("--store", default=DEFAULT_NESTED_FILE, help="Store file to read / write.")
+    parser.add_argument("--build", action="store_true", help="Compute every pair at the SAMPLE_SIZE_MAP budgets.")
+    parser.add_argument("--resolution", choices=sorted(NATURAL_EARTH_RESOLUTIONS), default=DEFAULT_RESOLUTION)
+    parser.add_argument("--raise", dest="raises", action="append", type=parse_budget, default=[],
+                        metavar="COUNTRY=SAMPLES", help="Grow a country's budget (repeatable).")
+    parser.add_argument("-o", "--output", help="Also write the direction matrix to this JSON file.")
+    args = parser.parse_args()
+
+    t0 = time.time()
+    if args.build:
+        names = sorted(VALID_COUNTRIES)
+        store = NestedPairStore(names, {c: get_sample_size(c) for c in names}, args.resolution)
+        store.compute_all()
+        print(f"==> Computed all pairs in {time.time() - t0:.1f}s")
+    else:
+        try:
+            store = NestedPairStore.load(args.store)
+        except FileNotFoundError:
+            print(f"Error: The store '{args.store}' was not found. Run with --build first.")
+            return 1
+        except ValueError as e:
+            print(f"Error: {e}. Run with --build to rebuild it.")
+            return 1
+
+    for country, budget in args.raises:
+        t1 = time.time()
+        old = int(store.budgets[store.index[country]])
+        changed = store.raise_budget(country, budget)
+        print(f"==> {country}: {old} -> {budget} samples in {time.time() - t1:.1f}s, "
+              f"{len(changed)} closer pair(s) found")
+
+    store.save(args.store)
+    print(f"==> Saved store to '{args.store}'")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(store.direction_map(), f, indent=2)
+        print(f"==> Saved directions to '{args.output}'")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
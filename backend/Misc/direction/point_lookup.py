@@ -0,0 +1,319 @@
+import argparse
+import csv
+import sys
+import time
+import numpy as np
+import shapely
+from shapely import STRtree
+
+from country_directions import (
+    DEFAULT_RESOLUTION, EARTH_RADIUS_KM, SPHERE_ERROR, SCREEN_SLACK_KM, VALID_COUNTRIES,
+    geod, azimuth_to_8dir, normalize_name, load_country_geometries, sample_source_for,
+    _unit_vectors, _chord2_threshold,
+)
+
+##############################################################################
+# POINT -> COUNTRY LOOKUP
+#
+# locate():   STRtree over the filtered polygons, one bulk point-in-polygon
+#             query for the whole batch.
+# nearest():  STRtree over every country's boundary samples (and the
+#             micronation points). The planar-nearest sample gives an upper
+#             bound on the distance, widened by SPHERE_ERROR into a screen
+#             radius. The samples are grouped into CELL_DEGREES cells, each
+#             with a bounding sphere in unit-vector space; a cell whose
+#             sphere stays outside the screen radius is dropped without
+#             touching its samples. The samples of the remaining cells go
+#             through the chord^2 screen and are refined with geod.inv, as in
+#             the pair kernel.
+# distance_to(): the same screen + refine against one country's samples.
+##############################################################################
+
+# Points handled per block (bounds memory for the candidate arrays)
+POINT_CHUNK = 20_000
+# Lon/lat cell size used to group boundary samples for the nearest() screen
+CELL_DEGREES = 1.0
+
+
+def _as_arrays(lons, lats):
+    lons = np.atleast_1d(np.asarray(lons, dtype=np.float64))
+    lats = np.atleast_1d(np.asarray(lats, dtype=np.float64))
+    if lons.shape != lats.shape:
+        raise ValueError("lons and lats must have the same length")
+    return lons, lats
+
+
+def _sectors(fwd_az):
+    return [azimuth_to_8dir((a + 360.0) % 360.0) for a in np.asarray(fwd_az).tolist()]
+
+
+def _first_min_per_group(group, values):
+    """
+    For each distinct group id, the position of its smallest value (first on ties).
+    """
+    order = np.lexsort((np.arange(len(values)), values, group))
+    _, first = np.unique(group[order], return_index=True)
+    return order[first]
+
+
+class CountryLocator:
+    def __init__(self, final_polygons=None, resolution=DEFAULT_RESOLUTION):
+        final_polygons = final_polygons or load_country_geometries(resolution)
+        self.names = sorted(VALID_COUNTRIES)
+
+        # Polygons for containment
+        poly_names = [c for c in self.names if final_polygons.get(c) is not None]
+        self._poly_owner = np.array([self.names.index(c) for c in poly_names])
+        self._polygons = [final_polygons[c] for c in poly_names]
+        shapely.prepare(self._polygons)
+        self._poly_tree = STRtree(self._polygons)
+
+        # Boundary samples / micronation points for nearest-country
+        self.sources = {c: sample_source_for(c, final_polygons) for c in self.names}
+        lon, lat, owner = [], [], []
+        for k, c in enumerate(self.names):
+            src = self.sources[c]
+            if src is not None:
+                lon.append(src.lon); lat.append(src.lat); owner.append(np.full(len(src), k))
+        self._lon, self._lat = np.concatenate(lon), np.concatenate(lat)
+        self._owner = np.concatenate(owner)
+        self._vectors = _unit_vectors(self._lon, self._lat)
+        self._sample_tree = STRtree(shapely.points(self._lon, self._lat))
+        self._build_cells()
+
+    def _build_cells(self):
+        """
+        Groups the samples by CELL_DEGREES cell: a box per cell in an STRtree, and
+        per cell the mean unit vector and the largest chord from it to a sample.
+        """
+        cols = int(round(360.0 / CELL_DEGREES))
+        row = np.floor((self._lat + 90.0) / CELL_DEGREES)
+        col = np.floor((self._lon + 180.0) / CELL_DEGREES) % cols
+        order = np.argsort(row * cols + col, kind="stable")
+        _, start, count = np.unique((row * cols + col)[order], return_index=True, return_counts=True)
+        vectors = self._vectors[order]
+        center = np.add.reduceat(vectors, start, axis=0) / count[:, None]
+        spread = np.linalg.norm(vectors - np.repeat(center, count, axis=0), axis=1)
+        self._cell_samples, self._cell_start, self._cell_count = order, start, count
+        self._cell_center, self._cell_radius = center, np.maximum.reduceat(spread, start)
+        lon, lat = self._lon[order], self._lat[order]
+        self._cell_tree = STRtree(shapely.box(np.minimum.reduceat(lon, start), np.minimum.reduceat(lat, start),
+                                              np.maximum.reduceat(lon, start), np.maximum.reduceat(lat, start)))
+
+    def _index(self, country):
+        name = normalize_name(country)
+        if name not in VALID_COUNTRIES:
+            raise ValueError(f"Unknown country '{country}'")
+        return self.names.index(name)
+
+    def locate_index(self, lons, lats):
+        """
+        Index into self.names of the country containing each point, -1 at sea.
+        """
+        lons, lats = _as_arrays(lons, lats)
+        result = np.full(len(lons), -1, dtype=np.int64)
+        hit_point, hit_poly = self._poly_tree.query(shapely.points(lons, lats), predicate="intersects")
+        # A point on a shared border goes to the first polygon in tree order
+        first = np.unique(hit_point, return_index=True)[1]
+        result[hit_point[first]] = self._poly_owner[hit_poly[first]]
+        return result
+
+    def locate(self, lons, lats):
+        """
+        Name of the country containing each point (None at sea or in a micronation
+        that has only point coordinates).
+        """
+        return [self.names[k] if k >= 0 else None for k in self.locate_index(lons, lats).tolist()]
+
+    def _cap_boxes(self, lons, lats, radius_km):
+        """
+        Lon/lat boxes covering a spherical cap per point, split at the antimeridian.
+        """
+        rho = np.minimum(radius_km / EARTH_RADIUS_KM, np.pi)
+        dlat = np.degrees(rho)
+        cos_lat = np.cos(np.radians(lats))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = np.sin(rho) / cos_lat
+        polar = (np.abs(lats) + dlat >= 90.0) | (ratio >= 1.0) | (rho >= np.pi / 2)
+        dlon = np.where(polar, 180.0, np.degrees(np.arcsin(np.clip(ratio, 0.0, 1.0))))
+        ymin, ymax = np.maximum(lats - dlat, -90.0), np.minimum(lats + dlat, 90.0)
+        xmin, xmax = lons - dlon, lons + dlon
+        owners, boxes = [np.arange(len(lons))], [shapely.box(np.maximum(xmin, -180.0), ymin, np.minimum(xmax, 180.0), ymax)]
+        low, high = xmin < -180.0, xmax > 180.0
+        if low.any():
+            owners.append(np.nonzero(low)[0])
+            boxes.append(shapely.box(xmin[low] + 360.0, ymin[low], np.full(low.sum(), 180.0), ymax[low]))
+        if high.any():
+            owners.append(np.nonzero(high)[0])
+            boxes.append(shapely.box(np.full(high.sum(), -180.0), ymin[high], xmax[high] - 360.0, ymax[high]))
+        return np.concatenate(owners), np.concatenate(boxes)
+
+    def _nearest_samples(self, lons, lats):
+        vP = _unit_vectors(lons, lats)
+        # 1) planar-nearest sample: an upper bound on the nearest distance
+        seed_point, seed_sample = self._sample_tree.query_nearest(shapely.points(lons, lats), all_matches=False)
+        seed = np.empty(len(lons), dtype=np.int64)
+        seed[seed_point] = seed_sample
+        chord2 = np.sum((vP - self._vectors[seed]) ** 2, axis=1)
+        bound_km = 2.0 * EARTH_RADIUS_KM * np.arcsin(np.minimum(1.0, np.sqrt(chord2) / 2.0))
+        radius = bound_km * (1.0 + SPHERE_ERROR) / (1.0 - SPHERE_ERROR) + SCREEN_SLACK_KM
+        # 2) cells inside the cap of that radius whose bounding sphere reaches the screen
+        box_owner, boxes = self._cap_boxes(lons, lats, radius)
+        hit_box, hit_cell = self._cell_tree.query(boxes)
+        pts = box_owner[hit_box]
+        gap = np.linalg.norm(vP[pts] - self._cell_center[hit_cell], axis=1) - self._cell_radius[hit_cell]
+        keep = (gap <= 0.0) | (gap ** 2 <= _chord2_threshold(chord2)[pts])
+        pts, hit_cell = pts[keep], hit_cell[keep]
+        # 3) their samples, through the spherical screen per point, then WGS84 refine
+        count = self._cell_count[hit_cell]
+        offset = np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count)
+        hit_sample = self._cell_samples[np.repeat(self._cell_start[hit_cell], count) + offset]
+        pts = np.repeat(pts, count)
+        c2 = np.sum((vP[pts] - self._vectors[hit_sample]) ** 2, axis=1)
+        best_c2 = np.full(len(lons), np.inf)
+        np.minimum.at(best_c2, pts, c2)
+        keep = c2 <= _chord2_threshold(best_c2)[pts]
+        pts, hit_sample = pts[keep], hit_sample[keep]
+        fwd_az, _, dist_m = geod.inv(lons[pts], lats[pts], self._lon[hit_sample], self._lat[hit_sample])
+        dist_km = np.asarray(dist_m) / 1000.0
+        win = _first_min_per_group(pts, dist_km)
+        sample = np.empty(len(lons), dtype=np.int64)
+        dist, az = np.empty(len(lons)), np.empty(len(lons))
+        sample[pts[win]] = hit_sample[win]
+        dist[pts[win]] = dist_km[win]
+        az[pts[win]] = np.asarray(fwd_az)[win]
+        return sample, dist, az
+
+    def nearest(self, lons, lats):
+        """
+        Nearest country for each point.
+
+        Points inside a country get that country at distance 0 with direction None;
+        other points get the country owning the closest boundary sample, the WGS84
+        distance to it and the 8-way direction from the point towards it.
+
+        Returns:
+            tuple: (names, distances_km, directions) lists.
+        """
+        lons, lats = _as_arrays(lons, lats)
+        names, dists, dirs = [None] * len(lons), np.zeros(len(lons)), [None] * len(lons)
+        for start in range(0, len(lons), POINT_CHUNK):
+            lo, la = lons[start:start+POINT_CHUNK], lats[start:start+POINT_CHUNK]
+            inside = self.locate_index(lo, la)
+            outside = np.nonzero(inside < 0)[0]
+            for k in np.nonzero(inside >= 0)[0].tolist():
+                names[start + k] = self.names[inside[k]]
+            if len(outside) == 0:
+                continue
+            sample, dist, fwd_az = self._nearest_samples(lo[outside], la[outside])
+            for k, owner, d, sector in zip(outside.tolist(), self._owner[sample].tolist(),
+                                           dist.tolist(), _sectors(fwd_az)):
+                names[start + k] = self.names[owner]
+                dists[start + k] = d
+                dirs[start + k] = sector
+        return names, dists.tolist(), dirs
+
+    def distance_to(self, lons, lats, country):
+        """
+        WGS84 distance (km) and 8-way direction from each point to one country's boundary.
+
+        Points inside the country get (0.0, None).
+        """
+        lons, lats = _as_arrays(lons, lats)
+        k = self._index(country)
+        src = self.sources[self.names[k]]
+        if src is None:
+            return [None] * len(lons), ["unknown"] * len(lons)
+        dists, dirs = np.zeros(len(lons)), [None] * len(lons)
+        rows = max(1, 2_000_000 // len(src))
+        for start in range(0, len(lons), rows):
+            lo, la = lons[start:start+rows], lats[start:start+rows]
+            outside = np.nonzero(self.locate_index(lo, la) != k)[0]
+            if len(outside) == 0:
+                continue
+            vP = _unit_vectors(lo[outside], la[outside])
+            c2 = np.sum((vP[:, None, :] - src.vectors[None, :, :]) ** 2, axis=2)
+            limit = _chord2_threshold(c2.min(axis=1))
+            pts, samp = np.nonzero(c2 <= limit[:, None])
+            _, _, dist_m = geod.inv(lo[outside][pts], la[outside][pts], src.lon[samp], src.lat[samp])
+            dist_km = np.asarray(dist_m) / 1000.0
+            win = _first_min_per_group(pts, dist_km)
+            fwd_az, _, _ = geod.inv(lo[outside][pts[win]], la[outside][pts[win]], src.lon[samp[win]], src.lat[samp[win]])
+            for p, d, sector in zip(pts[win].tolist(), dist_km[win].tolist(), _sectors(fwd_az)):
+                dists[start + outside[p]] = d
+                dirs[start + outside[p]] = sector
+        return dists.tolist(), dirs
+
+
+def bench(locator, count, seed=0):
+    """
+    Times nearest() on `count` points spread uniformly over the sphere.
+    """
+    rng = np.random.default_rng(seed)
+    lons = rng.uniform(-180.0, 180.0, count)
+    lats = np.degrees(np.arcsin(rng.uniform(-1.0, 1.0, count)))
+    t0 = time.time()
+    locator.nearest(lons, lats)
+    elapsed = time.time() - t0
+    rate = count / elapsed * 60.0 / 1e6
+    print(f"==> nearest: {count} random points in {elapsed:.1f}s ({rate:.2f}M points/min)")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Map coordinates to the containing / nearest country.")
+    parser.add_argument("points", nargs="?", help="CSV file with 'lon' and 'lat' columns (other columns are kept).")
+    parser.add_argument("-o", "--output", help="Output CSV (default: <points>_countries.csv).")
+    parser.add_argument("--to", metavar="COUNTRY", help="Also report distance and direction to this country.")
+    parser.add_argument("--resolution", default=DEFAULT_RESOLUTION)
+    parser.add_argument("--bench", type=int, metavar="N",
+                        help="Time nearest() on N random points instead of reading a CSV.")
+    args = parser.parse_args()
+    if args.bench is not None:
+        if args.bench <= 0:
+            parser.error("--bench must be positive")
+        t0 = time.time()
+        locator = CountryLocator(resolution=args.resolution)
+        print(f"==> Index built in {time.time() - t0:.1f}s")
+        bench(locator, args.bench)
+        return 0
+    if args.points is None:
+        parser.error("a points CSV is required unless --bench is given")
+
+    try:
+        with open(args.points, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+        lons = [float(r["lon"]) for r in rows]
+        lats = [float(r["lat"]) for r in rows]
+    except FileNotFoundError:
+        print(f"Error: The file '{args.points}' was not found.")
+        return 1
+    except (KeyError, ValueError) as e:
+        print(f"Error: Expected numeric 'lon' and 'lat' columns ({e}).")
+        return 1
+
+    t0 = time.time()
+    locator = CountryLocator(resolution=args.resolution)
+    t1 = time.time()
+    containing = locator.locate(lons, lats)
+    nearest, dist, direction = locator.nearest(lons, lats)
+    for r, c, n, d, s in zip(rows, containing, nearest, dist, direction):
+        r.update({"country": c or "", "nearest": n, "nearest_km": f"{d:.1f}", "nearest_dir": s or ""})
+    if args.to:
+        to_dist, to_dir = locator.distance_to(lons, lats, args.to)
+        for r, d, s in zip(rows, to_dist, to_dir):
+            r.update({"to_km": "" if d is None else f"{d:.1f}", "to_dir": s or ""})
+    t2 = time.time()
+
+    output = args.output or args.points.rsplit(".", 1)[0] + "_countries.csv"
+    with open(output, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()) if rows else ["lon", "lat"])
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"==> Index built in {t1 - t0:.1f}s, {len(rows)} points looked up in {t2 - t1:.1f}s")
+    print(f"==> Saved results to '{output}'")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
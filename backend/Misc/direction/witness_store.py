@@ -0,0 +1,169 @@
+import argparse
+import json
+import os
+import sys
+import numpy as np
+
+##############################################################################
+# WITNESS STORE
+#
+# For every ordered pair (row -> column) the engine keeps the two witness
+# points of the closest pair, their WGS84 distance and the raw forward / back
+# azimuths from geod.inv. Any compass binning (8, 16, 32 points or plain
+# degrees) is then a vectorized post-process over these arrays instead of a
+# full geometry recompute.
+#
+# Only pairs with row <= column are computed; the other half is mirrored from
+# the transpose (witnesses swapped, forward and back azimuths swapped) and
+# flagged in `mirrored`, so the legacy "opposite sector" rule can be replayed.
+##############################################################################
+
+DEFAULT_WITNESS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "outputs", "country_witnesses.npz")
+
+COMPASS_POINTS = {
+    8: ["N", "NE", "E", "SE", "S", "SW", "W", "NW"],
+    16: ["N", "NNE", "NE", "ENE", "E", "ESE", "SE", "SSE",
+         "S", "SSW", "SW", "WSW", "W", "WNW", "NW", "NNW"],
+    32: ["N", "NbE", "NNE", "NEbN", "NE", "NEbE", "ENE", "EbN",
+         "E", "EbS", "ESE", "SEbE", "SE", "SEbS", "SSE", "SbE",
+         "S", "SbW", "SSW", "SWbS", "SW", "SWbW", "WSW", "WbS",
+         "W", "WbN", "WNW", "NWbW", "NW", "NWbN", "NNW", "NbW"],
+}
+
+_FIELDS = ("lon_a", "lat_a", "lon_b", "lat_b", "dist_km", "fwd_az", "back_az")
+
+
+class WitnessStore:
+    def __init__(self, names):
+        self.names = list(names)
+        n = len(self.names)
+        for field in _FIELDS:
+            setattr(self, field, np.full((n, n), np.nan, dtype=np.float64))
+        self.mirrored = np.zeros((n, n), dtype=bool)
+
+    def record(self, i, j, best, fwd_az, back_az, dist_km):
+        """
+        Stores the closest pair best = (lonA, latA, lonB, latB) for row i -> column j.
+        """
+        self.lon_a[i, j], self.lat_a[i, j], self.lon_b[i, j], self.lat_b[i, j] = best
+        self.fwd_az[i, j], self.back_az[i, j], self.dist_km[i, j] = fwd_az, back_az, dist_km
+
+    def mirror(self, i, j):
+        """
+        Fills row i -> column j from the already computed j -> i.
+        """
+        self.lon_a[i, j], self.lat_a[i, j] = self.lon_b[j, i], self.lat_b[j, i]
+        self.lon_b[i, j], self.lat_b[i, j] = self.lon_a[j, i], self.lat_a[j, i]
+        self.fwd_az[i, j], self.back_az[i, j] = self.back_az[j, i], self.fwd_az[j, i]
+        self.dist_km[i, j] = self.dist_km[j, i]
+        self.mirrored[i, j] = True
+
+    def save(self, file_path):
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        tmp = file_path + ".tmp.npz"
+        np.savez_compressed(tmp, names=np.array(self.names), mirrored=self.mirrored,
+                            **{field: getattr(self, field) for field in _FIELDS})
+        os.replace(tmp, file_path)
+
+    @classmethod
+    def load(cls, file_path):
+        with np.load(file_path) as data:
+            store = cls(data["names"].tolist())
+            for field in _FIELDS:
+                setattr(store, field, data[field])
+            store.mirrored = data["mirrored"]
+        return store
+
+
+def normalize_azimuth(az):
+    # Same two normalizations direction_point_to_point + azimuth_to_8dir apply
+    return ((az + 360.0) % 360.0 + 360.0) % 360.0
+
+
+def bin_azimuths(az, points):
+    """
+    Compass sector index (0 = N, clockwise) for each azimuth.
+
+    Sector k covers [k*w - w/2, k*w + w/2) with w = 360/points, which for 8
+    points is exactly azimuth_to_8dir.
+    """
+    width = 360.0 / points
+    edges = width / 2.0 + width * np.arange(points)
+    a = normalize_azimuth(np.asarray(az, dtype=np.float64))
+    return np.searchsorted(edges, a, side="right") % points
+
+
+def sector_matrix(store, points=8, mirror="opposite"):
+    """
+    Bins every stored pair into `points` compass sectors.
+
+    Args:
+        store (WitnessStore): The stored witnesses.
+        points (int): 8, 16 or 32.
+        mirror (str): "opposite" reproduces the engine's rule (a mirrored cell is
+                      the opposite of its transpose); "geodesic" uses the true
+                      azimuth from the row's witness to the column's.
+
+    Returns:
+        numpy.ndarray: Sector indices, -1 where no pair was stored.
+    """
+    known = ~np.isnan(store.fwd_az)
+    sectors = bin_azimuths(np.where(known, store.fwd_az, 0.0), points)
+    if mirror == "opposite":
+        source = bin_azimuths(np.where(known, store.back_az, 0.0), points)
+        sectors = np.where(store.mirrored, (source + points // 2) % points, sectors)
+    elif mirror != "geodesic":
+        raise ValueError(f"Unknown mirror mode '{mirror}'")
+    return np.where(known, sectors, -1)
+
+
+def direction_map_from_store(store, points=8, mirror="opposite", degrees=False):
+    """
+    Rebuilds a {country: {country: direction}} dict from the store.
+
+    The diagonal is None and pairs without geometry are "unknown", as in the
+    engine's own output. With degrees=True the values are bearings rounded to 0.1.
+    """
+    n = len(store.names)
+    if degrees:
+        az = normalize_azimuth(np.where(store.mirrored & (mirror == "opposite"),
+                                        store.back_az + 180.0, store.fwd_az))
+        values = [[None if np.isnan(az[i, j]) else round(float(az[i, j]), 1) % 360.0
+                   for j in range(n)] for i in range(n)]
+    else:
+        labels = COMPASS_POINTS[points]
+        sectors = sector_matrix(store, points, mirror)
+        values = [[labels[k] if k >= 0 else "unknown" for k in row] for row in sectors.tolist()]
+    result = {}
+    for i, c1 in enumerate(store.names):
+        result[c1] = {c2: (None if i == j else values[i][j]) for j, c2 in enumerate(store.names)}
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-bin the stored witness pairs without recomputing geometry.")
+    parser.add_argument("--witnesses", default=DEFAULT_WITNESS_FILE, help="Witness store written by country_directions.py.")
+    parser.add_argument("--points", type=int, choices=sorted(COMPASS_POINTS), default=8)
+    parser.add_argument("--degrees", action="store_true", help="Write raw bearings in degrees instead of sectors.")
+    parser.add_argument("--mirror", choices=("opposite", "geodesic"), default="opposite",
+                        help="How to treat mirrored pairs (default: opposite sector, as the engine does).")
+    parser.add_argument("-o", "--output", help="Output JSON file.")
+    args = parser.parse_args()
+
+    try:
+        store = WitnessStore.load(args.witnesses)
+    except FileNotFoundError:
+        print(f"Error: The witness store '{args.witnesses}' was not found. Run country_directions.py first.")
+        return 1
+
+    suffix = "degrees" if args.degrees else f"{args.points}pt"
+    output = args.output or os.path.join(os.path.dirname(DEFAULT_WITNESS_FILE), f"country_directions_{suffix}.json")
+    result = direction_map_from_store(store, args.points, args.mirror, args.degrees)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    print(f"==> Saved {suffix} matrix to '{output}'")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,385 @@
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import numpy as np
+
+from country_directions import (
+    DEFAULT_RESOLUTION, NATURAL_EARTH_RESOLUTIONS, BOUNDARY_SAMPLERS, DEFAULT_SAMPLER, VALID_COUNTRIES,
+    geod, azimuth_to_8dir, normalize_name, get_sample_size, load_country_geometries,
+    geometry_cache_file, sample_source_for, min_pair, OUTPUT_DIR,
+)
+from matrix_io import OPPOSITE_DIRECTIONS
+from cost_model import load_costs, shard_bounds
+from witness_store import WitnessStore
+from validate_matrices import validate_matrices
+
+##############################################################################
+# FILE-BASED WORK QUEUE
+#
+# Everything lives in one shared directory, so any number of worker
+# processes, on one box or on several machines with a shared mount, can take
+# part without a queue service:
+#
+#   config.json            countries, resolution, sampler, geometry key
+#   shards/0007.json       {"pairs": [[i, j], ...]}  (row i < column j)
+#   leases/0007.lease      claimed by a worker (created with O_EXCL);
+#                          its mtime is the heartbeat
+#   results/0007.npz       the computed pairs; a shard is done once this exists
+#
+# A lease whose mtime is older than LEASE_TIMEOUT belongs to a dead worker.
+# It is taken over by renaming it away (atomic, so only one worker wins) and
+# claiming the shard again. Results are written to a temp file and renamed,
+# so a half-written result is never seen.
+##############################################################################
+
+DEFAULT_SHARDS = 64
+LEASE_TIMEOUT = 300.0     # seconds without a heartbeat before a lease is considered dead
+HEARTBEAT_EVERY = 30.0    # seconds between lease touches while computing
+RESULT_FIELDS = ("lon_a", "lat_a", "lon_b", "lat_b", "fwd_az", "back_az", "dist_km")
+
+
+def _path(queue_dir, *parts):
+    return os.path.join(queue_dir, *parts)
+
+
+def _write_json(path, data):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def _read_json(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def shard_ids(queue_dir):
+    return sorted(name[:-5] for name in os.listdir(_path(queue_dir, "shards")) if name.endswith(".json"))
+
+
+##############################################################################
+# COORDINATOR
+##############################################################################
+
+def plan_queue(queue_dir, countries=None, shards=DEFAULT_SHARDS, resolution=DEFAULT_RESOLUTION,
+               sampler=DEFAULT_SAMPLER, costs=None):
+    """
+    Splits the pairs row < column into shards of roughly equal cost.
+
+    The cost of a pair is its estimate in `costs` ({(row, column): seconds},
+    see cost_model.py) or, without one, the product of the two sample counts.
+    Every planned pair must have an estimate (ValueError otherwise).
+    Shards are contiguous runs of the row-major pair order, so a worker keeps
+    reusing the same row country's samples.
+    """
+    names = sorted(countries or VALID_COUNTRIES)
+    for sub in ("shards", "leases", "results"):
+        os.makedirs(_path(queue_dir, sub), exist_ok=True)
+    if os.listdir(_path(queue_dir, "shards")):
+        raise FileExistsError(f"'{queue_dir}' already holds a plan")
+
+    pairs = [(i, j) for i in range(len(names)) for j in range(i + 1, len(names))]
+    if costs:
+        missing = [(names[i], names[j]) for i, j in pairs if (names[i], names[j]) not in costs]
+        if missing:
+            raise ValueError(f"No cost estimate for {len(missing)} pair(s), e.g. {missing[0][0]} -> {missing[0][1]}")
+        cost = np.array([costs[(names[i], names[j])] for i, j in pairs], dtype=np.float64)
+    else:
+        cost = np.array([get_sample_size(names[i]) * get_sample_size(names[j]) for i, j in pairs], dtype=np.float64)
+    bounds = shard_bounds(cost, shards)
+
+    written = 0
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        if hi > lo:
+            _write_json(_path(queue_dir, "shards", f"{written:04d}.json"), {"pairs": pairs[lo:hi]})
+            written += 1
+    _write_json(_path(queue_dir, "config.json"), {
+        "countries": names, "resolution": resolution, "sampler": sampler,
+        "geometry": os.path.basename(geometry_cache_file(resolution)),
+    })
+    return written
+
+
+def queue_status(queue_dir):
+    """{"done": [...], "leased": [...], "stale": [...], "pending": [...]} shard ids."""
+    status = {"done": [], "leased": [], "stale": [], "pending": []}
+    now = time.time()
+    for shard in shard_ids(queue_dir):
+        lease = _path(queue_dir, "leases", shard + ".lease")
+        if os.path.exists(_path(queue_dir, "results", shard + ".npz")):
+            status["done"].append(shard)
+        elif os.path.exists(lease):
+            try:
+                fresh = now - os.path.getmtime(lease) < LEASE_TIMEOUT
+            except FileNotFoundError:
+                fresh = False
+            status["leased" if fresh else "stale"].append(shard)
+        else:
+            status["pending"].append(shard)
+    return status
+
+
+##############################################################################
+# WORKER
+##############################################################################
+
+def _claim(queue_dir, shard, worker_id):
+    """
+    Takes the lease of a shard. Returns True if this worker now owns it.
+    """
+    lease = _path(queue_dir, "leases", shard + ".lease")
+    try:
+        if time.time() - os.path.getmtime(lease) < LEASE_TIMEOUT:
+            return False
+        # Dead owner: only the worker whose rename succeeds may retry the claim
+        os.replace(lease, f"{lease}.{worker_id}.stale")
+        os.remove(f"{lease}.{worker_id}.stale")
+    except FileNotFoundError:
+        pass
+    try:
+        fd = os.open(lease, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        return False
+    with os.fdopen(fd, "w") as f:
+        json.dump({"worker": worker_id, "host": socket.gethostname(), "pid": os.getpid(), "claimed": time.time()}, f)
+    return True
+
+
+def _owns(queue_dir, shard, worker_id):
+    try:
+        return _read_json(_path(queue_dir, "leases", shard + ".lease")).get("worker") == worker_id
+    except (FileNotFoundError, ValueError):
+        return False
+
+
+def compute_shard(pairs, sources, names, heartbeat=None):
+    """
+    Runs the normal min-pair kernel over a shard's pairs.
+
+    Returns:
+        dict: i, j and one array per RESULT_FIELDS entry (NaN where a country has no geometry).
+    """
+    out = {field: np.full(len(pairs), np.nan) for field in RESULT_FIELDS}
+    for k, (i, j) in enumerate(pairs):
+        best = min_pair(sources[names[i]], sources[names[j]])
+        if best:
+            fwd_az, back_az, dist_m = geod.inv(*best)
+            out["lon_a"][k], out["lat_a"][k], out["lon_b"][k], out["lat_b"][k] = best
+            out["fwd_az"][k], out["back_az"][k], out["dist_km"][k] = fwd_az, back_az, dist_m / 1000.0
+        if heartbeat:
+            heartbeat()
+    out["i"] = np.array([p[0] for p in pairs], dtype=np.int32)
+    out["j"] = np.array([p[1] for p in pairs], dtype=np.int32)
+    return out
+
+
+def run_worker(queue_dir, worker_id=None):
+    """
+    Claims and computes shards until none are left. Returns the number computed.
+    """
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    config = _read_json(_path(queue_dir, "config.json"))
+    if os.path.basename(geometry_cache_file(config["resolution"])) != config["geometry"]:
+        raise RuntimeError("This worker's shapefile or filtering rules differ from the planned ones")
+    names = config["countries"]
+    polygons, sources = None, {}
+    computed = 0
+
+    while True:
+        status = queue_status(queue_dir)
+        todo = status["pending"] + status["stale"]
+        if not todo:
+            break
+        claimed = next((shard for shard in todo if _claim(queue_dir, shard, worker_id)), None)
+        if claimed is None:
+            time.sleep(1.0)
+            continue
+
+        lease = _path(queue_dir, "leases", claimed + ".lease")
+        last_beat = time.time()
+
+        def heartbeat():
+            nonlocal last_beat
+            if time.time() - last_beat >= HEARTBEAT_EVERY:
+                os.utime(lease)
+                last_beat = time.time()
+
+        pairs = [tuple(p) for p in _read_json(_path(queue_dir, "shards", claimed + ".json"))["pairs"]]
+        if polygons is None:
+            polygons = load_country_geometries(config["resolution"])
+        for c in {names[k] for p in pairs for k in p} - set(sources):
+            sources[c] = sample_source_for(c, polygons, sampler=config["sampler"])
+
+        t0 = time.time()
+        result = compute_shard(pairs, sources, names, heartbeat)
+        if not _owns(queue_dir, claimed, worker_id):
+            # Taken over while this worker looked dead: the lease is someone else's now
+            print(f"[{worker_id}] shard {claimed}: lease lost, result dropped", flush=True)
+            continue
+        tmp = _path(queue_dir, "results", f"{claimed}.{worker_id}.tmp.npz")
+        np.savez(tmp, **result)
+        os.replace(tmp, _path(queue_dir, "results", claimed + ".npz"))
+        computed += 1
+        print(f"[{worker_id}] shard {claimed}: {len(pairs)} pairs in {time.time() - t0:.1f}s", flush=True)
+        try:
+            os.remove(lease)
+        except FileNotFoundError:
+            pass
+    return computed
+
+
+##############################################################################
+# MERGE
+##############################################################################
+
+def merge_queue(queue_dir):
+    """
+    Assembles the shard results into the direction map and witness store.
+
+    Applies the same rules as country_directions.main (diagonal None, no pair
+    -> "unknown", j < i mirrored as the opposite sector), checks that every
+    pair row < column was computed exactly once and runs validate_matrices
+    over the result and the witness distances.
+
+    Returns:
+        tuple: (direction_map, WitnessStore, problems list)
+    """
+    config = _read_json(_path(queue_dir, "config.json"))
+    names = config["countries"]
+    n = len(names)
+    status = queue_status(queue_dir)
+    problems = [f"shard {s} not done" for s in status["leased"] + status["stale"] + status["pending"]]
+
+    store = WitnessStore(names)
+    seen = np.zeros((n, n), dtype=np.int32)
+    for shard in status["done"]:
+        with np.load(_path(queue_dir, "results", shard + ".npz")) as data:
+            result = {key: data[key] for key in data.files}
+        for k, (i, j) in enumerate(zip(result["i"].tolist(), result["j"].tolist())):
+            seen[i, j] += 1
+            if not np.isnan(result["dist_km"][k]):
+                best = tuple(float(result[f][k]) for f in ("lon_a", "lat_a", "lon_b", "lat_b"))
+                store.record(i, j, best, result["fwd_az"][k], result["back_az"][k], result["dist_km"][k])
+
+    upper = np.triu(np.ones((n, n), dtype=bool), k=1)
+    for i, j in zip(*np.nonzero(upper & (seen != 1))):
+        problems.append(f"pair '{names[i]}' -> '{names[j]}' computed {seen[i, j]} times")
+
+    direction_map = {c: {} for c in names}
+    for i, c1 in enumerate(names):
+        for j, c2 in enumerate(names):
+            if j < i:
+                prev = direction_map[c2][c1]
+                direction_map[c1][c2] = OPPOSITE_DIRECTIONS.get(prev, prev)
+                store.mirror(i, j)
+            elif i == j:
+                direction_map[c1][c2] = None
+            elif np.isnan(store.fwd_az[i, j]):
+                direction_map[c1][c2] = "unknown"
+            else:
+                direction_map[c1][c2] = azimuth_to_8dir((store.fwd_az[i, j] + 360.0) % 360.0)
+
+    if not problems:
+        distances = {c1: {c2: 0.0 if i == j else (None if np.isnan(store.dist_km[i, j]) else float(store.dist_km[i, j]))
+                          for j, c2 in enumerate(names)} for i, c1 in enumerate(names)}
+        violations, _ = validate_matrices(distances, direction_map)
+        for check, c1, c2, detail in violations:
+            problems.append(f"[{check}] '{c1}' -> '{c2}': {detail}")
+    return direction_map, store, problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute the direction matrix through a shared-directory work queue.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("plan", help="Split the pair space into shards.")
+    p.add_argument("queue_dir")
+    p.add_argument("--shards", type=int, default=DEFAULT_SHARDS)
+    p.add_argument("--countries", help="Comma-separated subset (default: all valid countries).")
+    p.add_argument("--resolution", choices=sorted(NATURAL_EARTH_RESOLUTIONS), default=DEFAULT_RESOLUTION)
+    p.add_argument("--sampler", choices=sorted(BOUNDARY_SAMPLERS), default=DEFAULT_SAMPLER)
+    p.add_argument("--costs", help="Pair cost estimates from cost_model.py to balance the shards with.")
+
+    p = sub.add_parser("work", help="Claim and compute shards until the queue is empty.")
+    p.add_argument("queue_dir")
+    p.add_argument("--worker-id")
+
+    p = sub.add_parser("status", help="Show shard progress.")
+    p.add_argument("queue_dir")
+
+    p = sub.add_parser("merge", help="Assemble and validate the final matrix.")
+    p.add_argument("queue_dir")
+    p.add_argument("-o", "--output", default=os.path.join(OUTPUT_DIR, "country_directions.json"))
+    p.add_argument("--witnesses", help="Also save the witness store here.")
+
+    p = sub.add_parser("local", help="Plan, run N local worker processes and merge.")
+    p.add_argument("queue_dir")
+    p.add_argument("-j", "--workers", type=int, default=os.cpu_count() or 1)
+    p.add_argument("--shards", type=int, default=DEFAULT_SHARDS)
+    p.add_argument("--countries")
+    p.add_argument("--resolution", choices=sorted(NATURAL_EARTH_RESOLUTIONS), default=DEFAULT_RESOLUTION)
+    p.add_argument("--sampler", choices=sorted(BOUNDARY_SAMPLERS), default=DEFAULT_SAMPLER)
+    p.add_argument("--costs")
+    p.add_argument("-o", "--output", default=os.path.join(OUTPUT_DIR, "country_directions.json"))
+    args = parser.parse_args()
+
+    if args.command in ("plan", "local"):
+        countries = None
+        if args.countries:
+            countries = [normalize_name(c) for c in args.countries.split(",")]
+            unknown = [c for c in countries if c not in VALID_COUNTRIES]
+            if unknown:
+                print(f"Error: Unknown countries: {', '.join(unknown)}")
+                return 1
+        try:
+            costs = load_costs(args.costs, args.resolution, args.sampler) if args.costs else None
+            count = plan_queue(args.queue_dir, countries, args.shards, args.resolution, args.sampler, costs)
+        except (FileExistsError, FileNotFoundError, ValueError) as e:
+            print(f"Error: {e}")
+            return 1
+        print(f"==> Planned {count} shards in '{args.queue_dir}'")
+        if args.command == "plan":
+            return 0
+        t0 = time.time()
+        procs = [subprocess.Popen([sys.executable, os.path.abspath(__file__), "work", args.queue_dir,
+                                   "--worker-id", f"local-{k}"]) for k in range(args.workers)]
+        failed = sum(proc.wait() != 0 for proc in procs)
+        print(f"==> {args.workers} workers finished in {time.time() - t0:.1f}s ({failed} failed)")
+
+    if args.command == "work":
+        try:
+            computed = run_worker(args.queue_dir, args.worker_id)
+        except RuntimeError as e:
+            print(f"Error: {e}")
+            return 1
+        print(f"==> Worker computed {computed} shard(s)")
+        return 0
+
+    if args.command == "status":
+        for key, shards in queue_status(args.queue_dir).items():
+            print(f"{key:<8} {len(shards)}")
+        return 0
+
+    direction_map, store, problems = merge_queue(args.queue_dir)
+    if problems:
+        print(f"FAILED: {len(problems)} problem(s), nothing written.")
+        for problem in problems[:20]:
+            print(f"  {problem}")
+        return 1
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(direction_map, f, indent=2)
+    print(f"==> Saved matrix to '{args.output}'")
+    if getattr(args, "witnesses", None):
+        store.save(args.witnesses)
+        print(f"==> Saved witness store to '{args.witnesses}'")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
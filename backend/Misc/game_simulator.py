@@ -0,0 +1,254 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from lookup_service import GameTables
+
+##############################################################################
+# GAME SIMULATOR
+#
+# Plays rounds with the rules of server.js: the answer is one of the data.json
+# countries, three commodities are shown at the start, and every wrong guess
+# gives its distance and direction (answer row of the matrices) and reveals
+# one more commodity, up to ten.
+#
+# The simulated player keeps the answers that are still consistent with
+# everything seen as a boolean mask and picks the guess whose feedback splits
+# that set best (highest entropy over the remaining candidates). Feedback for
+# every (answer, guess) is precomputed as one int64 key, so scoring all
+# guesses is a sort over a (candidates x guesses) block.
+#
+# --clues sets what the player takes from the commodities. "names" (the
+# default) models a real player, who reads the product names off the screen.
+# "values" also matches the displayed trade values, which no one carries in
+# their head; it narrows nearly every round to one country before the first
+# guess (mean ~1.01), so it is a check of the data rather than of the game.
+# "none" plays from distance and direction alone. Every mode assumes perfect
+# recall of data.json and the matrices, so even "names" is a lower bound on
+# the guesses a person needs.
+##############################################################################
+
+MAX_GUESSES = 40            # a round that gets this far counts as unsolved
+START_VISIBLE = 3           # server.js: room.commoditiesVisible = 3
+WIN_KEY = -100              # feedback key of a correct guess (never a distance/direction key)
+CLUES = ("values", "names", "none")
+
+
+def format_value(value):
+    """server.js formatValue: what the player actually sees next to a commodity."""
+    if value >= 1e9: return f"{value / 1e9:.1f} Billion"
+    if value >= 1e6: return f"{value / 1e6:.1f} Million"
+    if value >= 1e3: return f"{value / 1e3:.1f} Thousand"
+    return str(int(value)) if float(value).is_integer() else str(value)
+
+
+class GameModel:
+    """
+    The arrays a simulated round needs, derived from GameTables.
+
+        answers    (A,)      data.json countries, lowercased
+        guesses    (G,)      every name the player can submit: the matrix names,
+                             plus answers that have no matrix row
+        feedback   (A, G)    int64 key of (distance in 0.1 km, direction code),
+                             WIN_KEY where guess == answer
+        shown      (A, 10)   int32 id of (commodity, formatted value) per rank, -1 past the list
+        names      (A, 10)   int32 commodity code per rank (the clue without its value)
+    """
+
+    def __init__(self, tables):
+        self.answers = list(tables.answers)
+        self.guesses = list(tables.names) + [a for a in self.answers if a not in tables.index]
+        self.guess_index = {name: g for g, name in enumerate(self.guesses)}
+
+        a_idx = np.array([tables.index.get(a, -1) for a in self.answers])
+        g_idx = np.array([tables.index.get(g, -1) for g in self.guesses])
+        known = (a_idx[:, None] >= 0) & (g_idx[None, :] >= 0)
+        a_safe, g_safe = np.maximum(a_idx, 0)[:, None], np.maximum(g_idx, 0)[None, :]
+        dist = np.where(known, tables.distance[a_safe, g_safe], np.nan)
+        codes = np.where(known, tables.direction[a_safe, g_safe], -1).astype(np.int64)
+        dist_key = np.where(np.isnan(dist), -1, np.round(np.nan_to_num(dist) * 10.0)).astype(np.int64)
+        self.feedback = dist_key * 16 + (codes + 8)
+        self.answer_guess = np.array([self.guess_index[a] for a in self.answers])
+        self.feedback[np.arange(len(self.answers)), self.answer_guess] = WIN_KEY
+
+        display = {}
+        self.shown = np.full(tables.export_codes.shape, -1, dtype=np.int32)
+        for i, j in zip(*np.nonzero(tables.export_codes >= 0)):
+            key = (int(tables.export_codes[i, j]), format_value(float(tables.export_values[i, j])))
+            self.shown[i, j] = display.setdefault(key, len(display))
+        self.names = tables.export_codes.astype(np.int32)
+        self.in_matrices = a_idx >= 0
+
+    def clue_table(self, clues):
+        """The per-rank clue ids for a CLUES mode, or None when commodities are ignored."""
+        return {"values": self.shown, "names": self.names, "none": None}[clues]
+
+    def start_candidates(self, answer, clues="names"):
+        table = self.clue_table(clues)
+        if table is None:
+            return len(self.answers)
+        return int((table[:, :START_VISIBLE] == table[answer, :START_VISIBLE]).all(axis=1).sum())
+
+    def guess_entropy(self, mask):
+        """
+        Entropy (bits) of the feedback each guess would give over the candidates in mask.
+        """
+        block = np.sort(self.feedback[mask], axis=0)
+        n, g = block.shape
+        starts = np.ones_like(block, dtype=bool)
+        starts[1:] = block[1:] != block[:-1]
+        pos = np.flatnonzero(starts.T.ravel())          # run starts, column by column
+        runs = np.diff(np.append(pos, n * g)).astype(np.float64)
+        sum_clogc = np.bincount(pos // n, weights=runs * np.log2(runs), minlength=g)
+        return np.log2(n) - sum_clogc / n
+
+    def play(self, answer, rng, explore=0.0, clues="names"):
+        """
+        Plays one round for answer index `answer`.
+
+        Args:
+            rng (numpy.random.Generator): Breaks ties between equally good guesses.
+            explore (float): Probability of a uniformly random guess instead of the best one.
+            clues (str): What the player takes from the revealed commodities, one of
+                         CLUES: names and displayed values, names only, or nothing.
+
+        Returns:
+            int: Guesses used including the correct one (MAX_GUESSES + 1 if unsolved).
+        """
+        table = self.clue_table(clues)
+        mask = np.ones(len(self.answers), dtype=bool)
+        visible = START_VISIBLE
+        if table is not None:
+            mask &= (table[:, :visible] == table[answer, :visible]).all(axis=1)
+        target = self.answer_guess[answer]
+
+        for turn in range(1, MAX_GUESSES + 1):
+            if mask.sum() == 1:
+                guess = self.answer_guess[np.flatnonzero(mask)[0]]
+            elif explore and rng.random() < explore:
+                guess = int(rng.integers(len(self.guesses)))
+            else:
+                score = self.guess_entropy(mask)
+                best = np.flatnonzero(score >= score.max() - 1e-9)
+                # Among equally informative guesses, one that can win right away
+                hits = np.intersect1d(best, self.answer_guess[mask])
+                guess = int(rng.choice(hits if len(hits) else best))
+            if guess == target:
+                return turn
+            mask &= self.feedback[:, guess] == self.feedback[answer, guess]
+            if visible < self.shown.shape[1]:
+                visible += 1
+                if table is not None:
+                    mask &= table[:, visible - 1] == table[answer, visible - 1]
+        return MAX_GUESSES + 1
+
+
+##############################################################################
+# MONTE CARLO OVER A PROCESS POOL
+##############################################################################
+
+_MODEL = None
+
+
+def _init_worker(distances_file, directions_file, data_file):
+    global _MODEL
+    _MODEL = GameModel(GameTables.load(distances_file, directions_file, data_file))
+
+
+def _simulate_answer(task):
+    answer, rounds, seed, explore, clues = task
+    rng = np.random.default_rng([seed, answer])
+    return answer, [_MODEL.play(answer, rng, explore, clues) for _ in range(rounds)]
+
+
+def simulate(model, rounds=20, seed=0, explore=0.0, clues="names", workers=1, files=(None, None, None)):
+    """
+    Plays `rounds` rounds for every answer.
+
+    Returns:
+        dict: {answer index: [guesses per round]}.
+    """
+    tasks = [(a, rounds, seed, explore, clues) for a in range(len(model.answers))]
+    if workers <= 1:
+        global _MODEL
+        _MODEL = model
+        return dict(map(_simulate_answer, tasks))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=files) as pool:
+        return dict(pool.map(_simulate_answer, tasks, chunksize=4))
+
+
+def difficulty_report(model, results, clues="names"):
+    """
+    Per-answer difficulty, hardest first.
+    """
+    rows = []
+    for a, counts in results.items():
+        counts = np.array(counts)
+        rows.append({
+            "country": model.answers[a],
+            "start_candidates": model.start_candidates(a, clues),
+            "mean_guesses": round(float(counts.mean()), 2),
+            "p90_guesses": int(np.percentile(counts, 90)),
+            "max_guesses": int(counts.max()),
+            "unsolved": int((counts > MAX_GUESSES).sum()),
+            "in_matrices": bool(model.in_matrices[a]),
+        })
+    rows.sort(key=lambda r: (-r["mean_guesses"], r["country"]))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate rounds with an information-gain guesser and report per-answer difficulty.")
+    parser.add_argument("--distances", help="Distance matrix JSON (default: backend/country_distances.json).")
+    parser.add_argument("--directions", help="Direction matrix JSON (default: backend/country_directions.json).")
+    parser.add_argument("--data", help="Export data JSON (default: backend/data.json).")
+    parser.add_argument("--rounds", type=int, default=20, help="Rounds per answer country.")
+    parser.add_argument("--explore", type=float, default=0.0,
+                        help="Probability of a random guess per turn (models a less careful player).")
+    parser.add_argument("--clues", choices=CLUES, default="names",
+                        help="What the player reads from the commodities: names and values, names only, or nothing.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--top", type=int, default=20, help="Hardest answers to print.")
+    parser.add_argument("-o", "--output", help="Write the full per-country report to this JSON file.")
+    args = parser.parse_args()
+
+    files = (args.distances, args.directions, args.data)
+    try:
+        model = GameModel(GameTables.load(*files))
+    except FileNotFoundError as e:
+        print(f"Error: The file '{e.filename}' was not found.")
+        return 1
+
+    t0 = time.time()
+    results = simulate(model, args.rounds, args.seed, args.explore, args.clues, args.workers, files)
+    rows = difficulty_report(model, results, args.clues)
+    total = np.concatenate([results[a] for a in results])
+    print(f"==> {len(total)} rounds over {len(rows)} answers in {time.time() - t0:.1f}s "
+          f"({args.workers} worker(s))")
+    print(f"    mean {total.mean():.2f} guesses, p90 {np.percentile(total, 90):.0f}, "
+          f"unsolved {(total > MAX_GUESSES).sum()}")
+    hist = np.bincount(np.minimum(total, 10), minlength=11)[1:]
+    print("    guesses: " + "  ".join(f"{k}{'+' if k == 10 else ''}:{c}" for k, c in enumerate(hist, start=1)))
+
+    print(f"\n{'country':<32} {'start':>5} {'mean':>6} {'p90':>4} {'max':>4}")
+    for row in rows[:args.top]:
+        note = "" if row["in_matrices"] else "  (no matrix row)"
+        print(f"{row['country']:<32} {row['start_candidates']:>5} {row['mean_guesses']:>6.2f} "
+              f"{row['p90_guesses']:>4} {row['max_guesses']:>4}{note}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"rounds": args.rounds, "explore": args.explore, "clues": args.clues,
+                       "countries": rows}, f, indent=2)
+        print(f"\n==> Saved report to '{args.output}'")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,15 @@
-import requests
+import argparse
 import json
+import os
+import shutil
+import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
+import requests
+
+from json_stream import iter_array_items
 
 # The final, corrected list of countries and their OEC IDs
 COUNTRIES = [
@@ -86,52 +95,371 @@ COUNTRIES = [
     {"name": "Zambia", "id": "afzmb"}, {"name": "Zimbabwe", "id": "afzwe"}
 ]
 
-# This is where we will store the final results
-all_countries_exports = {}
-
 # The base URL template with the CORRECT sort parameter
-URL_TEMPLATE = "https://api-v2.oec.world/tesseract/data.jsonrecords?cube=trade_i_baci_a_22&drilldowns=HS4,Exporter+Country&measures=Trade+Value&include=Exporter+Country:{}&time=Year.latest&sort=Trade+Value.desc&limit=10"
-
-# Loop through each country in our list
-for i, country in enumerate(COUNTRIES):
-    country_name = country["name"]
-    country_id = country["id"]
-    
-    # Construct the final URL for this country
-    url = URL_TEMPLATE.format(country_id)
-    
-    print(f"Fetching data for {country_name} ({i+1}/{len(COUNTRIES)})...")
-    
-    try:
-        # Make the API call
-        response = requests.get(url)
-        response.raise_for_status() 
+QUERY_URL = "https://api-v2.oec.world/tesseract/data.jsonrecords?cube=trade_i_baci_a_22&drilldowns=HS4,Exporter+Country&measures=Trade+Value&include=Exporter+Country:{country}{period}&sort=Trade+Value.desc"
+LATEST = "&time=Year.latest"
+URL_TEMPLATE = QUERY_URL.format(country="{}", period=LATEST) + "&limit=10"
+
+# Years the cube has data for
+YEARS_URL = "https://api-v2.oec.world/tesseract/members?cube=trade_i_baci_a_22&level=Year"
+
+# Full-depth mode: bytes per network read and rows buffered before a column flush
+STREAM_CHUNK_SIZE = 64 * 1024
+FLUSH_ROWS = 4096
+DEFAULT_FULL_DIR = "exports_full"
+DEFAULT_HISTORY_DIR = "exports_history"
+HISTORY_WORKERS = 4
+
+
+def fetch_top_exports():
+    # This is where we will store the final results
+    all_countries_exports = {}
+
+    # Loop through each country in our list
+    for i, country in enumerate(COUNTRIES):
+        country_name = country["name"]
+        country_id = country["id"]
         
-        api_data = response.json()["data"]
+        # Construct the final URL for this country
+        url = URL_TEMPLATE.format(country_id)
         
-        # Format the data exactly as requested
-        formatted_exports = []
-        for item in api_data:
-            formatted_exports.append({
-                "HS4": item.get("HS4"), 
-                "Total Trade Value": item.get("Trade Value")
-            })
-            
-        all_countries_exports[country_name] = formatted_exports
+        print(f"Fetching data for {country_name} ({i+1}/{len(COUNTRIES)})...")
         
-        time.sleep(0.5) 
+        try:
+            # Make the API call
+            response = requests.get(url)
+            response.raise_for_status() 
+            
+            api_data = response.json()["data"]
+            
+            # Format the data exactly as requested
+            formatted_exports = []
+            for item in api_data:
+                formatted_exports.append({
+                    "HS4": item.get("HS4"), 
+                    "Total Trade Value": item.get("Trade Value")
+                })
+                
+            all_countries_exports[country_name] = formatted_exports
+            
+            time.sleep(0.5) 
+
+        except requests.exceptions.RequestException as e:
+            print(f"  > Could not fetch data for {country_name}: {e}")
+        except KeyError:
+            print(f"  > Unexpected response format for {country_name}. 'data' key not found.")
+
+    # All done, print the final result
+    print("\n--- COMPLETE ---")
+    print(json.dumps(all_countries_exports, indent=2))
+
+    # Optional: Save the output to a file
+    with open("top_exports.json", "w") as f:
+        json.dump(all_countries_exports, f, indent=2)
+
+    print("\nResults also saved to top_exports.json")
+
+
+##############################################################################
+# FULL-DEPTH MODE
+#
+# The response is decoded record by record while it downloads and every
+# record goes straight into fixed-width column files, so memory stays flat
+# however many HS4 rows a country has. Layout of the output directory:
+#
+#   manifest.json   {"countries": [...], "hs4": [...], "hs4_ids": [...],
+#                    "offsets": [...], "columns": {name: dtype}}
+#   country.bin     int16   index into "countries"
+#   hs4.bin         int16   index into "hs4" / "hs4_ids"
+#   value.bin       float64 trade value
+#
+# Rows are grouped by country in COUNTRIES order, each group sorted by value
+# (descending, as the API returns them); country k owns rows
+# offsets[k]:offsets[k + 1].
+##############################################################################
+
+COLUMNS = {"country": "int16", "hs4": "int16", "value": "float64"}
+
+
+class ColumnWriter:
+    """
+    Appends (country, HS4, value) rows to the column files of one output directory.
+
+    Rows are buffered FLUSH_ROWS at a time; HS4 names are interned as they appear.
+    Everything is written to `<out_dir>.tmp` and moved into place by close(), so
+    an interrupted run never leaves a half-written dataset behind.
+    """
+
+    def __init__(self, out_dir, countries):
+        self.out_dir = out_dir
+        self.tmp_dir = out_dir.rstrip("/\\") + ".tmp"
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+        os.makedirs(self.tmp_dir)
+        self.countries = list(countries)
+        self.hs4, self.hs4_ids, self._code = [], [], {}
+        self.offsets = [0]
+        self.rows = 0
+        self._hs4_mark = 0
+        self._files = {name: open(os.path.join(self.tmp_dir, name + ".bin"), "wb") for name in COLUMNS}
+        self._buffer = {name: [] for name in COLUMNS}
+
+    def add(self, country_index, hs4_name, hs4_id, value):
+        code = self._code.get(hs4_name)
+        if code is None:
+            code = self._code[hs4_name] = len(self.hs4)
+            self.hs4.append(hs4_name)
+            self.hs4_ids.append(hs4_id)
+        self._buffer["country"].append(country_index)
+        self._buffer["hs4"].append(code)
+        self._buffer["value"].append(np.nan if value is None else value)
+        self.rows += 1
+        if len(self._buffer["value"]) >= FLUSH_ROWS:
+            self.flush()
+
+    def end_country(self):
+        """Marks the end of the current country's rows."""
+        self.offsets.append(self.rows)
+        self._hs4_mark = len(self.hs4)
+
+    def discard_country(self):
+        """Drops the rows (and the HS4 names first seen in them) added since the last end_country()."""
+        self.flush()
+        start = self.offsets[-1]
+        for name, dtype in COLUMNS.items():
+            f = self._files[name]
+            f.truncate(start * np.dtype(dtype).itemsize)
+            f.seek(0, os.SEEK_END)
+        for hs4_name in self.hs4[self._hs4_mark:]:
+            del self._code[hs4_name]
+        del self.hs4[self._hs4_mark:], self.hs4_ids[self._hs4_mark:]
+        self.rows = start
+
+    def flush(self):
+        for name, dtype in COLUMNS.items():
+            np.asarray(self._buffer[name], dtype=dtype).tofile(self._files[name])
+            self._buffer[name].clear()
+
+    def close(self):
+        self.flush()
+        for f in self._files.values():
+            f.close()
+        manifest = {"countries": self.countries, "hs4": self.hs4, "hs4_ids": self.hs4_ids,
+                    "offsets": self.offsets, "columns": COLUMNS}
+        with open(os.path.join(self.tmp_dir, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        shutil.rmtree(self.out_dir, ignore_errors=True)
+        os.replace(self.tmp_dir, self.out_dir)
+
+
+def read_columns(out_dir):
+    """
+    Opens a full-depth dataset without loading it: the columns are memory-mapped.
+
+    Returns:
+        tuple: (manifest dict, {column: numpy.memmap})
+    """
+    with open(os.path.join(out_dir, "manifest.json"), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    columns = {}
+    for name, dtype in manifest["columns"].items():
+        path = os.path.join(out_dir, name + ".bin")
+        columns[name] = np.memmap(path, dtype=dtype, mode="r") if os.path.getsize(path) else np.zeros(0, dtype)
+    return manifest, columns
+
+
+def country_exports(out_dir, country_name):
+    """
+    A country's full distribution as [{"HS4": ..., "Total Trade Value": ...}], like data.json.
+    """
+    manifest, columns = read_columns(out_dir)
+    k = manifest["countries"].index(country_name)
+    lo, hi = manifest["offsets"][k], manifest["offsets"][k + 1]
+    return [{"HS4": manifest["hs4"][code], "Total Trade Value": value}
+            for code, value in zip(columns["hs4"][lo:hi].tolist(), columns["value"][lo:hi].tolist())]
+
+
+def fetch_full_exports(out_dir=DEFAULT_FULL_DIR, depth=None, year=None):
+    """
+    Streams every country's complete HS4 distribution (or its top `depth` rows) to column files.
+
+    Args:
+        out_dir (str): Target directory (replaced once the fetch completes).
+        depth (int): Optional row limit per country.
+        year (int): Trade year to fetch (default: the latest one).
+
+    Returns:
+        tuple: (rows written, names of the countries that could not be fetched).
+    """
+    label = f"[{year}] " if year else ""
+    period = f";Year:{year}" if year else LATEST
+    names = [country["name"] for country in COUNTRIES]
+    writer = ColumnWriter(out_dir, names)
+    failed = []
+    for i, country in enumerate(COUNTRIES):
+        country_name = country["name"]
+        url = QUERY_URL.format(country=country["id"], period=period) + (f"&limit={depth}" if depth else "")
+        print(f"{label}Fetching data for {country_name} ({i+1}/{len(COUNTRIES)})...")
+        start = writer.rows
+        try:
+            with requests.get(url, stream=True) as response:
+                response.raise_for_status()
+                for item in iter_array_items(response.iter_content(STREAM_CHUNK_SIZE)):
+                    writer.add(i, item.get("HS4"), item.get("HS4 ID"), item.get("Trade Value"))
+            print(f"{label}  > {writer.rows - start} rows")
+            time.sleep(0.5)
+        except requests.exceptions.RequestException as e:
+            print(f"{label}  > Could not fetch data for {country_name}: {e}")
+            failed.append(country_name)
+            writer.discard_country()
+        except KeyError:
+            print(f"{label}  > Unexpected response format for {country_name}. 'data' key not found.")
+            failed.append(country_name)
+            writer.discard_country()
+        except ValueError as e:
+            print(f"{label}  > Could not parse the response for {country_name}: {e}")
+            failed.append(country_name)
+            writer.discard_country()
+        writer.end_country()
+    writer.close()
+
+    print(f"\n{label}--- COMPLETE ---")
+    print(f"{label}{writer.rows} rows, {len(writer.hs4)} distinct HS4 codes, saved to '{out_dir}'")
+    if failed:
+        print(f"{label}{len(failed)} country(ies) missing: {', '.join(failed)}")
+    return writer.rows, failed
+
+
+##############################################################################
+# MULTI-YEAR HISTORY
+#
+# One full-depth dataset per year, each in its own directory, plus an index
+# of the years that finished downloading:
+#
+#   exports_history/index.json   {"years": [2019, 2020, ...]}
+#   exports_history/2019/        manifest.json + column files (see above)
+#
+# A year is written once and never touched again, so a refresh only fetches
+# years missing from the index. A year with countries that failed to download
+# is left out of the index, so the next refresh fetches it again. Years are fetched concurrently, each by its
+# own thread into its own directory.
+##############################################################################
+
+def history_years(history_dir=DEFAULT_HISTORY_DIR):
+    """Years already stored in the history, ascending."""
+    try:
+        with open(os.path.join(history_dir, "index.json"), "r", encoding="utf-8") as f:
+            return sorted(json.load(f)["years"])
+    except FileNotFoundError:
+        return []
+
+
+def read_year(history_dir, year):
+    """
+    Opens one year's slice (memory-mapped, see read_columns) without touching the others.
+    """
+    if year not in history_years(history_dir):
+        raise KeyError(f"Year {year} is not in '{history_dir}'")
+    return read_columns(os.path.join(history_dir, str(year)))
+
+
+def available_years():
+    response = requests.get(YEARS_URL)
+    response.raise_for_status()
+    return sorted(int(member["key"]) for member in response.json()["members"])
+
+
+def fetch_history(history_dir=DEFAULT_HISTORY_DIR, years=None, depth=None, workers=HISTORY_WORKERS):
+    """
+    Downloads every requested year that the history does not hold yet.
+
+    Args:
+        history_dir (str): Root of the per-year layout.
+        years (list): Years to hold (default: all years the API publishes).
+        depth (int): Optional row limit per country.
+        workers (int): Years fetched in parallel.
+
+    Returns:
+        tuple: (years downloaded completely by this call, {year: failed countries}
+               for the years left out of the index).
+    """
+    os.makedirs(history_dir, exist_ok=True)
+    stored = set(history_years(history_dir))
+    wanted = sorted(set(years) if years else available_years())
+    todo = [year for year in wanted if year not in stored]
+    if not todo:
+        print(f"History in '{history_dir}' is up to date ({len(stored)} years).")
+        return [], {}
+    print(f"Fetching {len(todo)} new year(s): {', '.join(map(str, todo))}")
+
+    lock = threading.Lock()
+
+    def fetch_year(year):
+        _, failed = fetch_full_exports(os.path.join(history_dir, str(year)), depth, year)
+        if failed:
+            return year, failed
+        # Record each year as soon as it is complete, so an interrupted refresh keeps it
+        with lock:
+            index = {"years": sorted(set(history_years(history_dir)) | {year})}
+            tmp = os.path.join(history_dir, "index.json.tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(index, f)
+            os.replace(tmp, os.path.join(history_dir, "index.json"))
+        return year, []
+
+    done, incomplete = [], {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for future in as_completed([pool.submit(fetch_year, year) for year in todo]):
+            year, failed = future.result()
+            if failed:
+                incomplete[year] = failed
+            else:
+                done.append(year)
+    for year in sorted(incomplete):
+        print(f"Year {year} is incomplete ({len(incomplete[year])} countries failed) and was not recorded; "
+              f"run again to retry it.")
+    return sorted(done), incomplete
+
+
+def parse_years(raw):
+    """'2019-2022,2024' -> [2019, 2020, 2021, 2022, 2024]"""
+    years = set()
+    for part in raw.split(","):
+        lo, _, hi = part.strip().partition("-")
+        years.update(range(int(lo), int(hi or lo) + 1))
+    return sorted(years)
+
 
-    except requests.exceptions.RequestException as e:
-        print(f"  > Could not fetch data for {country_name}: {e}")
-    except KeyError:
-        print(f"  > Unexpected response format for {country_name}. 'data' key not found.")
+def main():
+    parser = argparse.ArgumentParser(description="Fetch each country's top exports from the OEC API.")
+    parser.add_argument("--full", action="store_true",
+                        help="Fetch the complete HS4 distribution into column files instead of the top 10.")
+    parser.add_argument("--depth", type=int, help="With --full, keep only this many rows per country.")
+    parser.add_argument("--out-dir", help="Output directory for --full / --history.")
+    parser.add_argument("--history", action="store_true",
+                        help="Keep a full-depth dataset per year and fetch only years not stored yet.")
+    parser.add_argument("--years", type=parse_years, help="With --history, e.g. '2018-2022' (default: all published).")
+    parser.add_argument("--workers", type=int, default=HISTORY_WORKERS, help="Years fetched in parallel.")
+    args = parser.parse_args()
 
-# All done, print the final result
-print("\n--- COMPLETE ---")
-print(json.dumps(all_countries_exports, indent=2))
+    if args.history:
+        years = args.years
+        if not years:
+            try:
+                years = available_years()
+            except (requests.exceptions.RequestException, KeyError, ValueError) as e:
+                print(f"Error: Could not list the published years ({e}). Pass --years explicitly.")
+                return 1
+        _, incomplete = fetch_history(args.out_dir or DEFAULT_HISTORY_DIR, years, args.depth, args.workers)
+        if incomplete:
+            return 1
+    elif args.full:
+        _, failed = fetch_full_exports(args.out_dir or DEFAULT_FULL_DIR, args.depth)
+        if failed:
+            return 1
+    else:
+        fetch_top_exports()
+    return 0
 
-# Optional: Save the output to a file
-with open("top_exports.json", "w") as f:
-    json.dump(all_countries_exports, f, indent=2)
 
-print("\nResults also saved to top_exports.json")
\ No newline at end of file
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+import codecs
+import json
+import re
+
+##############################################################################
+# INCREMENTAL JSON READING
+#
+# Large JSON documents (data.json-sized exports, API responses) are read one
+# value at a time, so memory stays proportional to the largest value:
+#
+#   iter_top_level_items(f)       (key, value) of a top-level object in a file
+#   iter_array_items(chunks, key) items of the "key": [...] array in a stream
+#                                 of bytes, e.g. response.iter_content()
+#
+# A value is only complete once one of its delimiters follows it (":" after
+# a key, "," or "}" / "]" after a value); otherwise a number cut at the read
+# boundary ("12" of "123", "3" of "3.5") would decode as valid. Each retry
+# reads twice as much as the last, so a large value is re-parsed O(log size)
+# times instead of once per chunk.
+##############################################################################
+
+CHUNK_SIZE = 64 * 1024
+WHITESPACE = " \t\r\n"
+
+
+class JsonStream:
+    """
+    A text buffer over `read(size)` (returns "" at the end) with the few
+    primitives the iterators below need.
+    """
+
+    def __init__(self, read, chunk_size=CHUNK_SIZE):
+        self.read = read
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buf, self.pos, self.eof = "", 0, False
+
+    def fill(self, size=None):
+        chunk = self.read(size or self.chunk_size)
+        if not chunk:
+            self.eof = True
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+
+    def skip_ws(self):
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf) or self.eof:
+                return
+            self.fill()
+
+    def peek(self):
+        self.skip_ws()
+        return self.buf[self.pos] if self.pos < len(self.buf) else ""
+
+    def expect(self, chars):
+        found = self.peek()
+        if not found or found not in chars:
+            raise ValueError(f"Expected one of {chars!r} but found {found or 'end of file'!r}")
+        self.pos += 1
+        return found
+
+    def decode(self, delimiters):
+        self.skip_ws()
+        size = self.chunk_size
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+                while end < len(self.buf) and self.buf[end] in WHITESPACE:
+                    end += 1
+                if end < len(self.buf) and self.buf[end] in delimiters:
+                    self.pos = end
+                    return value
+                if self.eof:
+                    raise ValueError(f"Expected one of {delimiters!r} after {value!r}")
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self.fill(size)
+            size *= 2
+
+    def seek_pattern(self, pattern):
+        """Moves past the first match of a compiled regex. Returns False if there is none."""
+        while True:
+            match = pattern.search(self.buf, self.pos)
+            if match:
+                self.pos = match.end()
+                return True
+            if self.eof:
+                return False
+            self.fill()
+
+
+def chunk_reader(chunks):
+    """
+    read(size) over an iterable of UTF-8 byte chunks, returning at least `size`
+    characters until the chunks run out.
+    """
+    chunks = iter(chunks)
+    text = codecs.getincrementaldecoder("utf-8")()
+
+    def read(size):
+        parts, length = [], 0
+        while length < size:
+            chunk = next(chunks, None)
+            if chunk is None:
+                parts.append(text.decode(b"", final=True))
+                break
+            parts.append(text.decode(chunk))
+            length += len(parts[-1])
+        return "".join(parts)
+
+    return read
+
+
+def iter_top_level_items(f, chunk_size=CHUNK_SIZE):
+    """
+    Incrementally parses a JSON file whose top level is an object.
+
+    Args:
+        f: A text file object opened for reading.
+        chunk_size (int): Number of characters to read at a time.
+
+    Yields:
+        tuple: (key, value) for each top-level entry, in file order.
+    """
+    stream = JsonStream(f.read, chunk_size)
+    stream.fill()
+    if stream.peek() != "{":
+        raise ValueError("The JSON structure is not a dictionary at the top level.")
+    stream.pos += 1
+    if stream.peek() == "}":
+        return
+    while True:
+        key = stream.decode(":")
+        if not isinstance(key, str):
+            raise ValueError(f"Expected a string key but found {key!r}")
+        stream.expect(":")
+        yield key, stream.decode(",}")
+        if stream.expect(",}") == "}":
+            return
+
+
+def iter_array_items(chunks, key="data", chunk_size=CHUNK_SIZE):
+    """
+    Yields the items of the `key` array of a JSON document one at a time.
+
+    Args:
+        chunks: An iterable of bytes, e.g. response.iter_content(...).
+        key (str): The key holding the array (its first occurrence is used).
+
+    Yields:
+        One array item at a time, in document order.
+    """
+    stream = JsonStream(chunk_reader(chunks), chunk_size)
+    if not stream.seek_pattern(re.compile(re.escape(json.dumps(key)) + r"\s*:\s*\[")):
+        raise KeyError(key)
+    if stream.peek() == "]":
+        return
+    while True:
+        yield stream.decode(",]")
+        if stream.expect(",]") == "]":
+            return
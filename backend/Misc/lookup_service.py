@@ -0,0 +1,300 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from urllib.parse import urlsplit, parse_qs
+
+import numpy as np
+
+from matrix_io import DIRECTIONS, UNKNOWN_CODE, load_json, matrix_names, distance_array, direction_array
+from commodity_index import build_commodity_index
+
+MISC_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(MISC_DIR)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8081
+MAX_BODY_BYTES = 1 << 20    # one batch request, ~20k pairs
+MAX_BATCH = 20_000
+
+
+def _sector(code):
+    # Codes back to what the matrix holds: a sector, "unknown" or null
+    if code >= 0:
+        return DIRECTIONS[code]
+    return "unknown" if code == UNKNOWN_CODE else None
+
+
+class GameTables:
+    """
+    The game's lookup data packed into arrays, loaded once per process.
+
+    Lookups follow server.js: names are lowercased, a guess that is not in the
+    answer's row (or an answer without a row) gives null for both values, and
+    "unknown" directions are passed through as they are.
+
+        tables = GameTables.load()
+        tables.lookup("chile", "peru")          # {"distance": ..., "direction": ...}
+        tables.lookup_many([("chile", "peru"), ("india", "china")])
+    """
+
+    def __init__(self, distances, directions, data):
+        self.names = matrix_names(distances, directions)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        # Absent rows / keys come back as NaN and negative codes, i.e. null
+        self.distance = distance_array(distances, self.names)[0].astype(np.float32)
+        self.direction = direction_array(directions, self.names)
+
+        exports = build_commodity_index(data)
+        self.answers = exports["countries"].tolist()
+        self.answer_index = {name: i for i, name in enumerate(self.answers)}
+        self.commodities = exports["commodities"].tolist()
+        self.export_codes, self.export_values = exports["codes"], exports["values"]
+
+    @classmethod
+    def load(cls, distances_file=None, directions_file=None, data_file=None):
+        return cls(load_json(distances_file or os.path.join(BACKEND_DIR, "country_distances.json")),
+                   load_json(directions_file or os.path.join(BACKEND_DIR, "country_directions.json")),
+                   load_json(data_file or os.path.join(BACKEND_DIR, "data.json")))
+
+    def _indices(self, names):
+        return np.array([self.index.get(str(name).lower(), -1) for name in names], dtype=np.int64)
+
+    def lookup_many(self, pairs):
+        """
+        Distance and direction for a batch of (answer, guess) pairs, in input order.
+
+        Returns:
+            list: {"distance": km or None, "direction": sector, "unknown" or None} per pair.
+        """
+        if not pairs:
+            return []
+        answers, guesses = zip(*pairs)
+        a, g = self._indices(answers), self._indices(guesses)
+        known = (a >= 0) & (g >= 0)
+        a_safe, g_safe = np.where(known, a, 0), np.where(known, g, 0)
+        dist = np.where(known, self.distance[a_safe, g_safe], np.nan)
+        codes = np.where(known, self.direction[a_safe, g_safe], -1)
+        return [{"distance": None if d != d else round(d, 1), "direction": _sector(c)}
+                for d, c in zip(dist.tolist(), codes.tolist())]
+
+    def lookup(self, answer, guess):
+        a, g = self.index.get(str(answer).lower()), self.index.get(str(guess).lower())
+        if a is None or g is None:
+            return {"distance": None, "direction": None}
+        d, c = float(self.distance[a, g]), int(self.direction[a, g])
+        return {"distance": None if d != d else round(d, 1), "direction": _sector(c)}
+
+    def exports(self, answer, count=10):
+        """
+        The answer's first `count` exports as [{"name": HS4, "value": trade value}], or None.
+        """
+        i = self.answer_index.get(str(answer).lower())
+        if i is None:
+            return None
+        return [{"name": self.commodities[k], "value": v}
+                for k, v in zip(self.export_codes[i, :count].tolist(), self.export_values[i, :count].tolist())
+                if k >= 0]
+
+
+##############################################################################
+# REQUEST HANDLING
+#
+# handle_request() is plain and synchronous: the asyncio server below and
+# LocalClient both call it, so the routes can be exercised without a socket.
+#
+#   GET  /health
+#   GET  /lookup?answer=..&guess=..
+#   POST /lookup            {"pairs": [[answer, guess], ...]}
+#   GET  /distance?answer=..&guess=..
+#   GET  /direction?answer=..&guess=..
+#   GET  /exports?answer=..&count=3
+##############################################################################
+
+def handle_request(tables, method, target, body=b""):
+    """
+    Returns:
+        tuple: (status code, JSON-serializable payload)
+    """
+    url = urlsplit(target)
+    query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+
+    if url.path == "/health":
+        return 200, {"status": "ok", "countries": len(tables.names), "answers": len(tables.answers)}
+
+    if url.path == "/lookup":
+        if method == "GET":
+            if "answer" not in query or "guess" not in query:
+                return 400, {"error": "'answer' and 'guess' are required"}
+            return 200, tables.lookup(query["answer"], query["guess"])
+        if method == "POST":
+            try:
+                pairs = json.loads(body or b"{}").get("pairs")
+            except (ValueError, AttributeError):
+                return 400, {"error": "Body must be a JSON object"}
+            if not isinstance(pairs, list) or not all(isinstance(p, list) and len(p) == 2 for p in pairs):
+                return 400, {"error": "'pairs' must be a list of [answer, guess] pairs"}
+            if len(pairs) > MAX_BATCH:
+                return 413, {"error": f"At most {MAX_BATCH} pairs per request"}
+            return 200, {"results": tables.lookup_many(pairs)}
+        return 405, {"error": f"Method {method} not allowed"}
+
+    if url.path in ("/distance", "/direction"):
+        if method != "GET":
+            return 405, {"error": f"Method {method} not allowed"}
+        if "answer" not in query or "guess" not in query:
+            return 400, {"error": "'answer' and 'guess' are required"}
+        field = url.path[1:]
+        return 200, {field: tables.lookup(query["answer"], query["guess"])[field]}
+
+    if url.path == "/exports":
+        if "answer" not in query:
+            return 400, {"error": "'answer' is required"}
+        try:
+            count = int(query.get("count", 10))
+        except ValueError:
+            return 400, {"error": "'count' must be an integer"}
+        if count < 0:
+            return 400, {"error": "'count' must not be negative"}
+        exports = tables.exports(query["answer"], count)
+        if exports is None:
+            return 404, {"error": f"Unknown answer '{query['answer']}'"}
+        return 200, {"answer": query["answer"].lower(), "exports": exports}
+
+    return 404, {"error": f"No route for {url.path}"}
+
+
+class LocalClient:
+    """
+    Calls the service routes in-process, with the same JSON round trip as HTTP.
+
+        client = LocalClient(GameTables.load())
+        status, payload = client.post("/lookup", {"pairs": [["chile", "peru"]]})
+    """
+
+    def __init__(self, tables):
+        self.tables = tables
+
+    def get(self, target):
+        status, payload = handle_request(self.tables, "GET", target)
+        return status, json.loads(json.dumps(payload))
+
+    def post(self, target, payload):
+        status, result = handle_request(self.tables, "POST", target, json.dumps(payload).encode("utf-8"))
+        return status, json.loads(json.dumps(result))
+
+
+##############################################################################
+# ASYNCIO HTTP/1.1 SERVER (keep-alive, JSON only)
+##############################################################################
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+async def _serve_connection(tables, reader, writer):
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            try:
+                method, target, version = request_line.decode("latin-1").split()
+            except ValueError:
+                break
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+
+            try:
+                length = int(headers.get("content-length", 0) or 0)
+            except ValueError:
+                length = -1
+            if length < 0:
+                # The body can't be framed, so the connection can't be reused either
+                status, payload = 400, {"error": "Invalid Content-Length"}
+                keep_alive = False
+            elif length > MAX_BODY_BYTES:
+                status, payload = 413, {"error": "Request body too large"}
+                keep_alive = False
+            else:
+                body = await reader.readexactly(length) if length else b""
+                try:
+                    status, payload = handle_request(tables, method, target, body)
+                except Exception as e:  # keep serving other requests
+                    status, payload = 500, {"error": str(e)}
+                keep_alive = (headers.get("connection", "").lower() != "close"
+                              and version.upper() == "HTTP/1.1")
+
+            data = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+            writer.write(f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                         f"Content-Type: application/json\r\n"
+                         f"Content-Length: {len(data)}\r\n"
+                         f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + data)
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(tables, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    server = await asyncio.start_server(lambda r, w: _serve_connection(tables, r, w), host, port)
+    print(f"==> Serving lookups on http://{host}:{port} ({len(tables.names)} countries)")
+    async with server:
+        await server.serve_forever()
+
+
+def benchmark(tables, pairs=10_000):
+    rng = np.random.default_rng(0)
+    names = tables.answers
+    batch = [(names[a], tables.names[g]) for a, g in
+             zip(rng.integers(len(names), size=pairs), rng.integers(len(tables.names), size=pairs))]
+    t0 = time.perf_counter()
+    for answer, guess in batch[:1000]:
+        tables.lookup(answer, guess)
+    single = (time.perf_counter() - t0) / 1000
+    t0 = time.perf_counter()
+    tables.lookup_many(batch)
+    batched = (time.perf_counter() - t0) / len(batch)
+    print(f"single lookup: {single * 1e6:.1f} us   batched: {batched * 1e6:.2f} us per pair ({pairs} pairs)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve distance / direction / export lookups over HTTP.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--distances", help="Distance matrix JSON (default: backend/country_distances.json).")
+    parser.add_argument("--directions", help="Direction matrix JSON (default: backend/country_directions.json).")
+    parser.add_argument("--data", help="Export data JSON (default: backend/data.json).")
+    parser.add_argument("--bench", action="store_true", help="Measure in-process lookup latency and exit.")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    try:
+        tables = GameTables.load(args.distances, args.directions, args.data)
+    except FileNotFoundError as e:
+        print(f"Error: The file '{e.filename}' was not found.")
+        return 1
+    print(f"==> Loaded tables in {(time.perf_counter() - t0) * 1000:.0f} ms")
+
+    if args.bench:
+        benchmark(tables)
+        return 0
+    try:
+        asyncio.run(serve(tables, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
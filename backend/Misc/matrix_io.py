@@ -0,0 +1,114 @@
+import json
+import numpy as np
+
+# 8-way sectors in clockwise order, so the opposite of code k is (k + 4) % 8
+DIRECTIONS = ("N", "NE", "E", "SE", "S", "SW", "W", "NW")
+DIRECTION_CODES = {d: k for k, d in enumerate(DIRECTIONS)}
+OPPOSITE_DIRECTIONS = {d: DIRECTIONS[(k + 4) % 8] for k, d in enumerate(DIRECTIONS)}
+
+# Negative codes for cells that carry no sector
+NULL_CODE = -1      # JSON null (the diagonal)
+UNKNOWN_CODE = -2   # "unknown" written by the generator when no geometry was found
+MISSING_CODE = -3   # the key is absent from the row
+OTHER_CODE = -4     # anything else (a typo, a number, ...)
+
+
+def load_json(file_path):
+    """
+    Loads a JSON file written by one of the generator scripts.
+
+    Args:
+        file_path (str): The path to the JSON file.
+
+    Returns:
+        dict: The parsed top-level object.
+    """
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def matrix_names(*matrices):
+    """
+    Returns the sorted union of row and column names of one or more nested dicts.
+    """
+    names = set()
+    for matrix in matrices:
+        for row_name, row in matrix.items():
+            names.add(row_name)
+            names.update(row)
+    return sorted(names)
+
+
+def distance_array(matrix, names):
+    """
+    Packs a {country: {country: km}} dict into a float64 array.
+
+    Args:
+        matrix (dict): The nested distance dict.
+        names (list): Row/column order of the result.
+
+    Returns:
+        tuple: (values, missing) where values holds NaN for null or missing cells
+               and missing is a boolean mask of absent keys.
+    """
+    n = len(names)
+    values = np.full((n, n), np.nan, dtype=np.float64)
+    missing = np.ones((n, n), dtype=bool)
+    index = {name: i for i, name in enumerate(names)}
+    for row_name, row in matrix.items():
+        i = index[row_name]
+        for col_name, value in row.items():
+            j = index[col_name]
+            missing[i, j] = False
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                values[i, j] = value
+    return values, missing
+
+
+def direction_code(value):
+    if value is None:
+        return NULL_CODE
+    if value == "unknown":
+        return UNKNOWN_CODE
+    return DIRECTION_CODES.get(value, OTHER_CODE)
+
+
+def direction_array(matrix, names):
+    """
+    Packs a {country: {country: sector}} dict into an int8 array of sector codes.
+
+    Args:
+        matrix (dict): The nested direction dict.
+        names (list): Row/column order of the result.
+
+    Returns:
+        numpy.ndarray: Codes 0..7 for N..NW, or one of the negative codes above.
+    """
+    n = len(names)
+    codes = np.full((n, n), MISSING_CODE, dtype=np.int8)
+    index = {name: i for i, name in enumerate(names)}
+    for row_name, row in matrix.items():
+        i = index[row_name]
+        for col_name, value in row.items():
+            codes[i, index[col_name]] = direction_code(value)
+    return codes
+
+
+def opposite_codes(codes):
+    """
+    Returns the 180-degree opposite of every sector code, leaving negative codes as they are.
+    """
+    return np.where(codes >= 0, (codes + 4) % 8, codes).astype(np.int8)
+
+
+def load_distance_matrix(file_path, names=None):
+    matrix = load_json(file_path)
+    names = names if names is not None else matrix_names(matrix)
+    values, missing = distance_array(matrix, names)
+    return names, values, missing
+
+
+def load_direction_matrix(file_path, names=None):
+    matrix = load_json(file_path)
+    names = names if names is not None else matrix_names(matrix)
+    return names, direction_array(matrix, names)
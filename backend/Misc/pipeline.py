@@ -0,0 +1,339 @@
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+MISC_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(MISC_DIR)
+DIRECTION_DIR = os.path.join(MISC_DIR, "direction")
+STATE_FILE = os.path.join(MISC_DIR, ".pipeline_state.json")
+
+def _p(*parts):
+    return os.path.normpath(os.path.join(BACKEND_DIR, *parts))
+
+SHAPEFILE_PARTS = [_p("Misc", "direction", "data", "ne_110m_admin_0_countries" + ext)
+                   for ext in (".shp", ".shx", ".dbf", ".prj", ".cpg")]
+
+##############################################################################
+# STAGES
+#
+# Every data artifact the game uses, with the script that produces it. A stage
+# depends on another when one of its inputs is the other's output, or when it
+# names it in "after". The script itself is always an input, so editing it
+# re-runs the stage.
+#
+# The distance generator is not part of this tree: the raw distance matrix is
+# Misc/country_distances_OG.json. audit_distances zeroes its <30km cells and
+# then applies the hand-set maritime distances in Misc/distance_corrections.json
+# (e.g. denmark-sweden 4.0), which the <30km rule would otherwise erase.
+##############################################################################
+
+STAGES = [
+    {
+        "name": "exports",
+        "cwd": MISC_DIR,
+        "cmd": ["get_exports.py"],
+        "inputs": [_p("Misc", "get_exports.py")],
+        "outputs": [_p("Misc", "top_exports.json")],
+        "manual": True,  # hits the OEC API; only runs when named explicitly
+    },
+    {
+        "name": "kernel_check",
+        "cwd": DIRECTION_DIR,
+        "cmd": ["kernel_check.py", "--seed", "0"],  # fixed inputs, so a pass is reproducible
+        "inputs": [_p("Misc", "direction", "kernel_check.py"),
+                   _p("Misc", "direction", "country_directions.py"),
+                   _p("Misc", "direction", "witness_store.py"),
+                   _p("Misc", "direction", "point_lookup.py")],
+        "outputs": [],
+    },
+    {
+        "name": "directions",
+        "cwd": DIRECTION_DIR,
+        "cmd": ["country_directions.py"],
+        "inputs": [_p("Misc", "direction", "country_directions.py"),
+                   _p("Misc", "direction", "witness_store.py")] + SHAPEFILE_PARTS,
+        "outputs": [_p("Misc", "direction", "outputs", "country_directions.json"),
+                    _p("Misc", "direction", "outputs", "country_witnesses.npz")],
+        "after": ["kernel_check"],  # never rebuild the matrix with kernels that fail the check
+    },
+    {
+        "name": "reverse_directions",
+        "cwd": MISC_DIR,
+        "cmd": ["reverse_directions.py",
+                _p("Misc", "direction", "outputs", "country_directions.json"),
+                _p("country_directions.json")],
+        "inputs": [_p("Misc", "reverse_directions.py"),
+                   _p("Misc", "direction", "outputs", "country_directions.json")],
+        "outputs": [_p("country_directions.json")],
+    },
+    {
+        "name": "audit_distances",
+        "cwd": MISC_DIR,
+        "cmd": ["audit_and_modify.py", _p("Misc", "country_distances_OG.json"), _p("country_distances.json"),
+                _p("Misc", "distance_corrections.json")],
+        "inputs": [_p("Misc", "audit_and_modify.py"), _p("Misc", "country_distances_OG.json"),
+                   _p("Misc", "distance_corrections.json")],
+        "outputs": [_p("country_distances.json")],
+    },
+    {
+        "name": "validate",
+        "cwd": MISC_DIR,
+        "cmd": ["validate_matrices.py",
+                "--distances", _p("country_distances.json"),
+                "--directions", _p("country_directions.json")],
+        "inputs": [_p("Misc", "validate_matrices.py"), _p("Misc", "matrix_io.py"),
+                   _p("country_distances.json"), _p("country_directions.json")],
+        "outputs": [],
+    },
+    {
+        "name": "publish",
+        "cwd": MISC_DIR,
+        "cmd": ["publish_artifacts.py", "--out-dir", _p("dist")],
+        "inputs": [_p("Misc", "publish_artifacts.py"), _p("country_distances.json"),
+                   _p("country_directions.json"), _p("data.json")],
+        "outputs": [_p("dist", name + suffix)
+                    for name in ("country_distances", "country_directions", "data")
+                    for suffix in (".min.json", ".min.json.gz")],
+        "after": ["validate"],  # only publish artifacts that passed validation
+    },
+    {
+        "name": "shards",
+        "cwd": MISC_DIR,
+        "cmd": ["build_shards.py", "--out-dir", _p("dist", "shards")],
+        "inputs": [_p("Misc", "build_shards.py"), _p("Misc", "matrix_io.py"), _p("country_distances.json"),
+                   _p("country_directions.json"), _p("data.json")],
+        "outputs": [_p("dist", "shards", "index.json")],
+        "after": ["validate"],
+    },
+    {
+        "name": "commodity_index",
+        "cwd": MISC_DIR,
+        "cmd": ["commodity_index.py", "-o", _p("dist", "commodity_index.npz")],
+        "inputs": [_p("Misc", "commodity_index.py"), _p("data.json")],
+        "outputs": [_p("dist", "commodity_index.npz")],
+    },
+]
+
+##############################################################################
+# CONTENT HASHES (cached by size + mtime so a no-op rebuild reads nothing)
+##############################################################################
+
+def load_state():
+    try:
+        with open(STATE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {"files": {}, "stages": {}}
+
+def save_state(state):
+    tmp = STATE_FILE + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp, STATE_FILE)
+
+def file_hash(path, state):
+    """
+    Returns the SHA-256 of a file, or None if it does not exist.
+
+    The digest is reused from the state file while the file's size and
+    modification time are unchanged.
+    """
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    cached = state["files"].get(path)
+    if cached and cached["size"] == st.st_size and cached["mtime_ns"] == st.st_mtime_ns:
+        return cached["sha256"]
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    digest = h.hexdigest()
+    state["files"][path] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": digest}
+    return digest
+
+def stage_signature(stage, state):
+    return {
+        "cmd": stage["cmd"],
+        "inputs": {path: file_hash(path, state) for path in stage["inputs"]},
+        "outputs": {path: file_hash(path, state) for path in stage["outputs"]},
+    }
+
+def stage_status(stage, state):
+    """
+    Decides whether a stage has to run.
+
+    Returns:
+        tuple: (status, reason) where status is "run", "skip" or "blocked".
+    """
+    sig = stage_signature(stage, state)
+    missing = [path for path, digest in sig["inputs"].items() if digest is None]
+    if missing:
+        return "blocked", f"missing input {os.path.relpath(missing[0], BACKEND_DIR)}"
+    recorded = state["stages"].get(stage["name"])
+    if recorded is None:
+        if any(digest is not None for digest in sig["outputs"].values()):
+            return "blocked", "outputs exist but were never recorded (use --record to adopt them or --force)"
+        return "run", "never built"
+    for path, digest in sig["outputs"].items():
+        if digest is None:
+            return "run", f"missing output {os.path.relpath(path, BACKEND_DIR)}"
+        if digest != recorded["outputs"].get(path):
+            return "blocked", f"{os.path.relpath(path, BACKEND_DIR)} changed outside the pipeline (use --force or --record)"
+    if recorded["cmd"] != sig["cmd"]:
+        return "run", "command changed"
+    for path, digest in sig["inputs"].items():
+        if recorded["inputs"].get(path) != digest:
+            return "run", f"{os.path.relpath(path, BACKEND_DIR)} changed"
+    return "skip", "up to date"
+
+##############################################################################
+# SCHEDULING
+##############################################################################
+
+def stage_dependencies(stages):
+    producers = {path: s["name"] for s in stages for path in s["outputs"]}
+    names = {s["name"] for s in stages}
+    return {s["name"]: {producers[p] for p in s["inputs"] if p in producers and producers[p] != s["name"]}
+                       | {a for a in s.get("after", []) if a in names}
+            for s in stages}
+
+def select_stages(names):
+    """
+    Returns the stages to consider: the named ones plus everything upstream of
+    them, or every non-manual stage when no names are given.
+    """
+    by_name = {s["name"]: s for s in STAGES}
+    unknown = [n for n in names if n not in by_name]
+    if unknown:
+        raise ValueError(f"Unknown stage(s): {', '.join(unknown)}. Known: {', '.join(by_name)}")
+    if not names:
+        return [s for s in STAGES if not s.get("manual")]
+    deps = stage_dependencies(STAGES)
+    wanted, todo = set(), list(names)
+    while todo:
+        name = todo.pop()
+        if name not in wanted:
+            wanted.add(name)
+            todo.extend(d for d in deps[name] if not by_name[d].get("manual"))
+    return [s for s in STAGES if s["name"] in wanted]
+
+def run_stage(stage, log_dir):
+    log_path = os.path.join(log_dir, f"{stage['name']}.log")
+    t0 = time.time()
+    with open(log_path, 'w', encoding='utf-8') as log:
+        proc = subprocess.run([sys.executable] + stage["cmd"], cwd=stage["cwd"],
+                              stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT)
+    missing = [p for p in stage["outputs"] if not os.path.exists(p)]
+    ok = proc.returncode == 0 and not missing
+    return ok, time.time() - t0, log_path
+
+def run_pipeline(stages, state, jobs=1, force=False, dry_run=False, log_dir=None):
+    """
+    Runs the given stages in dependency order, skipping the ones whose inputs
+    are unchanged and running independent ones in parallel.
+
+    Returns:
+        bool: True if no stage failed or was blocked.
+    """
+    log_dir = log_dir or os.path.join(MISC_DIR, "pipeline_logs")
+    os.makedirs(log_dir, exist_ok=True)
+    selected = {s["name"] for s in stages}
+    deps = {name: d & selected for name, d in stage_dependencies(stages).items()}
+    pending = {s["name"]: s for s in stages}
+    finished, failed, running = set(), set(), {}
+    ok = True
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        while pending or running:
+            for name in list(pending):
+                if not deps[name] <= (finished | failed):
+                    continue
+                stage = pending.pop(name)
+                if deps[name] & failed:
+                    print(f"[{name}] not run: an upstream stage failed")
+                    failed.add(name); ok = False
+                    continue
+                status, reason = stage_status(stage, state)
+                if force and status == "blocked" and not reason.startswith("missing input"):
+                    status, reason = "run", f"forced ({reason})"
+                if status == "skip":
+                    print(f"[{name}] skipped: {reason}")
+                    finished.add(name)
+                elif status == "blocked":
+                    print(f"[{name}] BLOCKED: {reason}")
+                    failed.add(name); ok = False
+                elif dry_run:
+                    print(f"[{name}] would run: {reason}")
+                    finished.add(name)
+                else:
+                    print(f"[{name}] running: {reason}", flush=True)
+                    running[pool.submit(run_stage, stage, log_dir)] = stage
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                stage_ok, elapsed, log_path = future.result()
+                if stage_ok:
+                    state["stages"][stage["name"]] = stage_signature(stage, state)
+                    save_state(state)
+                    finished.add(stage["name"])
+                    print(f"[{stage['name']}] done in {elapsed:.1f}s")
+                else:
+                    failed.add(stage["name"]); ok = False
+                    print(f"[{stage['name']}] FAILED after {elapsed:.1f}s, see {log_path}")
+    return ok
+
+def record_stages(stages, state):
+    """
+    Adopts the current inputs and outputs of the given stages as up to date
+    without running them.
+    """
+    for stage in stages:
+        state["stages"][stage["name"]] = stage_signature(stage, state)
+        print(f"[{stage['name']}] recorded as up to date")
+    save_state(state)
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the game data artifacts whose inputs changed.")
+    parser.add_argument("stages", nargs="*", help="Stages to build (default: all non-manual stages).")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="Stages to run in parallel.")
+    parser.add_argument("--force", action="store_true", help="Run stages even if outputs were edited by hand.")
+    parser.add_argument("--dry-run", action="store_true", help="Only print what would run.")
+    parser.add_argument("--record", action="store_true", help="Mark the current artifacts as up to date.")
+    parser.add_argument("--list", action="store_true", help="List the stages and exit.")
+    args = parser.parse_args()
+
+    if args.list:
+        deps = stage_dependencies(STAGES)
+        for s in STAGES:
+            after = f" (after {', '.join(sorted(deps[s['name']]))})" if deps[s["name"]] else ""
+            manual = " [manual]" if s.get("manual") else ""
+            print(f"{s['name']}{manual}{after}")
+        return 0
+
+    try:
+        stages = select_stages(args.stages)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 2
+
+    t0 = time.time()
+    state = load_state()
+    if args.record:
+        record_stages(stages, state)
+        return 0
+    ok = run_pipeline(stages, state, jobs=args.jobs, force=args.force, dry_run=args.dry_run)
+    save_state(state)
+    print(f"\nPipeline {'finished' if ok else 'FAILED'} in {time.time() - t0:.2f}s")
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
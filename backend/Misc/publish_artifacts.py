@@ -0,0 +1,140 @@
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+
+try:
+    import brotli
+except ImportError:  # optional: without it only the .gz variant is written
+    brotli = None
+
+MISC_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(MISC_DIR)
+DEFAULT_OUT_DIR = os.path.join(BACKEND_DIR, "dist")
+
+# Artifacts the game server loads, with the number of decimals each one needs
+DEFAULT_ARTIFACTS = {
+    os.path.join(BACKEND_DIR, "country_distances.json"): 1,   # km, rounded to 0.1 by the generator
+    os.path.join(BACKEND_DIR, "country_directions.json"): 1,  # no floats
+    os.path.join(BACKEND_DIR, "data.json"): 0,                 # trade values in whole dollars
+}
+
+
+def round_floats(value, precision):
+    """
+    Rounds every float in a JSON value to `precision` decimals.
+
+    Floats that become whole numbers are written as integers ("0" instead of
+    "0.0"), which JavaScript parses to the same Number.
+    """
+    if isinstance(value, float):
+        r = round(value, precision)
+        return int(r) if r.is_integer() else r
+    if isinstance(value, dict):
+        return {k: round_floats(v, precision) for k, v in value.items()}
+    if isinstance(value, list):
+        return [round_floats(v, precision) for v in value]
+    return value
+
+
+def minify_json(data, precision):
+    return json.dumps(round_floats(data, precision), separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def parse_time_ms(raw, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        json.loads(raw)
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000.0
+
+
+def publish_json(data, name, out_dir, precision=1):
+    """
+    Writes the minified artifact plus its precompressed variants.
+
+    Args:
+        data: The parsed JSON value.
+        name (str): Base file name, e.g. "country_distances.json".
+        out_dir (str): Target directory.
+        precision (int): Decimals kept for floats.
+
+    Returns:
+        dict: {variant: (path, size_in_bytes)} for "min", "gz" and (if available) "br".
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    stem = name[:-5] if name.endswith(".json") else name
+    raw = minify_json(data, precision)
+    written = {}
+
+    def write(variant, path, payload):
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(payload)
+        os.replace(tmp, path)
+        written[variant] = (path, len(payload))
+
+    min_path = os.path.join(out_dir, f"{stem}.min.json")
+    write("min", min_path, raw)
+    # mtime=0 keeps the .gz byte-identical across runs, so the pipeline sees no change
+    write("gz", min_path + ".gz", gzip.compress(raw, compresslevel=9, mtime=0))
+    if brotli is not None:
+        write("br", min_path + ".br", brotli.compress(raw, quality=11))
+    return written
+
+
+def _kb(size):
+    return f"{size / 1024:,.1f} KB"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish minified and precompressed copies of the game data.")
+    parser.add_argument("files", nargs="*", help="JSON files to publish (default: distances, directions and data.json).")
+    parser.add_argument("--out-dir", default=DEFAULT_OUT_DIR, help="Where to write the published files.")
+    parser.add_argument("--precision", type=int, help="Decimals kept for floats (default: per artifact).")
+    args = parser.parse_args()
+
+    artifacts = {f: args.precision if args.precision is not None else 1 for f in args.files} or \
+        {f: args.precision if args.precision is not None else p for f, p in DEFAULT_ARTIFACTS.items()}
+
+    if brotli is None:
+        print("Note: the 'brotli' package is not installed, skipping .br variants.")
+    print("--- Published Artifacts ---")
+    total_src = total_min = 0
+    for path, precision in artifacts.items():
+        try:
+            with open(path, "rb") as f:
+                source = f.read()
+            data = json.loads(source)
+        except FileNotFoundError:
+            print(f"Error: The file '{path}' was not found.")
+            return 1
+        except json.JSONDecodeError:
+            print(f"Error: The file '{path}' is not a valid JSON file.")
+            return 1
+
+        written = publish_json(data, os.path.basename(path), args.out_dir, precision)
+        raw_size = written["min"][1]
+        with open(written["min"][0], "rb") as f:
+            t_min = parse_time_ms(f.read())
+        t_src = parse_time_ms(source)
+        total_src += len(source)
+        total_min += raw_size
+
+        print(f"\n{os.path.basename(path)} (precision {precision})")
+        print(f"  source : {_kb(len(source)):>12}   parse {t_src:7.1f} ms")
+        print(f"  min    : {_kb(raw_size):>12}   parse {t_min:7.1f} ms   ({len(source) / raw_size:.1f}x smaller)")
+        for variant in ("gz", "br"):
+            if variant in written:
+                size = written[variant][1]
+                print(f"  {variant:<7}: {_kb(size):>12}   ({len(source) / size:.1f}x smaller)")
+
+    print(f"\nTotal: {_kb(total_src)} -> {_kb(total_min)} minified, written to '{args.out_dir}'")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,7 @@
 import json
+import sys
+
+from matrix_io import OPPOSITE_DIRECTIONS
 
 def reverse_all_directions(data):
     """
@@ -10,18 +13,6 @@ def reverse_all_directions(data):
     Returns:
         dict: A new dictionary with all directions reversed 180 degrees.
     """
-    # Dictionary mapping each direction to its 180-degree opposite
-    direction_map = {
-        "N": "S",
-        "S": "N",
-        "E": "W",
-        "W": "E",
-        "NE": "SW",
-        "SW": "NE",
-        "NW": "SE",
-        "SE": "NW"
-    }
-
     # Create a new dictionary to store the reversed data
     reversed_data = {}
 
@@ -36,7 +27,7 @@ def reverse_all_directions(data):
             else:
                 # Otherwise, look up the opposite direction from the map
                 # .get() is used to avoid errors if a direction is not in the map
-                reversed_relations[secondary_country] = direction_map.get(direction, direction)
+                reversed_relations[secondary_country] = OPPOSITE_DIRECTIONS.get(direction, direction)
         
         reversed_data[primary_country] = reversed_relations
         
@@ -49,9 +40,12 @@ def main():
     """
     print("--- Geographic Direction Reverser ---")
     
-    # 1. Ask for the input and output filenames at the start
-    input_filename = input("Enter the name of the input JSON file: ")
-    output_filename = input("Enter the name for the output JSON file: ")
+    # 1. Take the filenames from the command line, or ask for them at the start
+    if len(sys.argv) == 3:
+        input_filename, output_filename = sys.argv[1], sys.argv[2]
+    else:
+        input_filename = input("Enter the name of the input JSON file: ")
+        output_filename = input("Enter the name for the output JSON file: ")
 
     try:
         # 2. Open and load the data from the input JSON file
@@ -69,14 +63,18 @@ def main():
             json.dump(new_data, f, indent=2)
 
         print(f"\nSuccess! The reversed data has been saved to '{output_filename}'.")
+        return 0
 
     except FileNotFoundError:
         print(f"\nError: The file '{input_filename}' was not found. Please make sure it's in the same folder as the script.")
+        return 1
     except json.JSONDecodeError:
         print(f"\nError: The file '{input_filename}' is not a valid JSON file. Please check its format.")
+        return 1
     except Exception as e:
         print(f"\nAn unexpected error occurred: {e}")
+        return 1
 
 # This ensures the main() function runs when the script is executed
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
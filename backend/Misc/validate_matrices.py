@@ -0,0 +1,161 @@
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+from matrix_io import (
+    DIRECTIONS, NULL_CODE, UNKNOWN_CODE, MISSING_CODE, OTHER_CODE,
+    load_json, matrix_names, distance_array, direction_array, opposite_codes,
+)
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+DEFAULT_DISTANCES = os.path.join(BACKEND_DIR, "country_distances.json")
+DEFAULT_DIRECTIONS = os.path.join(BACKEND_DIR, "country_directions.json")
+
+# Distances are rounded to 0.1 km by the generator, so anything above this is a real mismatch
+SYMMETRY_TOLERANCE_KM = 0.05
+
+
+def _code_name(code):
+    if code >= 0:
+        return DIRECTIONS[code]
+    return {NULL_CODE: "null", UNKNOWN_CODE: "unknown",
+            MISSING_CODE: "missing", OTHER_CODE: "invalid"}[int(code)]
+
+
+def _pairs(mask, upper_only=False):
+    if upper_only:
+        mask = np.triu(mask, k=1)
+    rows, cols = np.nonzero(mask)
+    return zip(rows.tolist(), cols.tolist())
+
+
+def validate_matrices(distances, directions):
+    """
+    Checks a distance matrix and a direction matrix against each other.
+
+    Every check is a single array pass, so the whole 196x196 set takes a few
+    milliseconds once the JSON has been parsed.
+
+    Args:
+        distances (dict): {country: {country: km}} as written to country_distances.json.
+        directions (dict): {country: {country: sector}} as written to country_directions.json.
+
+    Returns:
+        tuple: (violations, stats) where violations is a list of
+               (check, country1, country2, detail) tuples and stats is a dict of counts.
+    """
+    names = matrix_names(distances, directions)
+    n = len(names)
+    dist, dist_missing = distance_array(distances, names)
+    codes = direction_array(directions, names)
+    diag = np.eye(n, dtype=bool)
+    violations = []
+
+    # --- 1. Coverage: same country set in both files, every row complete ---
+    for name in names:
+        if name not in distances:
+            violations.append(("coverage", name, None, "row missing from distances"))
+        if name not in directions:
+            violations.append(("coverage", name, None, "row missing from directions"))
+    row_in_dist = np.array([name in distances for name in names])
+    row_in_dir = np.array([name in directions for name in names])
+    for i, j in _pairs(dist_missing & row_in_dist[:, None]):
+        violations.append(("coverage", names[i], names[j], "cell missing from distances"))
+    for i, j in _pairs((codes == MISSING_CODE) & row_in_dir[:, None]):
+        violations.append(("coverage", names[i], names[j], "cell missing from directions"))
+
+    # --- 2. Diagonal: distance 0.0, direction null ---
+    for i in np.nonzero((dist.diagonal() != 0.0) & ~dist_missing.diagonal())[0].tolist():
+        violations.append(("diagonal", names[i], names[i], f"distance {dist[i, i]} (expected 0.0)"))
+    for i in np.nonzero((codes.diagonal() != NULL_CODE) & (codes.diagonal() != MISSING_CODE))[0].tolist():
+        violations.append(("diagonal", names[i], names[i], f"direction {_code_name(codes[i, i])} (expected null)"))
+
+    # --- 3. Distance symmetry and value sanity ---
+    present = ~dist_missing
+    both = present & present.T
+    with np.errstate(invalid="ignore"):
+        delta = np.abs(dist - dist.T)
+        asym = both & ((delta > SYMMETRY_TOLERANCE_KM) | (np.isnan(dist) != np.isnan(dist.T)))
+    for i, j in _pairs(asym, upper_only=True):
+        violations.append(("distance symmetry", names[i], names[j], f"{dist[i, j]} vs {dist[j, i]}"))
+    dist_null = present & np.isnan(dist)
+    for i, j in _pairs(dist_null):
+        violations.append(("distance null", names[i], names[j], "null or non-numeric distance"))
+    with np.errstate(invalid="ignore"):
+        negative = present & (dist < 0)
+    for i, j in _pairs(negative):
+        violations.append(("distance value", names[i], names[j], f"negative distance {dist[i, j]}"))
+
+    # --- 4. Direction reverse rule: D[a][b] == opposite(D[b][a]) ---
+    known = codes >= 0
+    mirrored = opposite_codes(codes.T)
+    reverse_bad = (codes != MISSING_CODE) & (codes.T != MISSING_CODE) & ~diag & (codes != mirrored)
+    for i, j in _pairs(reverse_bad, upper_only=True):
+        violations.append(("direction reverse", names[i], names[j],
+                           f"{_code_name(codes[i, j])} vs reverse {_code_name(codes[j, i])}"))
+    off_diag = ~diag
+    for i, j in _pairs(off_diag & (codes == UNKNOWN_CODE)):
+        violations.append(("direction unknown", names[i], names[j], "\"unknown\" sector"))
+    for i, j in _pairs(off_diag & (codes == NULL_CODE)):
+        violations.append(("direction null", names[i], names[j], "null sector off the diagonal"))
+    for i, j in _pairs(codes == OTHER_CODE):
+        violations.append(("direction value", names[i], names[j], "not one of the 8 sectors"))
+
+    stats = {
+        "countries": n,
+        "known sectors": int(known.sum()),
+        "unknown sectors": int((off_diag & (codes == UNKNOWN_CODE)).sum()),
+        "null sectors (off-diagonal)": int((off_diag & (codes == NULL_CODE)).sum()),
+        "null distances": int(dist_null.sum()),
+    }
+    return violations, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the distance and direction matrices for consistency.")
+    parser.add_argument("--distances", default=DEFAULT_DISTANCES, help="Distance matrix JSON file.")
+    parser.add_argument("--directions", default=DEFAULT_DIRECTIONS, help="Direction matrix JSON file.")
+    parser.add_argument("--limit", type=int, default=50, help="Max violations to print per check (0 = all).")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    try:
+        distances = load_json(args.distances)
+        directions = load_json(args.directions)
+    except FileNotFoundError as e:
+        print(f"Error: The file '{e.filename}' was not found.")
+        return 2
+    except ValueError as e:
+        print(f"Error: Could not parse JSON: {e}")
+        return 2
+    t1 = time.perf_counter()
+    violations, stats = validate_matrices(distances, directions)
+    t2 = time.perf_counter()
+
+    print("--- Matrix Validation ---")
+    for key, value in stats.items():
+        print(f"{key}: {value}")
+
+    shown = {}
+    for check, c1, c2, detail in violations:
+        shown[check] = shown.get(check, 0) + 1
+        if args.limit and shown[check] > args.limit:
+            continue
+        pair = f"'{c1}' -> '{c2}'" if c2 is not None else f"'{c1}'"
+        print(f"[{check}] {pair}: {detail}")
+    for check, count in shown.items():
+        if args.limit and count > args.limit:
+            print(f"[{check}] ... {count - args.limit} more not shown")
+
+    print(f"\nLoaded in {(t1 - t0) * 1000:.1f} ms, validated in {(t2 - t1) * 1000:.1f} ms.")
+    if violations:
+        print(f"FAILED: {len(violations)} violation(s).")
+        return 1
+    print("OK: no violations found.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,14 @@
+import argparse
+import fnmatch
 import json
 import os
+import sys
 
-def main():
+# The incremental JSON reader lives with the other data scripts, in Misc/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "Misc"))
+from json_stream import iter_top_level_items
+
+def interactive_main():
     # Step 1: Ask for the JSON file name
     file_name = input("Enter the name of the JSON file (with .json extension): ").strip()
     
@@ -38,5 +45,152 @@ def main():
     
     print(f"\nFiltered JSON saved as: {new_file_name}")
 
+def read_key_list(file_path):
+    """
+    Reads one key per line, ignoring blank lines and lines starting with '#'.
+    """
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return {line.strip() for line in f if line.strip() and not line.strip().startswith("#")}
+
+def build_selector(include=None, exclude=None, globs=None, where=None,
+                   min_length=None, ignore_case=False):
+    """
+    Combines the batch-mode selection options into a single predicate.
+
+    A key is kept when it matches the include list or one of the globs (or when
+    neither is given), is not in the exclude list, and its value passes the
+    length bounds and the optional `where` expression.
+
+    Args:
+        include (set): Keys to keep.
+        exclude (set): Keys to drop.
+        globs (list): fnmatch patterns for keys to keep.
+        where (str): Python expression over `key` and `value`, e.g. "len(value) >= 10".
+                     It is evaluated with eval, so only pass trusted expressions.
+        min_length (int): Keep only values with at least this many items.
+        ignore_case (bool): Compare keys, lists and globs case-insensitively.
+
+    Returns:
+        callable: selector(key, value, keys_only=False) -> bool, raising
+                  ValueError (naming the key) when the `where` expression fails.
+    """
+    norm = (lambda s: s.lower()) if ignore_case else (lambda s: s)
+    include = {norm(k) for k in include} if include else None
+    exclude = {norm(k) for k in exclude} if exclude else set()
+    globs = [norm(g) for g in globs] if globs else None
+    code = compile(where, "<where>", "eval") if where else None
+    # Keeps expressions short and readable; this is not a sandbox
+    where_builtins = {"len": len, "sum": sum, "any": any, "all": all,
+                     "min": min, "max": max, "isinstance": isinstance, "str": str}
+
+    def selector(key, value, keys_only=False):
+        k = norm(key)
+        if include is not None or globs is not None:
+            listed = include is not None and k in include
+            globbed = globs is not None and any(fnmatch.fnmatchcase(k, g) for g in globs)
+            if not (listed or globbed):
+                return False
+        if k in exclude:
+            return False
+        if keys_only:
+            return True
+        if min_length is not None and (not hasattr(value, "__len__") or len(value) < min_length):
+            return False
+        if code is not None:
+            try:
+                return bool(eval(code, {"__builtins__": where_builtins}, {"key": key, "value": value}))
+            except Exception as e:
+                raise ValueError(f"--where failed for key {key!r}: {type(e).__name__}: {e}") from e
+        return True
+
+    return selector
+
+def filter_stream(input_path, output_path, selector, filter_inner=False):
+    """
+    Streams `input_path` key by key and writes the selected entries to `output_path`.
+
+    The output is formatted exactly like json.dump(..., indent=4, ensure_ascii=False)
+    but is written entry by entry, so neither file is ever fully in memory. It is
+    written to a temp file and moved into place at the end, so a failed run leaves
+    an existing output untouched.
+
+    Args:
+        filter_inner (bool): Also apply the key selection (lists and globs only) to
+                             nested dicts, which turns a country x country matrix
+                             into a sub-matrix.
+
+    Returns:
+        tuple: (kept, total) entry counts.
+    """
+    kept = total = 0
+    tmp = output_path + ".tmp"
+    try:
+        with open(input_path, 'r', encoding='utf-8') as src, \
+             open(tmp, 'w', encoding='utf-8') as dst:
+            dst.write("{")
+            for key, value in iter_top_level_items(src):
+                total += 1
+                if not selector(key, value):
+                    continue
+                if filter_inner and isinstance(value, dict):
+                    value = {k: v for k, v in value.items() if selector(k, v, keys_only=True)}
+                body = json.dumps(value, indent=4, ensure_ascii=False).replace("\n", "\n    ")
+                dst.write(("," if kept else "") + "\n    " + json.dumps(key, ensure_ascii=False) + ": " + body)
+                kept += 1
+            dst.write("\n}" if kept else "}")
+        os.replace(tmp, output_path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return kept, total
+
+def batch_main(argv):
+    parser = argparse.ArgumentParser(
+        description="Filter the top-level keys of a JSON object without prompts. "
+                    "Run with no arguments for the interactive mode.")
+    parser.add_argument("file", help="Input JSON file (top level must be an object).")
+    parser.add_argument("-o", "--output", help="Output file (default: filtered_<file>).")
+    parser.add_argument("--include", metavar="LIST_FILE", help="File with keys to keep, one per line.")
+    parser.add_argument("--exclude", metavar="LIST_FILE", help="File with keys to drop, one per line.")
+    parser.add_argument("--glob", action="append", metavar="PATTERN", help="Keep keys matching this pattern (repeatable).")
+    parser.add_argument("--min-length", type=int, help="Keep only values with at least this many items, e.g. 10 exports.")
+    parser.add_argument("--where", metavar="EXPR", help='Keep entries where EXPR is true, e.g. "len(value) >= 10".')
+    parser.add_argument("--ignore-case", action="store_true", help="Match keys case-insensitively.")
+    parser.add_argument("--filter-inner", action="store_true", help="Apply the key selection to nested objects too (sub-matrix).")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.file):
+        print(f"Error: The file '{args.file}' was not found.")
+        return 1
+    try:
+        selector = build_selector(
+            include=read_key_list(args.include) if args.include else None,
+            exclude=read_key_list(args.exclude) if args.exclude else None,
+            globs=args.glob, where=args.where, min_length=args.min_length,
+            ignore_case=args.ignore_case,
+        )
+    except FileNotFoundError as e:
+        print(f"Error: The list file '{e.filename}' was not found.")
+        return 1
+    except SyntaxError as e:
+        print(f"Error: Invalid --where expression: {e}")
+        return 1
+
+    directory, base = os.path.split(args.file)
+    output = args.output or os.path.join(directory, f"filtered_{base}")
+    try:
+        kept, total = filter_stream(args.file, output, selector, filter_inner=args.filter_inner)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
+    print(f"Kept {kept} of {total} entries. Filtered JSON saved as: {output}")
+    return 0
+
+def main():
+    if len(sys.argv) > 1:
+        return batch_main(sys.argv[1:])
+    interactive_main()
+    return 0
+
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,10 @@
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The scripts import their siblings by bare name, as they do when run from their own folder
+for sub in ("", "Misc", os.path.join("Misc", "direction")):
+    path = os.path.join(BACKEND_DIR, sub)
+    if path not in sys.path:
+        sys.path.insert(0, path)
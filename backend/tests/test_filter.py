@@ -0,0 +1,66 @@
+import io
+import json
+import os
+
+import pytest
+
+from filter import batch_main, iter_top_level_items
+
+
+class CountingReader(io.StringIO):
+    """StringIO that counts read() calls."""
+
+    def __init__(self, text):
+        super().__init__(text)
+        self.reads = 0
+
+    def read(self, size=-1):
+        self.reads += 1
+        return super().read(size)
+
+
+def test_items_stream_before_eof():
+    data = {f"country {k}": [{"HS4": "Gold", "Total Trade Value": k + 0.5}] for k in range(200)}
+    reader = CountingReader(json.dumps(data))
+    items = iter_top_level_items(reader, chunk_size=16)
+
+    first = next(items)
+    assert first == ("country 0", data["country 0"])
+    assert reader.tell() < len(reader.getvalue()) // 10
+    assert dict([first, *items]) == data
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64])
+def test_numbers_cut_at_chunk_boundary(chunk_size):
+    text = '{"a": 3.5, "bb": 123456, "c": [1, 2.25], "d": -0.125e3, "e": null, "f": "x:y,}"}'
+    assert dict(iter_top_level_items(io.StringIO(text), chunk_size)) == json.loads(text)
+
+
+def test_large_value_is_not_reparsed_per_chunk():
+    text = json.dumps({"big": "x" * 200_000, "small": 1})
+    reader = CountingReader(text)
+    assert dict(iter_top_level_items(reader, chunk_size=64)) == json.loads(text)
+    assert reader.reads < 30
+
+
+def test_empty_and_invalid():
+    assert list(iter_top_level_items(io.StringIO(" { } "))) == []
+    with pytest.raises(ValueError):
+        list(iter_top_level_items(io.StringIO("[1, 2]")))
+    with pytest.raises(ValueError):
+        list(iter_top_level_items(io.StringIO('{"a": 1 "b": 2}')))
+
+
+def test_where_error_reports_the_key_and_keeps_the_output(tmp_path, capsys):
+    src = tmp_path / "data.json"
+    src.write_text(json.dumps({"Chile": [{"HS4": "Copper Ore"}], "Puerto Rico": []}), encoding="utf-8")
+    out = tmp_path / "out.json"
+    out.write_text("previous", encoding="utf-8")
+
+    assert batch_main([str(src), "-o", str(out), "--where", "value[0]['HS4'] == 'Copper Ore'"]) == 1
+    assert "'Puerto Rico': IndexError" in capsys.readouterr().out
+    assert out.read_text(encoding="utf-8") == "previous"
+    assert sorted(os.listdir(tmp_path)) == ["data.json", "out.json"]
+
+    assert batch_main([str(src), "-o", str(out), "--where", "len(value) > 0"]) == 0
+    assert json.loads(out.read_text(encoding="utf-8")) == {"Chile": [{"HS4": "Copper Ore"}]}
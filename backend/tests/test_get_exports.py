@@ -0,0 +1,29 @@
+import pytest
+
+pytest.importorskip("requests")
+
+import get_exports
+from get_exports import ColumnWriter, read_columns
+
+
+def test_discarded_country_leaves_no_rows(tmp_path, monkeypatch):
+    monkeypatch.setattr(get_exports, "FLUSH_ROWS", 2)
+    out_dir = str(tmp_path / "full")
+    writer = ColumnWriter(out_dir, ["A", "B", "C"])
+    writer.add(0, "Gold", 1, 5.0)
+    writer.end_country()
+    # B fails partway, after some of its rows were flushed
+    for k, name in enumerate(["Copper", "Gold", "Fish"]):
+        writer.add(1, name, k, 1.0)
+    writer.discard_country()
+    writer.end_country()
+    writer.add(2, "Fish", 7, None)
+    writer.end_country()
+    writer.close()
+
+    manifest, columns = read_columns(out_dir)
+    assert manifest["offsets"] == [0, 1, 1, 2]
+    assert manifest["hs4"] == ["Gold", "Fish"] and manifest["hs4_ids"] == [1, 7]
+    assert columns["country"].tolist() == [0, 2]
+    assert columns["hs4"].tolist() == [0, 1]
+    assert columns["value"][0] == 5.0
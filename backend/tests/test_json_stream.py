@@ -0,0 +1,39 @@
+import json
+
+import pytest
+
+from json_stream import iter_array_items
+
+
+def byte_chunks(text, size):
+    data = text.encode("utf-8")
+    return [data[k:k + size] for k in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 5, 64])
+def test_array_items_across_chunks(size):
+    records = [{"HS4": "Café", "Trade Value": 3.5}, {"HS4": "Gold", "Trade Value": 123456}, [], -0.125e3]
+    text = json.dumps({"source": [{"data": "not this one"}], "data": records, "after": 1})
+    assert list(iter_array_items(byte_chunks(text, size), chunk_size=4)) == records
+
+
+def test_array_items_stream_before_the_end():
+    text = json.dumps({"data": [{"k": k} for k in range(1000)]})
+    consumed = []
+
+    def chunks():
+        for chunk in byte_chunks(text, 16):
+            consumed.append(chunk)
+            yield chunk
+
+    items = iter_array_items(chunks(), chunk_size=16)
+    assert next(items) == {"k": 0}
+    assert len(consumed) < 10
+
+
+def test_array_items_errors():
+    assert list(iter_array_items([b'{"data": [ ]}'])) == []
+    with pytest.raises(KeyError):
+        list(iter_array_items([b'{"other": []}']))
+    with pytest.raises(ValueError):
+        list(iter_array_items([b'{"data": [1, 2']))
@@ -0,0 +1,98 @@
+import asyncio
+import json
+
+import pytest
+
+from lookup_service import GameTables, LocalClient, MAX_BATCH, _serve_connection
+
+DISTANCES = {
+    "chile": {"chile": None, "peru": 0.0, "fiji": 10412.3},
+    "peru": {"chile": 0.0, "peru": None, "fiji": 10790.04},
+    "fiji": {"chile": 10412.3, "peru": 10790.04, "fiji": None},
+}
+DIRECTIONS = {
+    "chile": {"chile": None, "peru": "N", "fiji": "unknown"},
+    "peru": {"chile": "S", "peru": None, "fiji": "W"},
+    "fiji": {"chile": "unknown", "peru": "E", "fiji": None},
+}
+DATA = {
+    "Chile": [{"HS4": "Copper Ore", "Total Trade Value": 2.1e10},
+              {"HS4": "Refined Copper", "Total Trade Value": 1.9e10},
+              {"HS4": "Fish Fillets", "Total Trade Value": 5.0e9}],
+    "Peru": [{"HS4": "Copper Ore", "Total Trade Value": 1.5e10},
+             {"HS4": "Gold", "Total Trade Value": 9.0e9}],
+    "Atlantis": [{"HS4": "Gold", "Total Trade Value": 1.0}],
+}
+
+
+@pytest.fixture
+def client():
+    return LocalClient(GameTables(DISTANCES, DIRECTIONS, DATA))
+
+
+def test_lookup(client):
+    assert client.get("/lookup?answer=Chile&guess=peru") == (200, {"distance": 0.0, "direction": "N"})
+    assert client.get("/lookup?answer=chile&guess=chile") == (200, {"distance": None, "direction": None})
+    assert client.get("/lookup?answer=chile&guess=narnia") == (200, {"distance": None, "direction": None})
+    assert client.get("/lookup?answer=chile") == (400, {"error": "'answer' and 'guess' are required"})
+
+
+def test_lookup_batch(client):
+    status, payload = client.post("/lookup", {"pairs": [["peru", "fiji"], ["atlantis", "peru"], ["fiji", "chile"]]})
+    assert status == 200
+    assert payload["results"] == [{"distance": 10790.0, "direction": "W"},
+                                  {"distance": None, "direction": None},
+                                  {"distance": 10412.3, "direction": "unknown"}]
+    assert client.post("/lookup", {"pairs": []}) == (200, {"results": []})
+    assert client.post("/lookup", {"pairs": [["chile"]]})[0] == 400
+    assert client.post("/lookup", [["chile", "peru"]])[0] == 400
+    assert client.post("/lookup", {"pairs": [["chile", "peru"]] * (MAX_BATCH + 1)})[0] == 413
+
+
+def test_distance_and_direction(client):
+    assert client.get("/distance?answer=peru&guess=fiji") == (200, {"distance": 10790.0})
+    assert client.get("/direction?answer=peru&guess=fiji") == (200, {"direction": "W"})
+    # "unknown" comes back as the matrix has it, absent cells as null
+    assert client.get("/direction?answer=chile&guess=fiji") == (200, {"direction": "unknown"})
+    assert client.get("/direction?answer=chile&guess=atlantis") == (200, {"direction": None})
+    assert client.get("/distance?guess=fiji")[0] == 400
+    assert client.post("/direction?answer=peru&guess=fiji", {})[0] == 405
+
+
+def test_exports(client):
+    status, payload = client.get("/exports?answer=CHILE&count=2")
+    assert status == 200
+    assert payload == {"answer": "chile", "exports": [{"name": "Copper Ore", "value": 2.1e10},
+                                                      {"name": "Refined Copper", "value": 1.9e10}]}
+    assert client.get("/exports?answer=peru")[1]["exports"][-1] == {"name": "Gold", "value": 9.0e9}
+    assert client.get("/exports?answer=peru&count=0") == (200, {"answer": "peru", "exports": []})
+    assert client.get("/exports?answer=narnia")[0] == 404
+    assert client.get("/exports")[0] == 400
+    assert client.get("/exports?answer=peru&count=two")[0] == 400
+    assert client.get("/exports?answer=peru&count=-1") == (400, {"error": "'count' must not be negative"})
+
+
+def test_health_and_unknown_route(client):
+    assert client.get("/health") == (200, {"status": "ok", "countries": 3, "answers": 3})
+    assert client.get("/nope")[0] == 404
+
+
+@pytest.mark.parametrize("length", ["abc", "-5"])
+def test_bad_content_length(length):
+    tables = GameTables(DISTANCES, DIRECTIONS, DATA)
+
+    async def exchange():
+        server = await asyncio.start_server(lambda r, w: _serve_connection(tables, r, w), "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(f"POST /lookup HTTP/1.1\r\nContent-Length: {length}\r\n\r\n".encode("latin-1"))
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+        return response
+
+    head, _, body = asyncio.run(exchange()).partition(b"\r\n\r\n")
+    assert head.startswith(b"HTTP/1.1 400 ")
+    assert b"Connection: close" in head
+    assert json.loads(body) == {"error": "Invalid Content-Length"}
@@ -0,0 +1,69 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+import work_queue
+from cost_model import save_costs, load_costs
+from work_queue import plan_queue, queue_status, run_worker, RESULT_FIELDS
+
+COUNTRIES = ["andorra", "france", "spain"]
+
+
+def fake_result(pairs):
+    result = {field: np.ones(len(pairs)) for field in RESULT_FIELDS}
+    result["i"] = np.array([p[0] for p in pairs], dtype=np.int32)
+    result["j"] = np.array([p[1] for p in pairs], dtype=np.int32)
+    return result
+
+
+@pytest.fixture
+def queue_dir(tmp_path, monkeypatch):
+    # No geometry needed: the kernel is replaced per test
+    monkeypatch.setattr(work_queue, "load_country_geometries", lambda resolution: {})
+    monkeypatch.setattr(work_queue, "sample_source_for", lambda country, polygons, sampler=None: None)
+    plan_queue(str(tmp_path), COUNTRIES, shards=1)
+    return str(tmp_path)
+
+
+def lease_path(queue_dir):
+    return os.path.join(queue_dir, "leases", "0000.lease")
+
+
+def test_worker_releases_its_lease(queue_dir, monkeypatch):
+    monkeypatch.setattr(work_queue, "compute_shard", lambda pairs, sources, names, heartbeat=None: fake_result(pairs))
+    assert run_worker(queue_dir, "w1") == 1
+    assert queue_status(queue_dir)["done"] == ["0000"]
+    assert not os.path.exists(lease_path(queue_dir))
+
+
+def test_taken_over_lease_is_left_alone(queue_dir, monkeypatch):
+    calls = []
+
+    def compute_while_taken_over(pairs, sources, names, heartbeat=None):
+        # Another worker decided this one was dead and claimed the shard
+        calls.append(pairs)
+        assert len(calls) == 1, "the shard was claimed again while another worker holds it"
+        with open(lease_path(queue_dir), "w", encoding="utf-8") as f:
+            json.dump({"worker": "w2"}, f)
+        return fake_result(pairs)
+
+    monkeypatch.setattr(work_queue, "compute_shard", compute_while_taken_over)
+    assert run_worker(queue_dir, "w1") == 0
+    with open(lease_path(queue_dir), encoding="utf-8") as f:
+        assert json.load(f)["worker"] == "w2"
+    assert queue_status(queue_dir)["leased"] == ["0000"]
+    assert not os.listdir(os.path.join(queue_dir, "results"))
+
+
+def test_costs_must_match_the_plan(tmp_path):
+    names = sorted(COUNTRIES)
+    cost_file = str(tmp_path / "costs.npz")
+    save_costs(cost_file, names, np.ones((3, 3)), "110m", "planar")
+    costs = load_costs(cost_file, "110m", "planar")
+    assert costs == {("andorra", "france"): 1.0, ("andorra", "spain"): 1.0, ("france", "spain"): 1.0}
+    with pytest.raises(ValueError, match="sampler"):
+        load_costs(cost_file, "110m", "geodesic")
+    with pytest.raises(ValueError, match="No cost estimate"):
+        plan_queue(str(tmp_path / "queue"), names + ["portugal"], shards=2, costs=costs)